@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import containers, tenants, devices, inventory, metrics, crops, activity, alerts, performance, seed_types
+from app.api.v1.endpoints import containers, tenants, devices, inventory, metrics, crops, activity, alerts, alert_rules, performance, seed_types, search, stream, exports, enums
 
 api_router = APIRouter()
 
@@ -13,5 +13,10 @@ api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 api_router.include_router(crops.router, prefix="/crops", tags=["crops"])
 api_router.include_router(activity.router, prefix="/activity", tags=["activity"])
 api_router.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
+api_router.include_router(alert_rules.router, prefix="/alert-rules", tags=["alert-rules"])
 api_router.include_router(performance.router, prefix="/performance", tags=["performance"])
-api_router.include_router(seed_types.router, prefix="/seed-types", tags=["seed-types"])
\ No newline at end of file
+api_router.include_router(seed_types.router, prefix="/seed-types", tags=["seed-types"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(stream.router, prefix="/stream", tags=["stream"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+api_router.include_router(enums.router, prefix="/enums", tags=["enums"])
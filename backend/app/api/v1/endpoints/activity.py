@@ -3,14 +3,20 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
+from app.database.activity_log_writer import ActivityLogQueueFull, ActivityLogWriter, get_activity_log_writer
+from app.database.archive import ACTIVITY_LOG_ARCHIVE, archived_rows, continue_page, count_archived_rows
 from app.database.database import get_db
-from app.models.enums import ActorType
-from app.schemas.activity import ActivityLog, ActivityLogCreate, ActivityLogList
+from app.models.enums import ActivityType, ActorType
+from app.schemas.activity import (
+    ActivityLog, ActivityLogCreate, ActivityLogList, ActivityLogBatchCreate, ActivityLogBatchAccepted
+)
+from app.utils.activity_types import classify_activity
+from app.utils.serialization import NegotiatedRoute
 
 from app.models.models import ActivityLog as ActivityLogModel
 from app.models.models import Container as ContainerModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.get("/logs/{container_id}", response_model=ActivityLogList)
@@ -23,7 +29,8 @@ def list_activity_logs(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     action_type: Optional[str] = None,
-    actor_type: Optional[ActorType] = None
+    actor_type: Optional[ActorType] = None,
+    activity_type: Optional[ActivityType] = Query(None, alias="type")
 ) -> Any:
     """
     List activity logs for a specific container with optional filtering.
@@ -34,6 +41,7 @@ def list_activity_logs(
     - **end_date**: Filter logs before this date
     - **action_type**: Filter by action type
     - **actor_type**: Filter by actor type (User or System)
+    - **type**: Filter by activity type
     """
     # Check if container exists
     container = db.query(ContainerModel).filter(ContainerModel.id == container_id).first()
@@ -54,14 +62,34 @@ def list_activity_logs(
         query = query.filter(ActivityLogModel.action_type == action_type)
     if actor_type:
         query = query.filter(ActivityLogModel.actor_type == actor_type)
+    if activity_type:
+        query = query.filter(ActivityLogModel.activity_type == activity_type)
     
     # Get total count before pagination
-    total = query.count()
+    hot_total = query.count()
     
     # Order by timestamp descending (most recent first) and apply pagination
     logs = query.order_by(ActivityLogModel.timestamp.desc()).offset(skip).limit(limit).all()
     
-    return ActivityLogList(total=total, results=logs)
+    # Entries past the retention period are archived; they come after all hot entries
+    connection = db.connection()
+    filters = {}
+    if action_type:
+        filters["action_type"] = action_type
+    if actor_type:
+        filters["actor_type"] = actor_type
+    if activity_type:
+        filters["activity_type"] = activity_type
+    archived_total = count_archived_rows(
+        connection, ACTIVITY_LOG_ARCHIVE, container_id, start_date, end_date, filters
+    )
+    if archived_total:
+        logs = continue_page(
+            logs, hot_total, skip, limit,
+            archived_rows(connection, ACTIVITY_LOG_ARCHIVE, container_id, start_date, end_date, filters)
+        )
+    
+    return ActivityLogList(total=hot_total + archived_total, results=logs)
 
 
 @router.post("/logs", response_model=ActivityLog, status_code=status.HTTP_201_CREATED)
@@ -87,6 +115,7 @@ def create_activity_log(
     db_log = ActivityLogModel(
         container_id=log_in.container_id,
         action_type=log_in.action_type,
+        activity_type=classify_activity(log_in.action_type),
         actor_type=log_in.actor_type,
         actor_id=log_in.actor_id,
         description=log_in.description,
@@ -100,6 +129,49 @@ def create_activity_log(
     return db_log
 
 
+@router.post("/logs/batch", response_model=ActivityLogBatchAccepted, status_code=status.HTTP_202_ACCEPTED)
+def create_activity_logs(
+    *,
+    db: Session = Depends(get_db),
+    writer: ActivityLogWriter = Depends(get_activity_log_writer),
+    batch_in: ActivityLogBatchCreate
+) -> Any:
+    """
+    Queue activity log entries to be written in the background.
+    
+    - Requires valid container IDs
+    - Entries are written within about a second, batched with other queued entries
+    - Returns 503 if the write queue stays full for the enqueue timeout (one timeout for the
+      whole batch). Entries queued before that are still written; the response detail lists
+      them under `accepted` and `ids`, so a client can resend only the rest
+    """
+    # Check that all containers exist
+    container_ids = {entry.container_id for entry in batch_in.entries}
+    found = {
+        container_id for (container_id,) in
+        db.query(ContainerModel.id).filter(ContainerModel.id.in_(container_ids))
+    }
+    if found != container_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Container not found"
+        )
+    
+    try:
+        queued = writer.log_many(entry.model_dump() for entry in batch_in.entries)
+    except ActivityLogQueueFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "message": str(exc),
+                "accepted": len(exc.queued),
+                "ids": [entry["id"] for entry in exc.queued],
+            }
+        )
+    
+    return ActivityLogBatchAccepted(accepted=len(queued), ids=[entry["id"] for entry in queued])
+
+
 @router.get("/logs/{container_id}/recent", response_model=List[ActivityLog])
 def get_recent_activity_logs(
     *,
@@ -0,0 +1,184 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.database.database import get_db
+from app.models.enums import AlertRuleOperator
+from app.schemas.alert_rule import AlertRule, AlertRuleCreate, AlertRuleUpdate, AlertRuleList
+from app.utils.alert_rules import alert_rule_engine
+from app.utils.serialization import NegotiatedRoute
+
+from app.models.models import AlertRule as AlertRuleModel
+from app.models.models import Container as ContainerModel
+from app.models.models import Tenant as TenantModel
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+def validate_hysteresis(operator: AlertRuleOperator, threshold: float, clear_threshold: Optional[float]) -> None:
+    """Reject a clear threshold that would resolve the alert while the rule still fires."""
+    if clear_threshold is None:
+        return
+    if operator == AlertRuleOperator.ABOVE:
+        invalid = clear_threshold > threshold
+    else:
+        invalid = clear_threshold < threshold
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"clear_threshold must not be {operator.value} threshold"
+        )
+
+
+@router.get("/", response_model=AlertRuleList)
+def list_alert_rules(
+    *,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    container_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    enabled: Optional[bool] = None
+) -> Any:
+    """
+    List alert rules with optional filtering.
+
+    - **skip**: Number of records to skip (pagination)
+    - **limit**: Maximum number of records to return
+    - **container_id**: Filter by container ID
+    - **tenant_id**: Filter by tenant ID
+    - **enabled**: Filter by enabled status (true/false)
+    """
+    query = db.query(AlertRuleModel)
+
+    # Apply filters
+    if container_id:
+        query = query.filter(AlertRuleModel.container_id == container_id)
+    if tenant_id:
+        query = query.filter(AlertRuleModel.tenant_id == tenant_id)
+    if enabled is not None:
+        query = query.filter(AlertRuleModel.enabled == enabled)
+
+    # Get total count before pagination
+    total = query.count()
+
+    # Apply pagination
+    rules = query.order_by(AlertRuleModel.created_at).offset(skip).limit(limit).all()
+
+    return AlertRuleList(total=total, results=rules)
+
+
+@router.post("/", response_model=AlertRule, status_code=status.HTTP_201_CREATED)
+def create_alert_rule(
+    *,
+    db: Session = Depends(get_db),
+    rule_in: AlertRuleCreate
+) -> Any:
+    """
+    Create a new alert rule.
+
+    - Set either **container_id** or **tenant_id** to scope the rule; with neither it applies to all containers
+    - **clear_threshold** must not be beyond **threshold** in the firing direction
+    """
+    if rule_in.container_id and rule_in.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A rule applies to either a container or a tenant, not both"
+        )
+    if rule_in.container_id and not db.query(ContainerModel).filter(ContainerModel.id == rule_in.container_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Container not found"
+        )
+    if rule_in.tenant_id and not db.query(TenantModel).filter(TenantModel.id == rule_in.tenant_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tenant not found"
+        )
+    validate_hysteresis(rule_in.operator, rule_in.threshold, rule_in.clear_threshold)
+
+    db_rule = AlertRuleModel(**rule_in.dict())
+
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    alert_rule_engine.invalidate()
+
+    return db_rule
+
+
+@router.get("/{rule_id}", response_model=AlertRule)
+def get_alert_rule(
+    *,
+    db: Session = Depends(get_db),
+    rule_id: str
+) -> Any:
+    """
+    Get alert rule details by ID.
+    """
+    rule = db.query(AlertRuleModel).filter(AlertRuleModel.id == rule_id).first()
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert rule not found"
+        )
+    return rule
+
+
+@router.put("/{rule_id}", response_model=AlertRule)
+def update_alert_rule(
+    *,
+    db: Session = Depends(get_db),
+    rule_id: str,
+    rule_in: AlertRuleUpdate
+) -> Any:
+    """
+    Update an alert rule.
+
+    - Commonly used to adjust thresholds or disable a rule by setting enabled = false
+    """
+    rule = db.query(AlertRuleModel).filter(AlertRuleModel.id == rule_id).first()
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert rule not found"
+        )
+
+    update_data = rule_in.dict(exclude_unset=True)
+    validate_hysteresis(
+        rule.operator,
+        update_data.get("threshold", rule.threshold),
+        update_data.get("clear_threshold", rule.clear_threshold)
+    )
+    for field, value in update_data.items():
+        setattr(rule, field, value)
+
+    db.commit()
+    db.refresh(rule)
+    alert_rule_engine.invalidate()
+
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_alert_rule(
+    *,
+    db: Session = Depends(get_db),
+    rule_id: str
+) -> None:
+    """
+    Delete an alert rule.
+
+    - Alerts already opened by the rule are kept
+    """
+    rule = db.query(AlertRuleModel).filter(AlertRuleModel.id == rule_id).first()
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert rule not found"
+        )
+
+    db.delete(rule)
+    db.commit()
+    alert_rule_engine.invalidate()
+
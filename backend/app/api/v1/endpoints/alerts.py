@@ -1,15 +1,31 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from app.database.database import get_db
 from app.models.enums import AlertSeverity, AlertRelatedObjectType
-from app.schemas.alert import Alert, AlertCreate, AlertUpdate, AlertList
+from app.schemas.alert import Alert, AlertCreate, AlertUpdate, AlertList, AlertGroup, AlertGroupList
+from app.utils.alert_dedup import record_alert
+from app.utils.broker import broker
+from app.utils.serialization import NegotiatedRoute
+from app.utils.fieldsets import column_fields, parse_fields, select_fields, sparse_response
 
 from app.models.models import Alert as AlertModel
 from app.models.models import Container as ContainerModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Fields available to sparse fieldsets
+ALERT_FIELDS = column_fields(AlertModel, Alert)
+
+
+def publish_alert(alert: AlertModel, event: str) -> None:
+    """Notify live subscribers of the alert's container."""
+    if broker.has_subscribers(alert.container_id):
+        # Repeated updates of one alert (e.g. occurrence counts during a storm) coalesce
+        coalesce_key = f"alert:{alert.id}" if event == "alert_updated" else None
+        broker.publish(alert.container_id, event, Alert.model_validate(alert), coalesce_key=coalesce_key)
 
 
 @router.get("/", response_model=AlertList)
@@ -21,7 +37,8 @@ def list_alerts(
     container_id: Optional[str] = None,
     active: Optional[bool] = None,
     severity: Optional[AlertSeverity] = None,
-    related_object_type: Optional[AlertRelatedObjectType] = None
+    related_object_type: Optional[AlertRelatedObjectType] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List alerts with optional filtering.
@@ -32,7 +49,9 @@ def list_alerts(
     - **active**: Filter by active status (true/false)
     - **severity**: Filter by severity level
     - **related_object_type**: Filter by related object type
+    - **fields**: Comma separated fields to return, e.g. id,severity,description (all if omitted)
     """
+    field_names = parse_fields(fields, ALERT_FIELDS)
     query = db.query(AlertModel)
     
     # Apply filters
@@ -48,8 +67,16 @@ def list_alerts(
     # Get total count before pagination
     total = query.count()
     
-    # Apply pagination and sort by most recent first
-    alerts = query.order_by(AlertModel.created_at.desc()).offset(skip).limit(limit).all()
+    # Sort by most recent first
+    query = query.order_by(AlertModel.created_at.desc())
+    
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, ALERT_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(Alert, field_names, total, rows)
+    
+    # Apply pagination
+    alerts = query.offset(skip).limit(limit).all()
     
     return AlertList(total=total, results=alerts)
 
@@ -58,12 +85,16 @@ def list_alerts(
 def create_alert(
     *,
     db: Session = Depends(get_db),
-    alert_in: AlertCreate
+    alert_in: AlertCreate,
+    response: Response
 ) -> Any:
     """
     Create a new alert.
     
     - Requires a valid container ID
+    - If an identical active alert (same container, related object and description apart
+      from numbers) occurred within the suppression window, its occurrence count is
+      incremented instead and it is returned with status 200
     """
     # Check if container exists
     container = db.query(ContainerModel).filter(ContainerModel.id == alert_in.container_id).first()
@@ -73,8 +104,9 @@ def create_alert(
             detail="Container not found"
         )
     
-    # Create new alert
-    db_alert = AlertModel(
+    # Create new alert or fold it into a recent duplicate
+    db_alert, created = record_alert(
+        db,
         container_id=alert_in.container_id,
         description=alert_in.description,
         severity=alert_in.severity,
@@ -83,13 +115,70 @@ def create_alert(
         related_object_id=alert_in.related_object_id
     )
     
-    db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    if created:
+        publish_alert(db_alert, "alert_created")
+    else:
+        response.status_code = status.HTTP_200_OK
+        publish_alert(db_alert, "alert_updated")
     
     return db_alert
 
 
+@router.get("/groups", response_model=AlertGroupList)
+def list_alert_groups(
+    *,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    container_id: Optional[str] = None,
+    active: Optional[bool] = None
+) -> Any:
+    """
+    List alerts grouped by their dedup key, most recently occurred first.
+    
+    - **skip**: Number of groups to skip (pagination)
+    - **limit**: Maximum number of groups to return
+    - **container_id**: Filter by container ID
+    - **active**: Only count alerts with this active status (true/false)
+    """
+    # One pass with window functions: group totals on every row, and the group's most
+    # recent alert ranked first to supply the description, severity and related object
+    group = (AlertModel.dedup_key, AlertModel.container_id)
+    latest_first = (AlertModel.last_occurred_at.desc(), AlertModel.created_at.desc(), AlertModel.id.desc())
+    ranked = db.query(
+        AlertModel.dedup_key,
+        AlertModel.container_id,
+        AlertModel.description,
+        AlertModel.severity,
+        AlertModel.related_object_type,
+        AlertModel.related_object_id,
+        func.count(AlertModel.id).over(partition_by=group).label("alert_count"),
+        func.sum(case((AlertModel.active == True, 1), else_=0)).over(partition_by=group).label("active_count"),
+        func.sum(AlertModel.occurrence_count).over(partition_by=group).label("occurrence_count"),
+        func.min(AlertModel.created_at).over(partition_by=group).label("first_created_at"),
+        func.max(AlertModel.last_occurred_at).over(partition_by=group).label("last_occurred_at"),
+        func.row_number().over(partition_by=group, order_by=latest_first).label("recency")
+    )
+    
+    # Apply filters
+    if container_id:
+        ranked = ranked.filter(AlertModel.container_id == container_id)
+    if active is not None:
+        ranked = ranked.filter(AlertModel.active == active)
+    
+    ranked = ranked.subquery()
+    query = db.query(*[column for column in ranked.c if column.name != "recency"]).filter(ranked.c.recency == 1)
+    
+    # Get total count before pagination
+    total = query.count()
+    
+    groups = query.order_by(ranked.c.last_occurred_at.desc()).offset(skip).limit(limit).all()
+    
+    return AlertGroupList(total=total, results=[AlertGroup.model_validate(group) for group in groups])
+
+
 @router.get("/{alert_id}", response_model=Alert)
 def get_alert(
     *,
@@ -127,12 +216,14 @@ def update_alert(
             detail="Alert not found"
         )
     
+    was_active = alert.active
     update_data = alert_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(alert, field, value)
     
     db.commit()
     db.refresh(alert)
+    publish_alert(alert, "alert_resolved" if was_active and not alert.active else "alert_updated")
     
     return alert
 
@@ -177,5 +268,6 @@ def resolve_alert(
     alert.active = False
     db.commit()
     db.refresh(alert)
+    publish_alert(alert, "alert_resolved")
     
     return alert
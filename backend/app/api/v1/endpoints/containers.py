@@ -1,26 +1,48 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+import logging
+from typing import Any, List, Optional, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta
 
 from app.database.database import get_db
-from app.models.enums import ContainerType, ContainerStatus, ContainerPurpose, FAEnvironment, AWSEnvironment, MBAIEnvironment, MetricTimeRange
+from app.database.deletion import delete_container_in_batches, delete_containers, remove_files
+from app.database.search import text_search_filter
+from app.models.enums import ActivityType, ContainerType, ContainerStatus, ContainerPurpose, FAEnvironment, AWSEnvironment, MBAIEnvironment, MetricTimeRange
 from app.schemas.container import (
     Container, ContainerCreate, ContainerList, ContainerSummary, ContainerStats, 
-    ContainerUpdate, ContainerFormRequest, ContainerDetail, Location, 
+    ContainerCountsList, ContainerUpdate, ContainerFormRequest, ContainerDetail, Location, 
     SystemIntegration, SystemIntegrations
 )
 from app.schemas.metrics import ContainerMetricsDetail, SingleMetricData
 from app.schemas.crop import ContainerCrop, ContainerCropsList
 from app.schemas.activity import ContainerActivity, ContainerActivityList, ActivityUser, ActivityDetails
+from app.utils.alert_rules import alert_rule_engine
+from app.utils.fieldsets import column_fields, parse_fields, select_fields, sparse_response
+from app.utils.serialization import NegotiatedRoute, model_response
+from app.utils.singleflight import coalesce
 
 # Placeholder for future CRUD operations
 # In a real implementation, these would be imported from a CRUD module
 from app.models.models import Container as ContainerModel
-from app.models.models import Tenant, Alert, SeedType, MetricSnapshot, Crop as CropModel, ActivityLog as ActivityLogModel
-from sqlalchemy import func, desc
+from app.models.models import ContainerSummary as ContainerSummaryModel
+from app.models.models import ContainerLatestMetrics as ContainerLatestMetricsModel
+from app.models.models import Tenant, SeedType, MetricSnapshot, Crop as CropModel, ActivityLog as ActivityLogModel
+from sqlalchemy import func, desc, exists, select
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+# SQL expressions of the ContainerSummary fields, for sparse fieldsets
+CONTAINER_SUMMARY_FIELDS = {
+    **column_fields(ContainerModel, ContainerSummary),
+    "tenant_name": select(Tenant.name).where(Tenant.id == ContainerModel.tenant_id).scalar_subquery(),
+    "has_alerts": exists().where(
+        ContainerSummaryModel.container_id == ContainerModel.id,
+        ContainerSummaryModel.active_alerts > 0
+    ),
+}
 
 
 @router.get("/", response_model=ContainerList)
@@ -35,26 +57,29 @@ def list_containers(
     purpose: Optional[str] = None,
     status: Optional[ContainerStatus] = None,
     has_alerts: Optional[bool] = None,
-    location: Optional[str] = None
+    location: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List containers with optional filtering.
     
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
-    - **name**: Filter by container name (partial match)
+    - **name**: Filter by container name (word prefix match)
     - **tenant_id**: Filter by tenant ID
     - **type**: Filter by container type (Physical or Virtual)
     - **purpose**: Filter by purpose (Development, Research, Production)
     - **status**: Filter by status (Created, Active, Maintenance, Inactive)
     - **has_alerts**: If true, only return containers with active alerts
-    - **location**: Filter by location (partial match on city or country)
+    - **location**: Filter by location (word prefix match on city or country)
+    - **fields**: Comma separated fields to return, e.g. id,name,status,has_alerts (all if omitted)
     """
+    field_names = parse_fields(fields, CONTAINER_SUMMARY_FIELDS)
     query = db.query(ContainerModel)
     
-    # Apply filters
+    # Apply filters; name and location are served by the full-text index
     if name:
-        query = query.filter(ContainerModel.name.ilike(f"%{name}%"))
+        query = query.filter(text_search_filter("container", name, ["name"], ContainerModel.name))
     if tenant_id:
         query = query.filter(ContainerModel.tenant_id == tenant_id)
     if type:
@@ -64,31 +89,38 @@ def list_containers(
     if status:
         query = query.filter(ContainerModel.status == status)
     if location:
-        query = query.filter(
-            (ContainerModel.location_city.ilike(f"%{location}%")) | 
-            (ContainerModel.location_country.ilike(f"%{location}%"))
-        )
+        query = query.filter(text_search_filter(
+            "container", location, ["location_city", "location_country"],
+            ContainerModel.location_city, ContainerModel.location_country
+        ))
     
-    # Handle alert filtering - this is more complex and requires a join/subquery
+    # Alert filtering is served by the materialized container summary
     if has_alerts is not None:
+        query = query.outerjoin(ContainerSummaryModel, ContainerSummaryModel.container_id == ContainerModel.id)
         if has_alerts:
-            query = query.join(Alert).filter(Alert.active == True).distinct()
+            query = query.filter(ContainerSummaryModel.active_alerts > 0)
         else:
             # No alerts or only inactive alerts
-            subquery = db.query(Alert.container_id).filter(Alert.active == True).distinct().subquery()
-            query = query.filter(~ContainerModel.id.in_(subquery))
+            query = query.filter(func.coalesce(ContainerSummaryModel.active_alerts, 0) == 0)
     
     # Get total count before pagination
     total = query.count()
     
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, CONTAINER_SUMMARY_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(ContainerSummary, field_names, total, rows)
+    
     # Apply pagination
-    containers = query.offset(skip).limit(limit).all()
+    containers = query.options(
+        joinedload(ContainerModel.tenant), joinedload(ContainerModel.summary)
+    ).offset(skip).limit(limit).all()
     
-    # Convert to summary objects
+    # Convert to summary objects; the values come from the database, so skip validation
     results = []
     for container in containers:
-        has_active_alerts = any(alert.active for alert in container.alerts)
-        summary = ContainerSummary(
+        has_active_alerts = bool(container.summary and container.summary.active_alerts)
+        summary = ContainerSummary.model_construct(
             id=container.id,
             name=container.name,
             type=container.type,
@@ -103,7 +135,7 @@ def list_containers(
         )
         results.append(summary)
     
-    return ContainerList(total=total, results=results)
+    return model_response(ContainerList, ContainerList.model_construct(total=total, results=results), validate=False)
 
 
 @router.post("/", response_model=Container, status_code=status.HTTP_201_CREATED)
@@ -208,6 +240,45 @@ def get_container_stats(
     )
 
 
+@router.get("/counts", response_model=ContainerCountsList)
+def list_container_counts(
+    *,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(1000, ge=1, le=10000),
+    container_ids: Optional[List[str]] = Query(None),
+    tenant_id: Optional[str] = None
+) -> Any:
+    """
+    Get per-container counters from the materialized container summary.
+    
+    - **skip**: Number of records to skip (pagination)
+    - **limit**: Maximum number of records to return
+    - **container_ids**: Only return these containers
+    - **tenant_id**: Filter by tenant ID
+    
+    Returns active alerts by severity, devices by status, crops by lifecycle status
+    and health check, and trays/panels in use for every container.
+    """
+    query = db.query(ContainerSummaryModel)
+    
+    # Apply filters
+    if container_ids:
+        query = query.filter(ContainerSummaryModel.container_id.in_(container_ids))
+    if tenant_id:
+        query = query.join(ContainerModel, ContainerModel.id == ContainerSummaryModel.container_id).filter(
+            ContainerModel.tenant_id == tenant_id
+        )
+    
+    # Get total count before pagination
+    total = query.count()
+    
+    # Apply pagination
+    summaries = query.order_by(ContainerSummaryModel.container_id).offset(skip).limit(limit).all()
+    
+    return ContainerCountsList(total=total, results=summaries)
+
+
 @router.get("/{container_id}", response_model=ContainerDetail)
 def get_container_detail(
     *,
@@ -372,27 +443,53 @@ def update_container(
     return container
 
 
-@router.delete("/{container_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{container_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Deletion continues in the background"}}
+)
 def delete_container(
     *,
     db: Session = Depends(get_db),
-    container_id: str
-) -> None:
+    background_tasks: BackgroundTasks,
+    container_id: str,
+    background: bool = False
+) -> Response:
     """
     Delete a container.
     
     - Completely removes the container and all associated data
     - This is a destructive operation and cannot be undone
+    - **background**: Accept the request (202) and delete the container's history
+      in batches after responding, for containers with a lot of it
     """
-    container = db.query(ContainerModel).filter(ContainerModel.id == container_id).first()
-    if not container:
+    exists_query = select(ContainerModel.id).where(ContainerModel.id == container_id)
+    if db.execute(exists_query).first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Container not found"
         )
     
-    db.delete(container)
+    if background:
+        # The deletion uses its own transactions; release this session's connection first
+        db.close()
+        background_tasks.add_task(_delete_container_in_background, db.get_bind(), container_id)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+    
+    paths = delete_containers(db.connection(), [container_id])
     db.commit()
+    remove_files(paths, [container_id])
+    alert_rule_engine.invalidate()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def _delete_container_in_background(engine: Engine, container_id: str) -> None:
+    try:
+        delete_container_in_batches(engine, container_id)
+    except Exception:
+        logger.exception("Failed to delete container %s", container_id)
+    finally:
+        alert_rule_engine.invalidate()
 
 
 @router.post("/form", response_model=Container, status_code=status.HTTP_201_CREATED)
@@ -526,6 +623,7 @@ def shutdown_container(
 
 
 @router.get("/{container_id}/metrics", response_model=ContainerMetricsDetail)
+@coalesce()
 def get_container_metrics(
     *,
     db: Session = Depends(get_db),
@@ -560,29 +658,45 @@ def get_container_metrics(
     
     import random
     
-    # Seed the random number generator with the container ID for consistent results
-    random.seed(container_seed)
+    # Generator seeded with the container ID for consistent results; the global random module is left alone
+    rng = random.Random(container_seed)
     
     # Current values with slight randomization but consistent for each container
-    current_temperature = round(20.0 + random.uniform(0, 3), 1)
-    current_humidity = round(65.0 + random.uniform(0, 10), 1)
-    current_co2 = round(800.0 + random.uniform(0, 100), 1)
+    current_temperature = round(20.0 + rng.uniform(0, 3), 1)
+    current_humidity = round(65.0 + rng.uniform(0, 10), 1)
+    current_co2 = round(800.0 + rng.uniform(0, 100), 1)
     
     # Adjust base values based on container type
     yield_base = 45.0 if container_type == "PHYSICAL" else 35.0
-    current_yield = round(yield_base + random.uniform(0, 15), 1)
+    current_yield = round(yield_base + rng.uniform(0, 15), 1)
     
     nursery_base = 70.0 if container_type == "PHYSICAL" else 60.0
-    current_nursery = round(nursery_base + random.uniform(0, 15), 1)
+    current_nursery = round(nursery_base + rng.uniform(0, 15), 1)
     
     cultivation_base = 85.0 if container_type == "PHYSICAL" else 75.0
-    current_cultivation = round(cultivation_base + random.uniform(0, 15), 1)
+    current_cultivation = round(cultivation_base + rng.uniform(0, 15), 1)
     
     # Generate trends - physical containers generally have slightly better trends
     trend_factor = 1.0 if container_type == "PHYSICAL" else 0.8
-    yield_trend = round(random.uniform(0.8, 2.2) * trend_factor, 1)
-    nursery_trend = round(random.uniform(3, 8) * trend_factor, 1)
-    cultivation_trend = round(random.uniform(5, 20) * trend_factor, 1)
+    yield_trend = round(rng.uniform(0.8, 2.2) * trend_factor, 1)
+    nursery_trend = round(rng.uniform(3, 8) * trend_factor, 1)
+    cultivation_trend = round(rng.uniform(5, 20) * trend_factor, 1)
+    
+    # Use the real current readings where the container has reported them
+    latest = db.get(ContainerLatestMetricsModel, container_id)
+    if latest is not None:
+        if latest.air_temperature is not None:
+            current_temperature = latest.air_temperature
+        if latest.humidity is not None:
+            current_humidity = latest.humidity
+        if latest.co2 is not None:
+            current_co2 = latest.co2
+        if latest.yield_kg is not None:
+            current_yield = latest.yield_kg
+        if latest.nursery_utilization_percentage is not None:
+            current_nursery = latest.nursery_utilization_percentage
+        if latest.cultivation_utilization_percentage is not None:
+            current_cultivation = latest.cultivation_utilization_percentage
     
     # Target values are the same for all containers
     target_temperature = 21.0
@@ -624,6 +738,29 @@ def get_container_metrics(
     )
 
 
+def calculate_crop_age(crop: CropModel, now: datetime) -> Tuple[int, int]:
+    """
+    Calculate the age of a crop and how many days it is overdue.
+    
+    A seeded crop is overdue once its planned transplanting date has passed,
+    a transplanted crop once its planned harvesting date has passed.
+    Returns a tuple of (age in days, overdue days).
+    """
+    # Calculate age in days
+    age_days = (now - crop.seed_date).days if crop.seed_date else 0
+    
+    # Determine if overdue
+    overdue = 0
+    if crop.lifecycle_status.value == "Seeded" and crop.transplanting_date_planned:
+        if crop.transplanting_date_planned < now:
+            overdue = (now - crop.transplanting_date_planned).days
+    elif crop.lifecycle_status.value == "Transplanted" and crop.harvesting_date_planned:
+        if crop.harvesting_date_planned < now:
+            overdue = (now - crop.harvesting_date_planned).days
+    
+    return age_days, overdue
+
+
 @router.get("/{container_id}/crops", response_model=ContainerCropsList)
 def get_container_crops(
     *,
@@ -666,7 +803,7 @@ def get_container_crops(
     
     # Apply seed_type filter if provided
     if seed_type:
-        query = query.join(SeedType).filter(SeedType.name.ilike(f"%{seed_type}%"))
+        query = query.filter(SeedType.name.ilike(f"%{seed_type}%"))
     
     # Get total count before pagination
     total = query.count()
@@ -675,19 +812,10 @@ def get_container_crops(
     crops = query.offset(page * page_size).limit(page_size).all()
     
     # Transform crops into ContainerCrop objects
+    now = datetime.utcnow()
     results = []
     for crop in crops:
-        # Calculate age in days
-        age_days = (datetime.utcnow() - crop.seed_date).days if crop.seed_date else 0
-        
-        # Determine if overdue
-        overdue = 0
-        if crop.lifecycle_status.value == "Seeded" and crop.transplanting_date_planned:
-            if crop.transplanting_date_planned < datetime.utcnow():
-                overdue = (datetime.utcnow() - crop.transplanting_date_planned).days
-        elif crop.lifecycle_status.value == "Transplanted" and crop.harvesting_date_planned:
-            if crop.harvesting_date_planned < datetime.utcnow():
-                overdue = (datetime.utcnow() - crop.harvesting_date_planned).days
+        age_days, overdue = calculate_crop_age(crop, now)
         
         # Format dates as strings
         last_sd = crop.seed_date.date().isoformat() if crop.seed_date else None
@@ -719,13 +847,15 @@ def get_container_activities(
     *,
     db: Session = Depends(get_db),
     container_id: str,
-    limit: int = 5
+    limit: int = 5,
+    activity_type: Optional[ActivityType] = Query(None, alias="type")
 ) -> Any:
     """
     Get activity logs for a specific container.
     
     - **container_id**: Container ID to retrieve activities for
     - **limit**: Maximum number of activities to return (default: 5)
+    - **type**: Optional filter by activity type
     
     Returns a list of container activities with details about the action, user, and timestamp.
     """
@@ -738,26 +868,14 @@ def get_container_activities(
         )
     
     # Query activity logs for the container
-    logs = db.query(ActivityLogModel).filter(
-        ActivityLogModel.container_id == container_id
-    ).order_by(ActivityLogModel.timestamp.desc()).limit(limit).all()
+    query = db.query(ActivityLogModel).filter(ActivityLogModel.container_id == container_id)
+    if activity_type:
+        query = query.filter(ActivityLogModel.activity_type == activity_type)
+    logs = query.order_by(ActivityLogModel.timestamp.desc()).limit(limit).all()
     
     # Transform ActivityLogs to ContainerActivity format
     activities = []
     for log in logs:
-        # Map action_type to type enum values specified in the API
-        activity_type = "CREATED"  # Default
-        if "seed" in log.action_type.lower():
-            activity_type = "SEEDED"
-        elif "sync" in log.action_type.lower():
-            activity_type = "SYNCED"
-        elif "environment" in log.action_type.lower():
-            activity_type = "ENVIRONMENT_CHANGED"
-        elif "maintenance" in log.action_type.lower():
-            activity_type = "MAINTENANCE"
-        elif "create" in log.action_type.lower():
-            activity_type = "CREATED"
-            
         # Create user information
         if log.actor_type == "User":
             user_name = log.actor_id  # In a real app, you would look up the user's name
@@ -774,7 +892,7 @@ def get_container_activities(
         
         activity = ContainerActivity(
             id=log.id,
-            type=activity_type,
+            type=log.activity_type.value,
             timestamp=timestamp,
             description=log.description,
             user=ActivityUser(
@@ -1,15 +1,20 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 
+from app.database.archive import CROP_HISTORY_ARCHIVE, archived_rows
 from app.database.database import get_db
+from app.database.deletion import delete_crop as delete_crop_rows, remove_files
+from app.database.search import text_search_filter
 from app.models.enums import CropLifecycleStatus, CropHealthCheck, CropLocationType
 from app.schemas.crop import (
     Crop, CropCreate, CropUpdate, CropList, 
     CropHistoryEntry, CropHistoryCreate,
     SeedType, SeedTypeCreate, SeedTypeUpdate, SeedTypeList
 )
+from app.utils.fieldsets import column_fields, parse_fields, select_fields, sparse_response
+from app.utils.serialization import NegotiatedRoute, model_response
 
 from app.models.models import (
     Crop as CropModel,
@@ -19,7 +24,10 @@ from app.models.models import (
     Panel as PanelModel
 )
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Crop fields available to sparse fieldsets; history is a relationship and always loaded in full
+CROP_FIELDS = column_fields(CropModel, Crop)
 
 
 # --------------------- SEED TYPE ENDPOINTS ---------------------
@@ -37,13 +45,13 @@ def list_seed_types(
     
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
-    - **name**: Filter by name (partial match)
+    - **name**: Filter by name (word prefix match)
     """
     query = db.query(SeedTypeModel)
     
     # Apply filters
     if name:
-        query = query.filter(SeedTypeModel.name.ilike(f"%{name}%"))
+        query = query.filter(text_search_filter("seed_type", name, ["name"], SeedTypeModel.name))
     
     # Get total count before pagination
     total = query.count()
@@ -172,7 +180,8 @@ def list_crops(
     lifecycle_status: Optional[CropLifecycleStatus] = None,
     health_check: Optional[CropHealthCheck] = None,
     tray_id: Optional[str] = None,
-    panel_id: Optional[str] = None
+    panel_id: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List crops with optional filtering.
@@ -184,7 +193,9 @@ def list_crops(
     - **health_check**: Filter by health check status
     - **tray_id**: Filter by tray ID
     - **panel_id**: Filter by panel ID
+    - **fields**: Comma separated fields to return, e.g. id,lifecycle_status,seed_date (all if omitted)
     """
+    field_names = parse_fields(fields, CROP_FIELDS)
     query = db.query(CropModel)
     
     # Apply filters
@@ -202,10 +213,15 @@ def list_crops(
     # Get total count before pagination
     total = query.count()
     
-    # Apply pagination
-    crops = query.offset(skip).limit(limit).all()
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, CROP_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(Crop, field_names, total, rows)
+    
+    # Apply pagination; history is part of every result, load it for the whole page in one query
+    crops = query.options(selectinload(CropModel.history)).offset(skip).limit(limit).all()
     
-    return CropList(total=total, results=crops)
+    return model_response(CropList, {"total": total, "results": crops})
 
 
 @router.post("/", response_model=Crop, status_code=status.HTTP_201_CREATED)
@@ -417,20 +433,17 @@ def delete_crop(
     """
     Delete a crop and its history.
     """
-    crop = db.query(CropModel).filter(CropModel.id == crop_id).first()
+    crop = db.query(CropModel.id).filter(CropModel.id == crop_id).first()
     if not crop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Crop not found"
         )
     
-    # Delete associated history entries first to avoid foreign key constraints
-    db.query(CropHistoryEntryModel).filter(CropHistoryEntryModel.crop_id == crop_id).delete()
-    
-    # Now delete the crop
-    db.delete(crop)
+    # History, archived history and the container summary in one transaction
+    paths = delete_crop_rows(db.connection(), crop_id)
     db.commit()
-    
+    remove_files(paths)
 
 
 @router.post("/{crop_id}/history", response_model=CropHistoryEntry)
@@ -489,4 +502,5 @@ def get_crop_history(
         CropHistoryEntryModel.crop_id == crop_id
     ).order_by(CropHistoryEntryModel.timestamp.desc()).all()
     
-    return history
+    # Entries past the retention period are archived; they are older than all the others
+    return history + list(archived_rows(db.connection(), CROP_HISTORY_ARCHIVE, crop_id))
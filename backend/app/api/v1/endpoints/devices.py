@@ -5,12 +5,17 @@ from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.models.enums import DeviceStatus
 from app.schemas.device import Device, DeviceCreate, DeviceUpdate, DeviceList, DeviceStats
+from app.utils.fieldsets import column_fields, parse_fields, select_fields, sparse_response
+from app.utils.serialization import NegotiatedRoute
 
 from app.models.models import Device as DeviceModel
 from app.models.models import Container as ContainerModel
-from sqlalchemy import func
+from app.models.models import ContainerSummary as ContainerSummaryModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Fields available to sparse fieldsets
+DEVICE_FIELDS = column_fields(DeviceModel, Device)
 
 
 @router.get("/", response_model=DeviceList)
@@ -21,7 +26,8 @@ def list_devices(
     limit: int = 100,
     container_id: Optional[str] = None,
     status: Optional[DeviceStatus] = None,
-    name: Optional[str] = None
+    name: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List devices with optional filtering.
@@ -31,7 +37,9 @@ def list_devices(
     - **container_id**: Filter by container ID
     - **status**: Filter by device status
     - **name**: Filter by device name (partial match)
+    - **fields**: Comma separated fields to return, e.g. id,name,status (all if omitted)
     """
+    field_names = parse_fields(fields, DEVICE_FIELDS)
     query = db.query(DeviceModel)
     
     # Apply filters
@@ -45,6 +53,11 @@ def list_devices(
     # Get total count before pagination
     total = query.count()
     
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, DEVICE_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(Device, field_names, total, rows)
+    
     # Apply pagination
     devices = query.offset(skip).limit(limit).all()
     
@@ -120,32 +133,16 @@ def get_device_stats(
             detail="Container not found"
         )
     
-    # Get counts by status
-    running_count = db.query(func.count(DeviceModel.id)).filter(
-        DeviceModel.container_id == container_id,
-        DeviceModel.status == DeviceStatus.RUNNING
-    ).scalar()
-    
-    idle_count = db.query(func.count(DeviceModel.id)).filter(
-        DeviceModel.container_id == container_id,
-        DeviceModel.status == DeviceStatus.IDLE
-    ).scalar()
-    
-    issue_count = db.query(func.count(DeviceModel.id)).filter(
-        DeviceModel.container_id == container_id,
-        DeviceModel.status == DeviceStatus.ISSUE
-    ).scalar()
-    
-    offline_count = db.query(func.count(DeviceModel.id)).filter(
-        DeviceModel.container_id == container_id,
-        DeviceModel.status == DeviceStatus.OFFLINE
-    ).scalar()
+    # Get counts by status from the materialized container summary
+    summary = db.query(ContainerSummaryModel).filter(ContainerSummaryModel.container_id == container_id).first()
+    if not summary:
+        return DeviceStats(running_count=0, idle_count=0, issue_count=0, offline_count=0)
     
     return DeviceStats(
-        running_count=running_count,
-        idle_count=idle_count,
-        issue_count=issue_count,
-        offline_count=offline_count
+        running_count=summary.devices_running,
+        idle_count=summary.devices_idle,
+        issue_count=summary.devices_issue,
+        offline_count=summary.devices_offline
     )
 
 
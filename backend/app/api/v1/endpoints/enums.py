@@ -0,0 +1,26 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter
+
+from app.models.enum_codes import ENUM_CODES
+from app.utils.msgpack import enum_codes
+from app.utils.serialization import NegotiatedRoute
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+@router.get("/", response_model=Dict[str, List[Optional[str]]])
+def list_enum_codes() -> Any:
+    """
+    List the values of every enum used by the API, by enum name.
+
+    MessagePack responses encode enum values as their position in these lists.
+    Positions are stable; codes of removed values are null.
+    """
+    result = {}
+    for enum_type in ENUM_CODES:
+        codes = enum_codes(enum_type)
+        values = [None] * (max(codes.values()) + 1)
+        for member, code in codes.items():
+            values[code] = member.value
+        result[enum_type.__name__] = values
+    return result
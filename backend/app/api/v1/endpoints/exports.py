@@ -0,0 +1,317 @@
+import csv
+import heapq
+import io
+import json
+import math
+from array import array
+from datetime import date, datetime, timedelta
+from enum import Enum
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Integer, cast, func, or_, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.database.database import get_db
+from app.database.metric_chunks import cold_snapshots
+from app.database.metric_segments import historical_columns
+from app.models.enums import ExportFormat, SnapshotMetric
+from app.utils.npz import write_npz
+from app.utils.serialization import NegotiatedRoute
+
+from app.models.models import Container as ContainerModel
+from app.models.models import Crop as CropModel
+from app.models.models import CropHistoryEntry as CropHistoryEntryModel
+from app.models.models import ActivityLog as ActivityLogModel
+from app.models.models import MetricSnapshot as MetricSnapshotModel
+from app.models.models import Tray as TrayModel
+from app.models.models import Panel as PanelModel
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Rows fetched per round trip and written per chunk
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _encode_ndjson(columns: List[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_value, row)))) + "\n"
+        for row in rows
+    )
+
+
+def export_rows(
+    engine: Engine,
+    statement: Select,
+    export_format: ExportFormat,
+    merge_rows: Optional[Callable[[Connection], Iterable[Sequence[Any]]]] = None,
+    merge_key: Optional[Callable[[Sequence[Any]], Any]] = None
+) -> Iterator[str]:
+    """
+    Run `statement` with a streaming cursor and yield it encoded, one chunk per batch.
+
+    `merge_rows` adds rows from outside the statement, with the same columns
+    and in the same order by `merge_key`. Uses its own connection: the
+    request's session is closed once the response starts, while the body is
+    still being written.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(statement)
+        columns = list(result.keys())
+        batches = result.partitions()
+        if merge_rows is not None:
+            merged = heapq.merge(merge_rows(connection), chain.from_iterable(batches), key=merge_key)
+            batches = iter(lambda: list(islice(merged, EXPORT_BATCH_SIZE)), [])
+        if export_format == ExportFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(columns)
+            for rows in batches:
+                writer.writerows([map(_value, row) for row in rows])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            # Header of an empty export
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for rows in batches:
+                yield _encode_ndjson(columns, rows)
+
+
+def export_response(
+    db: Session,
+    statement: Select,
+    export_format: ExportFormat,
+    filename: str,
+    merge_rows: Optional[Callable[[Connection], Iterable[Sequence[Any]]]] = None,
+    merge_key: Optional[Callable[[Sequence[Any]], Any]] = None
+) -> StreamingResponse:
+    return StreamingResponse(
+        export_rows(db.get_bind(), statement, export_format, merge_rows, merge_key),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    )
+
+
+def get_container_or_404(db: Session, container_id: str) -> ContainerModel:
+    container = db.query(ContainerModel).filter(ContainerModel.id == container_id).first()
+    if not container:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Container not found"
+        )
+    return container
+
+
+def container_crops_filter(container_id: str):
+    """Crops are in a container through their tray or panel."""
+    return or_(
+        CropModel.tray_id.in_(select(TrayModel.id).where(TrayModel.container_id == container_id)),
+        CropModel.panel_id.in_(select(PanelModel.id).where(PanelModel.container_id == container_id))
+    )
+
+
+@router.get("/containers/{container_id}/snapshots")
+def export_metric_snapshots(
+    *,
+    db: Session = Depends(get_db),
+    container_id: str,
+    format: ExportFormat = ExportFormat.NDJSON,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> StreamingResponse:
+    """
+    Export the metric snapshots of a container, oldest first.
+
+    - **format**: ndjson (one JSON object per line) or csv
+    - **start_date**: Optional start date for filtering
+    - **end_date**: Optional end date for filtering
+    """
+    get_container_or_404(db, container_id)
+
+    statement = select(MetricSnapshotModel.__table__).where(MetricSnapshotModel.container_id == container_id)
+
+    # Apply date filters if provided
+    if start_date:
+        statement = statement.where(MetricSnapshotModel.timestamp >= start_date)
+    if end_date:
+        statement = statement.where(MetricSnapshotModel.timestamp <= end_date)
+
+    statement = statement.order_by(MetricSnapshotModel.timestamp)
+
+    # Snapshots older than a week are compacted into chunks; the end date is inclusive
+    cold_end = end_date + timedelta(microseconds=1) if end_date else None
+    return export_response(
+        db, statement, format, f"{container_id}-snapshots",
+        merge_rows=lambda connection: cold_snapshots(connection, [container_id], start_date, cold_end),
+        merge_key=lambda row: row.timestamp
+    )
+
+
+@router.get("/containers/{container_id}/snapshots.npz")
+def export_metric_snapshot_columns(
+    *,
+    db: Session = Depends(get_db),
+    container_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    metrics: Optional[List[SnapshotMetric]] = Query(None),
+    compress: bool = False
+) -> Response:
+    """
+    Export the metric snapshots of a container as columns, in a NumPy `.npz` archive.
+
+    - **start_date**: Optional start date for filtering
+    - **end_date**: Optional end date for filtering
+    - **metrics**: Optional metrics to include (all metrics if omitted)
+    - **compress**: Deflate the archive; smaller, but slower to write and load
+
+    The archive holds a `timestamp` int64 array (microseconds since the Unix epoch,
+    UTC) and one float64 array per metric, NaN where a snapshot has no value, all
+    oldest first. Load it with `numpy.load` or `pandas.DataFrame(dict(numpy.load(f)))`.
+    """
+    get_container_or_404(db, container_id)
+
+    filters = [MetricSnapshotModel.container_id == container_id]
+
+    # Apply date filters if provided
+    if start_date:
+        filters.append(MetricSnapshotModel.timestamp >= start_date)
+    if end_date:
+        filters.append(MetricSnapshotModel.timestamp <= end_date)
+
+    # Epoch microseconds computed by SQLite from the stored text, rather than parsing datetimes
+    # row by row; the fraction is absent when it is zero
+    epoch_microseconds = (
+        cast(func.strftime("%s", MetricSnapshotModel.timestamp), Integer) * 1000000
+        + cast(func.substr(MetricSnapshotModel.timestamp, 21, 6), Integer)
+    )
+
+    metrics = list(dict.fromkeys(metrics or SnapshotMetric))
+    names = ["timestamp"] + [metric.value for metric in metrics]
+    columns = {"timestamp": array("q"), **{metric.value: array("d") for metric in metrics}}
+    # One query for all columns, so they describe the same rows, in (container_id, timestamp) index order
+    result = db.execute(
+        select(epoch_microseconds, *(getattr(MetricSnapshotModel, metric.value) for metric in metrics))
+        .where(*filters).order_by(MetricSnapshotModel.timestamp)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for partition in result.partitions():
+        for name, values in zip(names, zip(*partition)):
+            if name != "timestamp":
+                # SQLite has no NaN, missing values come back as None
+                values = [math.nan if value is None else value for value in values]
+            columns[name].extend(values)
+
+    # Snapshots older than a week are compacted, sliced from the segment file into columns
+    cold_end = end_date + timedelta(microseconds=1) if end_date else None
+    cold_timestamps, cold_values = historical_columns(db.connection(), container_id, start_date, cold_end, metrics)
+    if cold_timestamps:
+        timestamps = cold_timestamps + columns["timestamp"]
+        merged = {"timestamp": timestamps}
+        for metric in metrics:
+            merged[metric.value] = cold_values[metric] + columns[metric.value]
+        if columns["timestamp"] and columns["timestamp"][0] < cold_timestamps[-1]:
+            # Snapshots that arrived late for a compacted day
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            merged = {name: array(values.typecode, map(values.__getitem__, order)) for name, values in merged.items()}
+        columns = merged
+
+    return Response(
+        content=write_npz(columns, compress=compress),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{container_id}-snapshots.npz"'}
+    )
+
+
+@router.get("/containers/{container_id}/crops")
+def export_crops(
+    *,
+    db: Session = Depends(get_db),
+    container_id: str,
+    format: ExportFormat = ExportFormat.NDJSON
+) -> StreamingResponse:
+    """
+    Export the crops in a container's trays and panels, by seed date.
+
+    - **format**: ndjson (one JSON object per line) or csv
+    """
+    get_container_or_404(db, container_id)
+
+    statement = (
+        select(CropModel.__table__)
+        .where(container_crops_filter(container_id))
+        .order_by(CropModel.seed_date, CropModel.id)
+    )
+    return export_response(db, statement, format, f"{container_id}-crops")
+
+
+@router.get("/containers/{container_id}/crop-history")
+def export_crop_history(
+    *,
+    db: Session = Depends(get_db),
+    container_id: str,
+    format: ExportFormat = ExportFormat.NDJSON
+) -> StreamingResponse:
+    """
+    Export the history entries of the crops in a container, oldest first.
+
+    - **format**: ndjson (one JSON object per line) or csv
+    """
+    get_container_or_404(db, container_id)
+
+    statement = (
+        select(CropHistoryEntryModel.__table__)
+        .where(CropHistoryEntryModel.crop_id.in_(
+            select(CropModel.id).where(container_crops_filter(container_id))
+        ))
+        .order_by(CropHistoryEntryModel.timestamp, CropHistoryEntryModel.id)
+    )
+    return export_response(db, statement, format, f"{container_id}-crop-history")
+
+
+@router.get("/containers/{container_id}/activity")
+def export_activity_logs(
+    *,
+    db: Session = Depends(get_db),
+    container_id: str,
+    format: ExportFormat = ExportFormat.NDJSON,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> StreamingResponse:
+    """
+    Export the activity log of a container, oldest first.
+
+    - **format**: ndjson (one JSON object per line) or csv
+    - **start_date**: Optional start date for filtering
+    - **end_date**: Optional end date for filtering
+    """
+    get_container_or_404(db, container_id)
+
+    statement = select(ActivityLogModel.__table__).where(ActivityLogModel.container_id == container_id)
+
+    # Apply date filters if provided
+    if start_date:
+        statement = statement.where(ActivityLogModel.timestamp >= start_date)
+    if end_date:
+        statement = statement.where(ActivityLogModel.timestamp <= end_date)
+
+    statement = statement.order_by(ActivityLogModel.timestamp)
+    return export_response(db, statement, format, f"{container_id}-activity")
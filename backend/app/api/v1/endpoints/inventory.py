@@ -8,12 +8,18 @@ from app.schemas.inventory import (
     Tray, TrayCreate, TrayUpdate, TrayList,
     Panel, PanelCreate, PanelUpdate, PanelList
 )
+from app.utils.fieldsets import column_fields, parse_fields, select_fields, sparse_response
+from app.utils.serialization import NegotiatedRoute, model_response
 
 from app.models.models import Tray as TrayModel
 from app.models.models import Panel as PanelModel
 from app.models.models import Container as ContainerModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Fields available to sparse fieldsets
+TRAY_FIELDS = column_fields(TrayModel, Tray)
+PANEL_FIELDS = column_fields(PanelModel, Panel)
 
 # --------------------- TRAY ENDPOINTS ---------------------
 
@@ -25,7 +31,8 @@ def list_trays(
     limit: int = 100,
     container_id: Optional[str] = None,
     shelf: Optional[ShelfPosition] = None,
-    status: Optional[InventoryStatus] = None
+    status: Optional[InventoryStatus] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List trays with optional filtering.
@@ -35,7 +42,9 @@ def list_trays(
     - **container_id**: Filter by container ID
     - **shelf**: Filter by shelf position (Upper or Lower)
     - **status**: Filter by inventory status
+    - **fields**: Comma separated fields to return, e.g. id,rfid_tag,status (all if omitted)
     """
+    field_names = parse_fields(fields, TRAY_FIELDS)
     query = db.query(TrayModel)
     
     # Apply filters
@@ -49,10 +58,15 @@ def list_trays(
     # Get total count before pagination
     total = query.count()
     
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, TRAY_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(Tray, field_names, total, rows)
+    
     # Apply pagination
     trays = query.offset(skip).limit(limit).all()
     
-    return TrayList(total=total, results=trays)
+    return model_response(TrayList, {"total": total, "results": trays})
 
 
 @router.post("/trays", response_model=Tray, status_code=status.HTTP_201_CREATED)
@@ -197,7 +211,8 @@ def list_panels(
     limit: int = 100,
     container_id: Optional[str] = None,
     wall: Optional[WallPosition] = None,
-    status: Optional[InventoryStatus] = None
+    status: Optional[InventoryStatus] = None,
+    fields: Optional[str] = None
 ) -> Any:
     """
     List panels with optional filtering.
@@ -207,7 +222,9 @@ def list_panels(
     - **container_id**: Filter by container ID
     - **wall**: Filter by wall position (Wall 1, Wall 2, Wall 3, Wall 4)
     - **status**: Filter by inventory status
+    - **fields**: Comma separated fields to return, e.g. id,rfid_tag,status (all if omitted)
     """
+    field_names = parse_fields(fields, PANEL_FIELDS)
     query = db.query(PanelModel)
     
     # Apply filters
@@ -221,10 +238,15 @@ def list_panels(
     # Get total count before pagination
     total = query.count()
     
+    # Only SELECT the requested fields
+    if field_names:
+        rows = select_fields(query, PANEL_FIELDS, field_names).offset(skip).limit(limit).all()
+        return sparse_response(Panel, field_names, total, rows)
+    
     # Apply pagination
     panels = query.offset(skip).limit(limit).all()
     
-    return PanelList(total=total, results=panels)
+    return model_response(PanelList, {"total": total, "results": panels})
 
 
 @router.post("/panels", response_model=Panel, status_code=status.HTTP_201_CREATED)
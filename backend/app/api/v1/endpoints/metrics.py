@@ -1,18 +1,63 @@
-from typing import Any, List, Optional
+import heapq
+import zlib
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.database.database import get_db
-from app.schemas.metrics import MetricSnapshot, MetricCreate, MetricResponse, MetricTimeRange
+from app.database.metric_chunks import cold_snapshots, count_cold_snapshots
+from app.database.metric_query import BUCKET_SECONDS, align_series, query_metrics, range_digests
+from app.schemas.metrics import (
+    MetricSnapshot, MetricCreate, MetricResponse, MetricTimeRange, LatestMetricsList,
+    MetricQueryPoint, MetricQuerySeries, MetricQueryResult, MetricComparison, ComparedContainer,
+    MetricPercentiles, MetricPercentileResult
+)
 
 from app.models.models import MetricSnapshot as MetricSnapshotModel
 from app.models.models import Container as ContainerModel
 from app.models.models import Crop as CropModel
-from app.models.enums import CropLifecycleStatus
+from app.models.models import ContainerSummary as ContainerSummaryModel
+from app.models.models import ContainerLatestMetrics as ContainerLatestMetricsModel
+from app.models.enums import (
+    ContainerType, CropLifecycleStatus, MetricAggregation, MetricBucket, SnapshotMetric
+)
+from app.utils.alert_rules import alert_rule_engine
+from app.utils.broker import broker
+from app.utils.downsampling import lttb
+from app.utils.serialization import NegotiatedRoute
+from app.utils.singleflight import coalesce
+from app.api.v1.endpoints.alerts import publish_alert
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Rows fetched per round trip when streaming snapshots
+SNAPSHOT_BATCH_SIZE = 1000
+
+# Maximum number of buckets per series in /metrics/query and /metrics/compare
+MAX_QUERY_BUCKETS = 5000
+
+# Maximum number of containers in one comparison
+MAX_COMPARED_CONTAINERS = 100
+
+# crop_counts keys and the container summary counters they are read from
+CROP_COUNT_COLUMNS = {
+    "seeded": ContainerSummaryModel.crops_seeded,
+    "transplanted": ContainerSummaryModel.crops_transplanted,
+    "harvested": ContainerSummaryModel.crops_harvested,
+}
+
+
+def get_crop_counts(db: Session, container_id: str) -> Dict[str, int]:
+    """Crop counts by lifecycle status from the materialized container summary."""
+    row = db.query(*CROP_COUNT_COLUMNS.values()).filter(
+        ContainerSummaryModel.container_id == container_id
+    ).first()
+    if row is None:
+        return dict.fromkeys(CROP_COUNT_COLUMNS, 0)
+    return dict(zip(CROP_COUNT_COLUMNS, row))
 
 
 @router.post("/snapshots", response_model=MetricSnapshot, status_code=status.HTTP_201_CREATED)
@@ -48,13 +93,260 @@ def create_metric_snapshot(
     )
     
     db.add(db_metric)
+
+    # Evaluate alert rules against the new snapshot in the same transaction
+    rule_evaluation = alert_rule_engine.evaluate(db, container, db_metric)
+
     db.commit()
+    # Rule states only follow the alerts once they are committed
+    alert_rule_engine.apply(rule_evaluation)
     db.refresh(db_metric)
+
+    # Notify live subscribers; slow clients only need the latest snapshot per container
+    if broker.has_subscribers(db_metric.container_id):
+        broker.publish(
+            db_metric.container_id,
+            "metric_snapshot",
+            MetricSnapshot.model_validate(db_metric),
+            coalesce_key=f"metric_snapshot:{db_metric.container_id}"
+        )
+    for alert, event in rule_evaluation.changes:
+        publish_alert(alert, event)
     
     return db_metric
 
 
+def filter_containers(
+    db: Session,
+    container_ids: Optional[List[str]],
+    tenant_id: Optional[str],
+    type: Optional[ContainerType]
+):
+    """Container IDs (a list or a select) matching all given filters, None for all containers."""
+    if tenant_id is None and type is None:
+        return container_ids or None
+    query = db.query(ContainerModel.id)
+    
+    # Apply filters
+    if tenant_id is not None:
+        query = query.filter(ContainerModel.tenant_id == tenant_id)
+    if type is not None:
+        query = query.filter(ContainerModel.type == type)
+    if container_ids:
+        query = query.filter(ContainerModel.id.in_(container_ids))
+    return query.statement
+
+
+@router.get("/query", response_model=MetricQueryResult, response_model_exclude_none=True)
+def query_metric_series(
+    *,
+    db: Session = Depends(get_db),
+    metrics: List[SnapshotMetric] = Query(...),
+    start: datetime,
+    end: datetime,
+    bucket: MetricBucket = MetricBucket.HOUR,
+    aggregations: List[MetricAggregation] = Query([MetricAggregation.AVG]),
+    container_ids: Optional[List[str]] = Query(None),
+    tenant_id: Optional[str] = None,
+    type: Optional[ContainerType] = None
+) -> Any:
+    """
+    Aggregate metrics per container into time buckets.
+    
+    - **metrics**: Metrics to aggregate
+    - **start**: Start of the time range (inclusive)
+    - **end**: End of the time range (exclusive)
+    - **bucket**: Bucket size (minute, hour, day, week, month); weeks start on Monday
+    - **aggregations**: Aggregations per bucket (avg, min, max, sum, count, p5, p50, p95)
+    - **container_ids**: Optional containers to include
+    - **tenant_id**: Optional tenant whose containers to include
+    - **type**: Optional container type to include
+    
+    Without container filters all containers are included. Hourly and daily
+    rollups are used when the time range is aligned to the rollup resolution,
+    with percentiles estimated from their quantile sketches; otherwise the raw
+    snapshots are aggregated. Buckets without values are left out.
+    """
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    if (end - start).total_seconds() / BUCKET_SECONDS[bucket] > MAX_QUERY_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many buckets, use a larger bucket size (at most {MAX_QUERY_BUCKETS} per series)"
+        )
+    
+    container_filter = filter_containers(db, container_ids, tenant_id, type)
+    
+    # Remove duplicates but keep the requested order
+    metrics = list(dict.fromkeys(metrics))
+    aggregations = list(dict.fromkeys(aggregations))
+    rollup, series = query_metrics(db, container_filter, metrics, bucket, start, end, aggregations)
+    
+    return MetricQueryResult(
+        bucket=bucket,
+        start=start,
+        end=end,
+        aggregations=aggregations,
+        source=rollup.value if rollup else "raw",
+        series=[
+            MetricQuerySeries(
+                container_id=item.container_id,
+                metric=item.metric,
+                points=[
+                    MetricQueryPoint(
+                        timestamp=timestamp,
+                        **{aggregation.value: value for aggregation, value in values.items()}
+                    )
+                    for timestamp, values in item.points
+                ]
+            )
+            for item in series
+        ]
+    )
+
+
+@router.get("/percentiles", response_model=MetricPercentiles)
+def get_metric_percentiles(
+    *,
+    db: Session = Depends(get_db),
+    metrics: List[SnapshotMetric] = Query(...),
+    start: datetime,
+    end: datetime,
+    percentiles: List[float] = Query([5, 50, 95]),
+    container_ids: Optional[List[str]] = Query(None),
+    tenant_id: Optional[str] = None,
+    type: Optional[ContainerType] = None
+) -> Any:
+    """
+    Get percentiles of metrics per container over a time range.
+    
+    - **metrics**: Metrics to compute percentiles for
+    - **start**: Start of the time range (inclusive)
+    - **end**: End of the time range (exclusive)
+    - **percentiles**: Percentiles between 0 and 100
+    - **container_ids**: Optional containers to include
+    - **tenant_id**: Optional tenant whose containers to include
+    - **type**: Optional container type to include
+    
+    Whole days and hours of the range are estimated by merging the t-digest
+    sketches of the rollups; only partial hours at the edges read snapshots.
+    """
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    if any(pct < 0 or pct > 100 for pct in percentiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Percentiles must be between 0 and 100"
+        )
+    
+    metrics = list(dict.fromkeys(metrics))
+    container_filter = filter_containers(db, container_ids, tenant_id, type)
+    digests = range_digests(db, container_filter, metrics, start, end)
+    
+    results = []
+    for (container_id, metric), digest in sorted(
+        digests.items(), key=lambda item: (item[0][0], metrics.index(item[0][1]))
+    ):
+        results.append(MetricPercentileResult(
+            container_id=container_id,
+            metric=metric,
+            count=len(digest),
+            min=digest.min,
+            max=digest.max,
+            percentiles={f"{pct:g}": digest.quantile(pct / 100) for pct in percentiles}
+        ))
+    
+    return MetricPercentiles(start=start, end=end, results=results)
+
+
+@router.get("/compare", response_model=MetricComparison)
+def compare_containers(
+    *,
+    db: Session = Depends(get_db),
+    container_ids: List[str] = Query(...),
+    metric: SnapshotMetric,
+    start: datetime,
+    end: datetime,
+    bucket: MetricBucket = MetricBucket.DAY,
+    aggregation: MetricAggregation = MetricAggregation.AVG
+) -> Any:
+    """
+    Compare one metric across containers on common time buckets.
+    
+    - **container_ids**: Containers to compare
+    - **metric**: Metric to compare
+    - **start**: Start of the time range (inclusive)
+    - **end**: End of the time range (exclusive)
+    - **bucket**: Bucket size (minute, hour, day, week, month)
+    - **aggregation**: Aggregation per bucket (avg, min, max, sum, count, p5, p50, p95)
+    
+    Timestamps are returned once; every container has one value per timestamp,
+    null where it has no data in that bucket.
+    """
+    container_ids = list(dict.fromkeys(container_ids))
+    if len(container_ids) > MAX_COMPARED_CONTAINERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_COMPARED_CONTAINERS} containers can be compared"
+        )
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    if (end - start).total_seconds() / BUCKET_SECONDS[bucket] > MAX_QUERY_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many buckets, use a larger bucket size (at most {MAX_QUERY_BUCKETS} per series)"
+        )
+    
+    # Check if containers exist
+    containers = db.query(ContainerModel.id, ContainerModel.name, ContainerModel.type).filter(
+        ContainerModel.id.in_(container_ids)
+    ).all()
+    missing = set(container_ids) - {container.id for container in containers}
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Container not found: {', '.join(sorted(missing))}"
+        )
+    
+    # One range query for all containers, then merged onto common buckets
+    rollup, series = query_metrics(db, container_ids, [metric], bucket, start, end, [aggregation])
+    timestamps, values = align_series(series, aggregation)
+    
+    containers_by_id = {container.id: container for container in containers}
+    return MetricComparison(
+        metric=metric,
+        bucket=bucket,
+        aggregation=aggregation,
+        start=start,
+        end=end,
+        source=rollup.value if rollup else "raw",
+        containers=[
+            ComparedContainer(
+                id=container_id,
+                name=containers_by_id[container_id].name,
+                type=containers_by_id[container_id].type
+            )
+            for container_id in container_ids
+        ],
+        timestamps=timestamps,
+        values={
+            container_id: values.get(container_id, [None] * len(timestamps))
+            for container_id in container_ids
+        }
+    )
+
+
 @router.get("/container/{container_id}", response_model=MetricResponse)
+@coalesce()
 def get_container_metrics(
     *,
     db: Session = Depends(get_db),
@@ -83,26 +375,81 @@ def get_container_metrics(
         print(f"Error getting container {container_id}, using PHYSICAL as default container type")
     
     # Use container ID as a seed for consistent random numbers for this container
-    container_seed = int(container_id.replace("-", "")[0:8], 16) % 10000 if container_id else 1234
+    try:
+        container_seed = int(container_id.replace("-", "")[0:8], 16) % 10000 if container_id else 1234
+    except ValueError:
+        # Not a hex/UUID-style ID
+        container_seed = zlib.crc32(container_id.encode()) % 10000
+    
+    # Crop counts are real; they don't depend on the time range
+    crop_counts = get_crop_counts(db, container_id)
     
     # Generate appropriate mock data based on time range and container type
     if time_range == MetricTimeRange.WEEK:
-        return generate_weekly_container_metrics(container_id, container_type, container_seed)
+        metrics = generate_weekly_container_metrics(container_id, container_type, container_seed, crop_counts)
     elif time_range == MetricTimeRange.MONTH:
-        return generate_monthly_container_metrics(container_id, container_type, container_seed)
+        metrics = generate_monthly_container_metrics(container_id, container_type, container_seed, crop_counts)
     elif time_range == MetricTimeRange.QUARTER:
-        return generate_quarterly_container_metrics(container_id, container_type, container_seed) 
+        metrics = generate_quarterly_container_metrics(container_id, container_type, container_seed, crop_counts)
     else:  # MetricTimeRange.YEAR
-        return generate_yearly_container_metrics(container_id, container_type, container_seed)
+        metrics = generate_yearly_container_metrics(container_id, container_type, container_seed, crop_counts)
+    
+    # Current readings are real where the container has reported them
+    latest = db.get(ContainerLatestMetricsModel, container_id)
+    if latest is not None:
+        if latest.air_temperature is not None:
+            metrics.current_temperature = latest.air_temperature
+        if latest.humidity is not None:
+            metrics.current_humidity = latest.humidity
+        if latest.co2 is not None:
+            metrics.current_co2 = latest.co2
+    
+    return metrics
+
+
+@router.get("/latest", response_model=LatestMetricsList)
+def get_latest_metrics(
+    *,
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = None,
+    container_ids: Optional[List[str]] = Query(None)
+) -> Any:
+    """
+    Get the current readings of all containers.
+    
+    - **tenant_id**: Optional tenant to restrict the containers to
+    - **container_ids**: Optional container IDs to restrict the results to
+    
+    Values are the latest reported value of each metric; containers that never
+    reported a snapshot are not included.
+    """
+    query = db.query(ContainerLatestMetricsModel)
+    
+    # Apply filters
+    if tenant_id is not None:
+        query = query.join(ContainerModel, ContainerModel.id == ContainerLatestMetricsModel.container_id).filter(
+            ContainerModel.tenant_id == tenant_id
+        )
+    if container_ids:
+        query = query.filter(ContainerLatestMetricsModel.container_id.in_(container_ids))
+    
+    results = query.order_by(ContainerLatestMetricsModel.container_id).all()
+    
+    return LatestMetricsList(total=len(results), results=results)
 
 
-def generate_weekly_container_metrics(container_id: str, container_type: str = "PHYSICAL", seed: int = 1234) -> MetricResponse:
+def generate_weekly_container_metrics(
+    container_id: str,
+    container_type: str = "PHYSICAL",
+    seed: int = 1234,
+    crop_counts: Optional[Dict[str, int]] = None
+) -> MetricResponse:
     """Generate mock weekly metrics data for a specific container"""
     import random
     from datetime import datetime, timedelta
     
-    # Seed the random number generator for consistent results
-    random.seed(seed)
+    # Seeded generator for consistent results; the global random module is left alone
+    rng = random.Random(seed)
     
     # Generate data for the last 7 days
     end_date = datetime.utcnow()
@@ -121,7 +468,7 @@ def generate_weekly_container_metrics(container_id: str, container_type: str = "
     yield_data = []
     for i, day in enumerate(days):
         # Add some daily variation with slight upward trend
-        daily_factor = 0.95 + (i * 0.01) + random.uniform(-0.1, 0.1)
+        daily_factor = 0.95 + (i * 0.01) + rng.uniform(-0.1, 0.1)
         yield_data.append({
             "date": day,
             "value": round(base_yield * daily_factor, 1)
@@ -131,7 +478,7 @@ def generate_weekly_container_metrics(container_id: str, container_type: str = "
     space_utilization_data = []
     for i, day in enumerate(days):
         # Add some daily variation with slight upward trend
-        daily_factor = 0.95 + (i * 0.005) + random.uniform(-0.05, 0.05)
+        daily_factor = 0.95 + (i * 0.005) + rng.uniform(-0.05, 0.05)
         space_utilization_data.append({
             "date": day,
             "value": round(base_utilization * daily_factor)
@@ -145,16 +492,13 @@ def generate_weekly_container_metrics(container_id: str, container_type: str = "
     # Generate current metrics with realistic values based on container type
     # Physical containers maintain more stable, optimal conditions
     temp_variance = 1.0 if is_physical else 2.0
-    current_temp = round(21.0 + random.uniform(-temp_variance, temp_variance), 1)
+    current_temp = round(21.0 + rng.uniform(-temp_variance, temp_variance), 1)
     
     humidity_variance = 3 if is_physical else 5
-    current_humidity = round(68.0 + random.uniform(-humidity_variance, humidity_variance), 1)
+    current_humidity = round(68.0 + rng.uniform(-humidity_variance, humidity_variance), 1)
     
     co2_variance = 30 if is_physical else 50
-    current_co2 = round(800.0 + random.uniform(-co2_variance, co2_variance), 1)
-    
-    # Crop counts are higher in physical containers
-    crop_factor = 1.2 if is_physical else 0.8
+    current_co2 = round(800.0 + rng.uniform(-co2_variance, co2_variance), 1)
     
     return MetricResponse(
         yield_data=yield_data,
@@ -165,22 +509,23 @@ def generate_weekly_container_metrics(container_id: str, container_type: str = "
         current_temperature=current_temp,
         current_humidity=current_humidity,
         current_co2=current_co2,
-        crop_counts={
-            "seeded": round(random.randint(20, 30) * crop_factor),
-            "transplanted": round(random.randint(40, 60) * crop_factor),
-            "harvested": round(random.randint(10, 20) * crop_factor)
-        },
+        crop_counts=crop_counts or dict.fromkeys(CROP_COUNT_COLUMNS, 0),
         is_daily=True
     )
 
 
-def generate_monthly_container_metrics(container_id: str, container_type: str = "PHYSICAL", seed: int = 1234) -> MetricResponse:
+def generate_monthly_container_metrics(
+    container_id: str,
+    container_type: str = "PHYSICAL",
+    seed: int = 1234,
+    crop_counts: Optional[Dict[str, int]] = None
+) -> MetricResponse:
     """Generate mock monthly metrics data for a specific container"""
     import random
     from datetime import datetime, timedelta
     
-    # Seed the random number generator for consistent results
-    random.seed(seed)
+    # Seeded generator for consistent results; the global random module is left alone
+    rng = random.Random(seed)
     
     # Generate data for the last 30 days
     end_date = datetime.utcnow()
@@ -204,7 +549,7 @@ def generate_monthly_container_metrics(container_id: str, container_type: str =
         base_yield = base_yield_start + (i * growth_rate)
         
         # Add some random variation
-        daily_factor = 0.9 + random.uniform(0, 0.2)
+        daily_factor = 0.9 + rng.uniform(0, 0.2)
         
         yield_data.append({
             "date": day,
@@ -222,7 +567,7 @@ def generate_monthly_container_metrics(container_id: str, container_type: str =
         
         space_utilization_data.append({
             "date": day,
-            "value": round(min(95, base_utilization * trend_factor + random.randint(-variance, variance)))
+            "value": round(min(95, base_utilization * trend_factor + rng.randint(-variance, variance)))
         })
     
     # Calculate averages and totals
@@ -233,16 +578,13 @@ def generate_monthly_container_metrics(container_id: str, container_type: str =
     # Generate current metrics with realistic values based on container type
     # Physical containers maintain more stable, optimal conditions
     temp_variance = 1.0 if is_physical else 2.0
-    current_temp = round(21.0 + random.uniform(-temp_variance, temp_variance), 1)
+    current_temp = round(21.0 + rng.uniform(-temp_variance, temp_variance), 1)
     
     humidity_variance = 3 if is_physical else 5
-    current_humidity = round(68.0 + random.uniform(-humidity_variance, humidity_variance), 1)
+    current_humidity = round(68.0 + rng.uniform(-humidity_variance, humidity_variance), 1)
     
     co2_variance = 30 if is_physical else 50
-    current_co2 = round(800.0 + random.uniform(-co2_variance, co2_variance), 1)
-    
-    # Crop counts are higher in physical containers
-    crop_factor = 1.2 if is_physical else 0.8
+    current_co2 = round(800.0 + rng.uniform(-co2_variance, co2_variance), 1)
     
     return MetricResponse(
         yield_data=yield_data,
@@ -253,22 +595,23 @@ def generate_monthly_container_metrics(container_id: str, container_type: str =
         current_temperature=current_temp,
         current_humidity=current_humidity,
         current_co2=current_co2,
-        crop_counts={
-            "seeded": round(random.randint(20, 30) * crop_factor),
-            "transplanted": round(random.randint(40, 60) * crop_factor),
-            "harvested": round(random.randint(10, 20) * crop_factor)
-        },
+        crop_counts=crop_counts or dict.fromkeys(CROP_COUNT_COLUMNS, 0),
         is_daily=True
     )
 
 
-def generate_quarterly_container_metrics(container_id: str, container_type: str = "PHYSICAL", seed: int = 1234) -> MetricResponse:
+def generate_quarterly_container_metrics(
+    container_id: str,
+    container_type: str = "PHYSICAL",
+    seed: int = 1234,
+    crop_counts: Optional[Dict[str, int]] = None
+) -> MetricResponse:
     """Generate mock quarterly metrics data for a specific container"""
     import random
     from datetime import datetime, timedelta
     
-    # Seed the random number generator for consistent results
-    random.seed(seed)
+    # Seeded generator for consistent results; the global random module is left alone
+    rng = random.Random(seed)
     
     # Generate data for 13 weeks (a quarter)
     weeks = []
@@ -298,7 +641,7 @@ def generate_quarterly_container_metrics(container_id: str, container_type: str
         variance = 0.3 if is_physical else 0.5
         yield_data.append({
             "date": week,
-            "value": round(random.uniform(base_yield - variance, base_yield + variance), 1)
+            "value": round(rng.uniform(base_yield - variance, base_yield + variance), 1)
         })
     
     # Generate space utilization data with more pronounced upward trend
@@ -311,7 +654,7 @@ def generate_quarterly_container_metrics(container_id: str, container_type: str
         variance = 4 if is_physical else 7
         space_utilization_data.append({
             "date": week,
-            "value": min(98, round(base_utilization + random.randint(-variance, variance)))
+            "value": min(98, round(base_utilization + rng.randint(-variance, variance)))
         })
     
     # Calculate averages and totals
@@ -322,16 +665,13 @@ def generate_quarterly_container_metrics(container_id: str, container_type: str
     # Generate current metrics with realistic values based on container type
     # Physical containers maintain more stable, optimal conditions
     temp_variance = 1.0 if is_physical else 2.0
-    current_temp = round(21.0 + random.uniform(-temp_variance, temp_variance), 1)
+    current_temp = round(21.0 + rng.uniform(-temp_variance, temp_variance), 1)
     
     humidity_variance = 3 if is_physical else 5
-    current_humidity = round(68.0 + random.uniform(-humidity_variance, humidity_variance), 1)
+    current_humidity = round(68.0 + rng.uniform(-humidity_variance, humidity_variance), 1)
     
     co2_variance = 30 if is_physical else 50
-    current_co2 = round(800.0 + random.uniform(-co2_variance, co2_variance), 1)
-    
-    # Crop counts are higher in physical containers
-    crop_factor = 1.2 if is_physical else 0.8
+    current_co2 = round(800.0 + rng.uniform(-co2_variance, co2_variance), 1)
     
     return MetricResponse(
         yield_data=yield_data,
@@ -342,21 +682,22 @@ def generate_quarterly_container_metrics(container_id: str, container_type: str
         current_temperature=current_temp,
         current_humidity=current_humidity,
         current_co2=current_co2,
-        crop_counts={
-            "seeded": round(random.randint(20, 30) * crop_factor),
-            "transplanted": round(random.randint(40, 60) * crop_factor),
-            "harvested": round(random.randint(10, 20) * crop_factor)
-        },
+        crop_counts=crop_counts or dict.fromkeys(CROP_COUNT_COLUMNS, 0),
         is_daily=False
     )
 
 
-def generate_yearly_container_metrics(container_id: str, container_type: str = "PHYSICAL", seed: int = 1234) -> MetricResponse:
+def generate_yearly_container_metrics(
+    container_id: str,
+    container_type: str = "PHYSICAL",
+    seed: int = 1234,
+    crop_counts: Optional[Dict[str, int]] = None
+) -> MetricResponse:
     """Generate mock yearly metrics data for a specific container"""
     import random
     
-    # Seed the random number generator for consistent results
-    random.seed(seed)
+    # Seeded generator for consistent results; the global random module is left alone
+    rng = random.Random(seed)
     
     # Use months for a year
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -408,7 +749,7 @@ def generate_yearly_container_metrics(container_id: str, container_type: str = "
             
         yield_data.append({
             "date": month,
-            "value": round(random.uniform(base_yield - yield_variance, base_yield + yield_variance), 1)
+            "value": round(rng.uniform(base_yield - yield_variance, base_yield + yield_variance), 1)
         })
     
     # Generate space utilization data with seasonal pattern
@@ -424,7 +765,7 @@ def generate_yearly_container_metrics(container_id: str, container_type: str = "
             
         space_utilization_data.append({
             "date": month,
-            "value": random.randint(int(base_utilization) - utilization_variance, int(base_utilization) + utilization_variance)
+            "value": rng.randint(int(base_utilization) - utilization_variance, int(base_utilization) + utilization_variance)
         })
     
     # Calculate averages and totals
@@ -435,16 +776,13 @@ def generate_yearly_container_metrics(container_id: str, container_type: str = "
     # Generate current metrics with realistic values based on container type
     # Physical containers maintain more stable, optimal conditions
     temp_variance = 1.0 if is_physical else 2.0
-    current_temp = round(21.0 + random.uniform(-temp_variance, temp_variance), 1)
+    current_temp = round(21.0 + rng.uniform(-temp_variance, temp_variance), 1)
     
     humidity_variance = 3 if is_physical else 5
-    current_humidity = round(68.0 + random.uniform(-humidity_variance, humidity_variance), 1)
+    current_humidity = round(68.0 + rng.uniform(-humidity_variance, humidity_variance), 1)
     
     co2_variance = 30 if is_physical else 50
-    current_co2 = round(800.0 + random.uniform(-co2_variance, co2_variance), 1)
-    
-    # Crop counts are higher in physical containers
-    crop_factor = 1.2 if is_physical else 0.8
+    current_co2 = round(800.0 + rng.uniform(-co2_variance, co2_variance), 1)
     
     return MetricResponse(
         yield_data=yield_data,
@@ -455,11 +793,7 @@ def generate_yearly_container_metrics(container_id: str, container_type: str = "
         current_temperature=current_temp,
         current_humidity=current_humidity,
         current_co2=current_co2,
-        crop_counts={
-            "seeded": round(random.randint(20, 30) * crop_factor),
-            "transplanted": round(random.randint(40, 60) * crop_factor),
-            "harvested": round(random.randint(10, 20) * crop_factor)
-        },
+        crop_counts=crop_counts or dict.fromkeys(CROP_COUNT_COLUMNS, 0),
         is_daily=False
     )
 
@@ -471,7 +805,9 @@ def get_metric_snapshots(
     container_id: str,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    limit: int = 100
+    limit: int = 100,
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    metric: SnapshotMetric = SnapshotMetric.AIR_TEMPERATURE
 ) -> Any:
     """
     Get raw metric snapshots for a container within a date range.
@@ -479,6 +815,9 @@ def get_metric_snapshots(
     - **start_date**: Optional start date for filtering
     - **end_date**: Optional end date for filtering
     - **limit**: Maximum number of snapshots to return
+    - **points**: Optional number of points to downsample the whole date range to, for charts.
+      Replaces `limit`
+    - **metric**: Metric whose shape is preserved when downsampling; snapshots without it are skipped
     """
     # Check if container exists
     container = db.query(ContainerModel).filter(ContainerModel.id == container_id).first()
@@ -496,7 +835,51 @@ def get_metric_snapshots(
     if end_date:
         query = query.filter(MetricSnapshotModel.timestamp <= end_date)
     
+    # Snapshots older than a week are compacted into chunks; the end date is inclusive
+    cold_end = end_date + timedelta(microseconds=1) if end_date else None
+    
+    if points is not None:
+        connection = db.connection()
+        cold = cold_snapshots(connection, [container_id], start_date, cold_end, [metric])
+        cold_count = count_cold_snapshots(connection, [container_id], start_date, cold_end, metric)
+        return downsample_snapshots(query, points, metric, cold, cold_count)
+    
     # Get the snapshots
     snapshots = query.order_by(MetricSnapshotModel.timestamp.desc()).limit(limit).all()
+    cold = cold_snapshots(db.connection(), [container_id], start_date, cold_end, descending=True)
     
-    return snapshots
+    return list(islice(heapq.merge(snapshots, cold, key=lambda snapshot: snapshot.timestamp, reverse=True), limit))
+
+
+def downsample_snapshots(
+    query,
+    points: int,
+    metric: SnapshotMetric,
+    cold: Iterable[Any],
+    cold_count: int
+) -> List[Any]:
+    """
+    LTTB-downsample the snapshots of `query` and the compacted snapshots `cold`
+    on one metric, newest first like the raw rows. `cold_count` is the number
+    of cold snapshots that have the metric, so `cold` can be streamed too.
+    """
+    column = getattr(MetricSnapshotModel, metric.value)
+    query = query.filter(column.isnot(None))
+    cold = (snapshot for snapshot in cold if getattr(snapshot, metric.value) is not None)
+    count = query.count() + cold_count
+    
+    # Stream in (container_id, timestamp) index order; LTTB only keeps two buckets in memory
+    rows = heapq.merge(
+        cold,
+        query.order_by(MetricSnapshotModel.timestamp.asc()).yield_per(SNAPSHOT_BATCH_SIZE),
+        key=lambda snapshot: snapshot.timestamp
+    )
+    selected = list(lttb(
+        rows,
+        count,
+        points,
+        x=lambda snapshot: snapshot.timestamp.timestamp(),
+        y=lambda snapshot: getattr(snapshot, metric.value)
+    ))
+    selected.reverse()
+    return selected
@@ -9,11 +9,14 @@ from app.models.enums import MetricTimeRange, ContainerType
 
 # Mock data to simulate DB responses
 from app.schemas.metrics import MetricResponse
+from app.utils.serialization import NegotiatedRoute
+from app.utils.singleflight import coalesce
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.get("/")
+@coalesce()
 def get_performance_overview(
     *,
     db: Session = Depends(get_db),
@@ -0,0 +1,118 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.database import get_db
+from app.database.search import build_match_query
+from app.models.enums import SearchResultType
+from app.schemas.search import SearchHit, SearchResults
+from app.utils.serialization import NegotiatedRoute
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Per result type: query returning (id, title, subtitle, rank) ordered by bm25 rank,
+# and query counting all matches for the facet
+SEARCH_QUERIES = {
+    SearchResultType.CONTAINER: (
+        """
+        SELECT c.id, c.name AS title,
+               trim(coalesce(c.location_city, '') || ', ' || coalesce(c.location_country, ''), ', ') AS subtitle,
+               bm25(containers_fts) AS rank
+        FROM containers_fts JOIN containers c ON c.rowid = containers_fts.rowid
+        WHERE containers_fts MATCH :match
+        ORDER BY rank LIMIT :limit
+        """,
+        "SELECT count(*) FROM containers_fts WHERE containers_fts MATCH :match",
+    ),
+    SearchResultType.SEED_TYPE: (
+        """
+        SELECT s.id, s.name AS title, s.variety AS subtitle, bm25(seed_types_fts) AS rank
+        FROM seed_types_fts JOIN seed_types s ON s.rowid = seed_types_fts.rowid
+        WHERE seed_types_fts MATCH :match
+        ORDER BY rank LIMIT :limit
+        """,
+        "SELECT count(*) FROM seed_types_fts WHERE seed_types_fts MATCH :match",
+    ),
+    SearchResultType.TENANT: (
+        """
+        SELECT t.id, t.name AS title, NULL AS subtitle, bm25(tenants_fts) AS rank
+        FROM tenants_fts JOIN tenants t ON t.rowid = tenants_fts.rowid
+        WHERE tenants_fts MATCH :match
+        ORDER BY rank LIMIT :limit
+        """,
+        "SELECT count(*) FROM tenants_fts WHERE tenants_fts MATCH :match",
+    ),
+    # Crops are found through their history entries; keep the best entry per crop.
+    # bm25() can't be used inside an aggregate, so the ranking is materialized first
+    SearchResultType.CROP: (
+        """
+        WITH ranked AS MATERIALIZED (
+            SELECT h.crop_id AS id, h.event AS title, h.notes AS subtitle,
+                   bm25(crop_history_entries_fts) AS rank
+            FROM crop_history_entries_fts
+            JOIN crop_history_entries h ON h.rowid = crop_history_entries_fts.rowid
+            WHERE crop_history_entries_fts MATCH :match
+        )
+        SELECT id, title, subtitle, min(rank) AS rank FROM ranked
+        GROUP BY id ORDER BY rank LIMIT :limit
+        """,
+        """
+        SELECT count(DISTINCT h.crop_id)
+        FROM crop_history_entries_fts
+        JOIN crop_history_entries h ON h.rowid = crop_history_entries_fts.rowid
+        WHERE crop_history_entries_fts MATCH :match
+        """,
+    ),
+}
+
+
+@router.get("/", response_model=SearchResults)
+def search(
+    *,
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1),
+    types: Optional[List[SearchResultType]] = Query(None),
+    limit: int = Query(20, ge=1, le=100)
+) -> Any:
+    """
+    Full-text search across containers, seed types, tenants and crop notes.
+
+    - **q**: Search text; every word is matched as a prefix (e.g. "let but" finds "Lettuce Butterhead")
+    - **types**: Optional result types to search (container, seed_type, tenant, crop)
+    - **limit**: Maximum number of results to return
+
+    Results are ranked by BM25 relevance across all types. Facets contain the
+    total number of matches per type.
+    """
+    match = build_match_query(q)
+    search_types = types or list(SearchResultType)
+    facets = {search_type.value: 0 for search_type in search_types}
+    if match is None:
+        return SearchResults(query=q, total=0, facets=facets, results=[])
+
+    hits = []
+    for search_type in search_types:
+        results_sql, count_sql = SEARCH_QUERIES[search_type]
+        facets[search_type.value] = db.execute(text(count_sql), {"match": match}).scalar()
+        if not facets[search_type.value]:
+            continue
+        rows = db.execute(text(results_sql), {"match": match, "limit": limit})
+        for row in rows:
+            hits.append(SearchHit(
+                type=search_type,
+                id=row.id,
+                title=row.title,
+                subtitle=row.subtitle or None,
+                # bm25() returns lower values for better matches
+                score=round(-row.rank, 4)
+            ))
+
+    hits.sort(key=lambda hit: hit.score, reverse=True)
+
+    return SearchResults(
+        query=q,
+        total=sum(facets.values()),
+        facets=facets,
+        results=hits[:limit]
+    )
@@ -3,10 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.database.database import get_db
+from app.database.search import text_search_filter
 from app.schemas.seed_type import SeedType, SeedTypeCreate, SeedTypeUpdate
+from app.utils.serialization import NegotiatedRoute
 from app.models.models import SeedType as SeedTypeModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.get("/", response_model=List[SeedType])
@@ -24,19 +26,19 @@ def list_seed_types(
     
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
-    - **name**: Filter by seed name (partial match)
-    - **variety**: Filter by variety (partial match)
-    - **supplier**: Filter by supplier (partial match)
+    - **name**: Filter by seed name (word prefix match)
+    - **variety**: Filter by variety (word prefix match)
+    - **supplier**: Filter by supplier (word prefix match)
     """
     query = db.query(SeedTypeModel)
     
-    # Apply filters
+    # Apply filters through the full-text index
     if name:
-        query = query.filter(SeedTypeModel.name.ilike(f"%{name}%"))
+        query = query.filter(text_search_filter("seed_type", name, ["name"], SeedTypeModel.name))
     if variety:
-        query = query.filter(SeedTypeModel.variety.ilike(f"%{variety}%"))
+        query = query.filter(text_search_filter("seed_type", variety, ["variety"], SeedTypeModel.variety))
     if supplier:
-        query = query.filter(SeedTypeModel.supplier.ilike(f"%{supplier}%"))
+        query = query.filter(text_search_filter("seed_type", supplier, ["supplier"], SeedTypeModel.supplier))
     
     # Apply pagination
     seed_types = query.offset(skip).limit(limit).all()
@@ -122,7 +124,7 @@ def delete_seed_type(
     """
     Delete a seed type.
     
-    - This will fail if there are containers using this seed type
+    - This will fail if there are crops or containers using this seed type
     """
     seed_type = db.query(SeedTypeModel).filter(SeedTypeModel.id == seed_type_id).first()
     if not seed_type:
@@ -131,6 +133,13 @@ def delete_seed_type(
             detail="Seed type not found"
         )
     
+    # Crops keep their seed type; the foreign key would reject the delete
+    if seed_type.crops:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cannot delete seed type that is in use by crops"
+        )
+    
     # Check if the seed type is being used by any containers
     if seed_type.containers:
         raise HTTPException(
@@ -0,0 +1,80 @@
+import json
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database.database import get_db
+from app.models.enums import StreamOverflowPolicy
+from app.utils.broker import broker
+from app.utils.serialization import NegotiatedRoute
+
+from app.models.models import Container as ContainerModel
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Seconds between keep-alive comments so proxies don't close idle connections
+HEARTBEAT_INTERVAL = 15.0
+
+# Milliseconds the browser waits before reconnecting
+RETRY_INTERVAL = 3000
+
+
+async def event_stream(
+    container_ids: Optional[List[str]],
+    max_queue: int,
+    policy: StreamOverflowPolicy
+) -> AsyncIterator[str]:
+    """Subscribe to the broker and yield SSE frames until the client disconnects."""
+    subscription = broker.subscribe(container_ids, max_queue=max_queue, policy=policy)
+    try:
+        yield f"retry: {RETRY_INTERVAL}\n\n"
+        while True:
+            message = await subscription.get(HEARTBEAT_INTERVAL)
+            dropped = subscription.take_dropped()
+            if dropped:
+                # Tell the client it fell behind so it can refetch current state
+                yield f"event: dropped\ndata: {json.dumps({'count': dropped})}\n\n"
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield message.frame()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get("/")
+def stream_events(
+    *,
+    db: Session = Depends(get_db),
+    container_ids: Optional[List[str]] = Query(None),
+    max_queue: int = Query(100, ge=1, le=1000),
+    policy: StreamOverflowPolicy = StreamOverflowPolicy.COALESCE
+) -> StreamingResponse:
+    """
+    Stream live metric snapshots and alert events as Server-Sent Events.
+
+    - **container_ids**: Containers to subscribe to (all containers if omitted)
+    - **max_queue**: Maximum number of undelivered events kept for this client
+    - **policy**: What to do when the client falls behind; "coalesce" keeps only the
+      latest metric snapshot per container, "drop_oldest" drops the oldest events
+
+    Events are `metric_snapshot`, `alert_created`, `alert_updated` and `alert_resolved`,
+    each carrying the same JSON as the corresponding REST endpoint. A `dropped` event
+    reports how many events were discarded because the client was too slow.
+    """
+    if container_ids:
+        # Check if containers exist
+        found = db.query(ContainerModel.id).filter(ContainerModel.id.in_(container_ids)).all()
+        missing = set(container_ids) - {row.id for row in found}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Container not found: {', '.join(sorted(missing))}"
+            )
+
+    return StreamingResponse(
+        event_stream(container_ids, max_queue, policy),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -3,11 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.database.database import get_db
+from app.database.search import text_search_filter
 from app.schemas.tenant import Tenant, TenantCreate, TenantUpdate, TenantList
+from app.utils.serialization import NegotiatedRoute
 
 from app.models.models import Tenant as TenantModel
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.get("/", response_model=TenantList)
@@ -23,13 +25,13 @@ def list_tenants(
     
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
-    - **name**: Filter by tenant name (partial match)
+    - **name**: Filter by tenant name (word prefix match)
     """
     query = db.query(TenantModel)
     
     # Apply filters
     if name:
-        query = query.filter(TenantModel.name.ilike(f"%{name}%"))
+        query = query.filter(text_search_filter("tenant", name, ["name"], TenantModel.name))
     
     # Get total count before pagination
     total = query.count()
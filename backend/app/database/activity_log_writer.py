@@ -0,0 +1,194 @@
+"""
+Write-behind buffer for activity log entries.
+
+Writing every activity as its own committed transaction makes frequent
+loggers (automation recording each environment change) contend with readers
+for SQLite's single writer lock. `ActivityLogWriter.log` instead puts the
+entry on a bounded queue and returns at once; a background thread writes the
+queue in batches, one transaction per batch, when `batch_size` entries are
+waiting or `flush_interval` seconds after the oldest one arrived.
+
+Ids and timestamps are assigned when an entry is queued, so callers can
+refer to it right away. When the queue is full, `log` and `log_many` block
+up to `enqueue_timeout` seconds per call for room and then raise
+`ActivityLogQueueFull`, which pushes back on producers instead of growing
+without bound. `flush` writes everything queued so far and waits for it;
+`stop` flushes and ends the thread, and is called on application shutdown.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.database.database import engine as default_engine
+from app.models.enums import ActorType
+from app.models.models import ActivityLog, Container
+from app.utils.activity_types import classify_activity
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "500"))
+ACTIVITY_LOG_FLUSH_SECONDS = float(os.getenv("ACTIVITY_LOG_FLUSH_SECONDS", "1.0"))
+ACTIVITY_LOG_QUEUE_SIZE = int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+ACTIVITY_LOG_ENQUEUE_TIMEOUT = float(os.getenv("ACTIVITY_LOG_ENQUEUE_TIMEOUT", "5.0"))
+
+activity_log_table = ActivityLog.__table__
+container_table = Container.__table__
+
+# Markers queued by flush() to write the current batch right away, and by
+# stop() to end the writer thread after what's ahead of it
+_FLUSH = object()
+_STOP = object()
+_MARKERS = (_FLUSH, _STOP)
+
+
+class ActivityLogQueueFull(Exception):
+    """The write-behind queue stayed full for the whole enqueue timeout."""
+
+    def __init__(self, message: str, queued: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        # Entries of the same call queued before it gave up; they are still written
+        self.queued = queued or []
+
+
+class ActivityLogWriter:
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        batch_size: int = ACTIVITY_LOG_BATCH_SIZE,
+        flush_interval: float = ACTIVITY_LOG_FLUSH_SECONDS,
+        max_queue: int = ACTIVITY_LOG_QUEUE_SIZE,
+        enqueue_timeout: float = ACTIVITY_LOG_ENQUEUE_TIMEOUT
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                self._thread.start()
+
+    def log(
+        self,
+        container_id: str,
+        action_type: str,
+        actor_type: ActorType,
+        actor_id: str,
+        description: str,
+        timestamp: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Queue one entry and return it as it will be stored."""
+        return self.log_many([{
+            "container_id": container_id,
+            "action_type": action_type,
+            "actor_type": actor_type,
+            "actor_id": actor_id,
+            "description": description,
+            "timestamp": timestamp,
+        }])[0]
+
+    def log_many(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Queue entries given as `log` keyword arguments and return them as they will be stored.
+
+        The enqueue timeout applies to the whole call. When it runs out, the
+        raised `ActivityLogQueueFull` carries the entries queued until then.
+        """
+        self.start()
+        deadline = time.monotonic() + self.enqueue_timeout
+        queued = []
+        for fields in entries:
+            entry = {
+                "id": str(uuid.uuid4()),
+                "container_id": fields["container_id"],
+                "timestamp": fields.get("timestamp") or datetime.utcnow(),
+                "action_type": fields["action_type"],
+                "activity_type": classify_activity(fields["action_type"]),
+                "actor_type": fields["actor_type"],
+                "actor_id": fields["actor_id"],
+                "description": fields["description"],
+            }
+            try:
+                self._queue.put(entry, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                raise ActivityLogQueueFull(
+                    f"Activity log queue is full ({self._queue.maxsize} entries)", queued
+                ) from None
+            queued.append(entry)
+        return queued
+
+    def flush(self) -> None:
+        """Block until every entry queued so far has been written (or failed)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def stop(self) -> None:
+        """Write what's queued and end the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join()
+
+    def _next_batch(self) -> List[Any]:
+        """Wait for an entry, then gather more until the batch is full or the interval is over."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while batch[-1] not in _MARKERS and len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        try:
+            with self.engine.begin() as connection:
+                # Containers deleted while their entries were queued would fail the whole batch
+                existing = set(connection.execute(
+                    select(container_table.c.id).where(
+                        container_table.c.id.in_({entry["container_id"] for entry in entries})
+                    )
+                ).scalars())
+                entries = [entry for entry in entries if entry["container_id"] in existing]
+                if entries:
+                    connection.execute(activity_log_table.insert(), entries)
+        except Exception:
+            logger.exception("Failed to write %d activity log entries", len(entries))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            entries = [entry for entry in batch if entry not in _MARKERS]
+            if entries:
+                self._write(entries)
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+
+activity_log_writer = ActivityLogWriter()
+
+
+def get_activity_log_writer() -> ActivityLogWriter:
+    """Dependency returning the application's activity log writer."""
+    return activity_log_writer
@@ -0,0 +1,383 @@
+"""
+Retention for append-only history tables: `activity_logs` and `crop_history_entries`.
+
+Rows older than a table's retention period are moved out of the database
+into compressed NDJSON files, one per table, day and owner (container or
+crop): `<ARCHIVE_DIR>/<table>/<YYYY-MM-DD>/<owner>.ndjson.gz`, so reading
+the history of one owner never decompresses the rest of the fleet. Each run
+appends one gzip member per file it touches, so a file is never rewritten.
+`archive_partitions` records, per owner and day, how many rows were archived
+and their time span. Readers use it to find the files they need, and to
+count rows without opening files when no other filter applies.
+
+Archiving runs as a maintenance job, a bounded number of rows per table and
+run, oldest first. Files are synced to disk before the rows are deleted in
+the same transaction as the partition counts. If that transaction fails
+after a file was appended, the rows are written again by the next run;
+readers drop the duplicate ids.
+
+`archived_rows`, `count_archived_rows` and `continue_page` let list endpoints
+serve archived rows after the hot ones, so history stays queryable through
+the same endpoints while the hot tables stay small. Decoded files are kept
+in a cache bounded by their uncompressed size. Retention is disabled (0 days)
+unless configured.
+"""
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from functools import partial
+from itertools import groupby, islice
+from operator import getitem
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import DateTime, Enum as EnumType, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+
+from app.models.models import ActivityLog, ArchivePartition, CropHistoryEntry
+from app.utils.activity_types import classify_activity
+from app.utils.timestamps import naive_utc
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# Rows moved per table and maintenance run
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "20000"))
+
+# Rows deleted per statement, below SQLite's bound parameter limit
+DELETE_CHUNK_SIZE = 500
+
+# Uncompressed bytes of archive files kept decoded in memory
+ARCHIVE_CACHE_BYTES = int(os.getenv("ARCHIVE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+partition_table = ArchivePartition.__table__
+
+
+class ArchivedTable(NamedTuple):
+    model: Any
+    # Column of the entity the rows belong to, which readers filter on
+    owner: str
+    retention_days: int
+    # Columns computed from the others, filled in where rows or older files lack them
+    derived: Tuple[Tuple[str, Callable[[Dict[str, Any]], Any]], ...] = ()
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+
+ACTIVITY_LOG_ARCHIVE = ArchivedTable(
+    ActivityLog, "container_id", int(os.getenv("ACTIVITY_LOG_RETENTION_DAYS", "0")),
+    derived=(("activity_type", lambda row: classify_activity(row["action_type"])),)
+)
+CROP_HISTORY_ARCHIVE = ArchivedTable(
+    CropHistoryEntry, "crop_id", int(os.getenv("CROP_HISTORY_RETENTION_DAYS", "0"))
+)
+
+ARCHIVED_TABLES = [ACTIVITY_LOG_ARCHIVE, CROP_HISTORY_ARCHIVE]
+
+
+def partition_path(archived: ArchivedTable, day: date, owner_id: str, archive_dir: Optional[str] = None) -> str:
+    return os.path.join(
+        archive_dir or ARCHIVE_DIR, archived.name, day.isoformat(), f"{quote(owner_id, safe='')}.ndjson.gz"
+    )
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        # Like the Enum columns, by member name
+        return value.name
+    return value
+
+
+def _decoders(archived: ArchivedTable) -> Dict[str, Any]:
+    decoders = {}
+    for column in archived.model.__table__.columns:
+        if isinstance(column.type, EnumType) and column.type.enum_class is not None:
+            decoders[column.name] = partial(getitem, column.type.enum_class)
+        elif isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.fromisoformat
+    return decoders
+
+
+def _upsert_partition_statement():
+    statement = insert(partition_table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[partition_table.c.table_name, partition_table.c.owner_id, partition_table.c.partition_day],
+        set_={
+            "row_count": partition_table.c.row_count + excluded.row_count,
+            "min_timestamp": func.min(partition_table.c.min_timestamp, excluded.min_timestamp),
+            "max_timestamp": func.max(partition_table.c.max_timestamp, excluded.max_timestamp),
+        }
+    )
+
+
+UPSERT_PARTITION = _upsert_partition_statement()
+
+
+def _with_derived(archived: ArchivedTable, row: Dict[str, Any]) -> Dict[str, Any]:
+    for name, derive in archived.derived:
+        if row.get(name) is None:
+            row[name] = derive(row)
+    return row
+
+
+def _append_partition(archived: ArchivedTable, path: str, rows: List[Dict[str, Any]]) -> None:
+    lines = "".join(
+        json.dumps({name: _encode(value) for name, value in _with_derived(archived, dict(row)).items()}) + "\n"
+        for row in rows
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as archive_file:
+        archive_file.write(gzip.compress(lines.encode("utf-8")))
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+
+
+def archive_rows(
+    connection: Connection,
+    archived: ArchivedTable,
+    now: Optional[datetime] = None,
+    limit: int = ARCHIVE_BATCH_SIZE,
+    archive_dir: Optional[str] = None
+) -> int:
+    """
+    Move up to `limit` rows older than the retention period into the archive, oldest first.
+
+    The cutoff is midnight, so only whole days are archived. Returns the number of moved rows.
+    """
+    if archived.retention_days <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = datetime.combine((now - timedelta(days=archived.retention_days)).date(), time.min)
+    table = archived.model.__table__
+    rows = connection.execute(
+        select(table).where(table.c.timestamp < cutoff).order_by(table.c.timestamp).limit(limit)
+    ).mappings().all()
+    if not rows:
+        return 0
+
+    partitions = []
+    for day, day_rows in groupby(rows, key=lambda row: row["timestamp"].date()):
+        owner_rows = sorted(day_rows, key=lambda row: row[archived.owner])
+        for owner_id, owned in groupby(owner_rows, key=lambda row: row[archived.owner]):
+            owned = list(owned)
+            _append_partition(archived, partition_path(archived, day, owner_id, archive_dir), owned)
+            timestamps = [row["timestamp"] for row in owned]
+            partitions.append({
+                "table_name": archived.name,
+                "owner_id": owner_id,
+                "partition_day": day,
+                "row_count": len(timestamps),
+                "min_timestamp": min(timestamps),
+                "max_timestamp": max(timestamps),
+            })
+    connection.execute(UPSERT_PARTITION, partitions)
+
+    ids = [row["id"] for row in rows]
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        connection.execute(table.delete().where(table.c.id.in_(ids[start:start + DELETE_CHUNK_SIZE])))
+    return len(rows)
+
+
+def drop_archived(
+    connection: Connection,
+    archived: ArchivedTable,
+    owner_ids: Any,
+    archive_dir: Optional[str] = None
+) -> List[str]:
+    """
+    Forget the archived rows of owners (a list or a select of ids) and return
+    their files, to be removed once the transaction has committed. Readers
+    skip partitions whose file is gone.
+    """
+    owned = (partition_table.c.table_name == archived.name, partition_table.c.owner_id.in_(owner_ids))
+    partitions = connection.execute(
+        select(partition_table.c.owner_id, partition_table.c.partition_day).where(*owned)
+    ).all()
+    connection.execute(partition_table.delete().where(*owned))
+    return [partition_path(archived, day, owner_id, archive_dir) for owner_id, day in partitions]
+
+
+def archive_old_rows(connection: Connection) -> int:
+    """Maintenance job: archive expired rows of every table with a retention period."""
+    return sum(archive_rows(connection, archived) for archived in ARCHIVED_TABLES)
+
+
+class PartitionCache:
+    """Decoded archive files, least recently used first, bounded by their uncompressed size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, int], Tuple[int, Tuple[Dict[str, Any], ...]]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Tuple[str, int, int]) -> Optional[Tuple[Dict[str, Any], ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple[str, int, int], size: int, rows: Tuple[Dict[str, Any], ...]) -> None:
+        with self._lock:
+            if key in self._entries or size > self.max_bytes:
+                return
+            self._entries[key] = (size, rows)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+partition_cache = PartitionCache(ARCHIVE_CACHE_BYTES)
+
+
+def _load_partition(archived: ArchivedTable, path: str) -> Tuple[int, Tuple[Dict[str, Any], ...]]:
+    with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+        text = archive_file.read()
+    decoders = _decoders(archived)
+    rows = {}
+    for line in text.splitlines():
+        row = json.loads(line)
+        for name, decode in decoders.items():
+            if row.get(name) is not None:
+                row[name] = decode(row[name])
+        _with_derived(archived, row)
+        # Rows archived twice by a failed run appear twice
+        rows[row["id"]] = row
+    return len(text), tuple(rows.values())
+
+
+def read_partition(
+    archived: ArchivedTable,
+    day: date,
+    owner_id: str,
+    archive_dir: Optional[str] = None
+) -> Tuple[Dict[str, Any], ...]:
+    """All archived rows of one owner and day, decoded. Don't modify them; they are cached."""
+    path = partition_path(archived, day, owner_id, archive_dir)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    # Keyed by modification time and size: appending to a file invalidates it
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    rows = partition_cache.get(key)
+    if rows is None:
+        size, rows = _load_partition(archived, path)
+        partition_cache.put(key, size, rows)
+    return rows
+
+
+def _partitions(
+    connection: Connection,
+    archived: ArchivedTable,
+    owner_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> List[Any]:
+    query = select(partition_table).where(
+        partition_table.c.table_name == archived.name,
+        partition_table.c.owner_id == owner_id
+    )
+    if start:
+        query = query.where(partition_table.c.max_timestamp >= start)
+    if end:
+        query = query.where(partition_table.c.min_timestamp <= end)
+    return connection.execute(query.order_by(partition_table.c.partition_day.desc())).all()
+
+
+def _matching(
+    rows: Iterable[Dict[str, Any]],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    filters: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    return [
+        row for row in rows
+        if (start is None or row["timestamp"] >= start)
+        and (end is None or row["timestamp"] <= end)
+        and all(row[name] == value for name, value in filters.items())
+    ]
+
+
+def archived_rows(
+    connection: Connection,
+    archived: ArchivedTable,
+    owner_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    archive_dir: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Archived rows of one owner, newest first, optionally within a time range
+    and with the given column values. Files are read lazily, one day at a time.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    for partition in _partitions(connection, archived, owner_id, start, end):
+        rows = _matching(
+            read_partition(archived, partition.partition_day, owner_id, archive_dir), start, end, filters or {}
+        )
+        rows.sort(key=lambda row: row["timestamp"], reverse=True)
+        yield from rows
+
+
+def count_archived_rows(
+    connection: Connection,
+    archived: ArchivedTable,
+    owner_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    archive_dir: Optional[str] = None
+) -> int:
+    """Number of rows `archived_rows` yields; only opens files it can't count from the partition table."""
+    start, end = naive_utc(start), naive_utc(end)
+    total = 0
+    for partition in _partitions(connection, archived, owner_id, start, end):
+        within = (
+            (start is None or partition.min_timestamp >= start)
+            and (end is None or partition.max_timestamp <= end)
+        )
+        if within and not filters:
+            total += partition.row_count
+        else:
+            total += len(_matching(
+                read_partition(archived, partition.partition_day, owner_id, archive_dir), start, end, filters or {}
+            ))
+    return total
+
+
+def continue_page(
+    page: List[Any],
+    hot_total: int,
+    skip: int,
+    limit: int,
+    archived: Iterable[Any]
+) -> List[Any]:
+    """
+    Fill up a newest-first page of hot rows with archived rows.
+
+    Archived rows are older than the hot ones, so they follow all `hot_total`
+    hot rows; only as many as the page needs are read.
+    """
+    if len(page) >= limit:
+        return page
+    offset = max(0, skip - hot_total)
+    return page + list(islice(archived, offset, offset + limit - len(page)))
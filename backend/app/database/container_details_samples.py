@@ -5,7 +5,9 @@ This script adds mock data for container details page endpoints.
 from datetime import datetime, timedelta
 import random
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, text
+
+from app.database.database import Base
 
 from app.models.models import (
     Container, Tenant, SeedType, MetricSnapshot, ActivityLog, Crop,
@@ -64,6 +66,14 @@ def create_container_details_samples(db: Session) -> None:
     container = db.query(Container).filter(Container.name == "farm-container-04").first()
     
     if container:
+        if container.id != container_id:
+            # Move the container's rows along with its id; foreign keys are checked at commit
+            db.execute(text("PRAGMA defer_foreign_keys=ON"))
+            for table in Base.metadata.sorted_tables:
+                if "container_id" in table.c:
+                    db.execute(
+                        table.update().where(table.c.container_id == container.id).values(container_id=container_id)
+                    )
         # Update existing container
         container.id = "container-details-04"  # Ensure it has the right ID
         container.type = ContainerType.PHYSICAL
@@ -0,0 +1,221 @@
+"""
+Materialized per-container counters in the `container_summary` table.
+
+After every ORM flush the containers touched by changed alerts, devices,
+crops, trays and panels are collected from the flushed objects (including
+previous values of moved rows) and only their summary rows are recomputed
+with a few grouped queries on the flushing connection, in the same
+transaction. Writes that bypass the ORM unit of work (Core inserts, bulk
+`Query.update()`/`delete()`) are corrected by `reconcile_container_summaries`,
+which the maintenance loop runs periodically.
+"""
+import itertools
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, func, inspect, select, union
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.enums import InventoryStatus
+from app.models.models import Alert, Container, ContainerSummary, Crop, Device, Panel, Tray
+
+logger = logging.getLogger(__name__)
+
+summary_table = ContainerSummary.__table__
+
+COUNTER_COLUMNS = [
+    column.name for column in summary_table.columns
+    if column.name not in ("container_id", "updated_at")
+]
+
+# Attributes whose change can move a counter; other updates are ignored
+TRACKED_ATTRIBUTES = {
+    Alert: ("container_id", "active", "severity"),
+    Device: ("container_id", "status"),
+    Tray: ("container_id", "status"),
+    Panel: ("container_id", "status"),
+    Crop: ("tray_id", "panel_id", "lifecycle_status", "health_check"),
+}
+
+
+def _counter(prefix: str, member) -> str:
+    return f"{prefix}_{member.name.lower()}"
+
+
+def compute_summaries(
+    connection: Connection,
+    container_ids: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, int]]:
+    """Count everything for the given containers, or for all containers."""
+    ids = None if container_ids is None else list(container_ids)
+
+    def scoped(statement, column):
+        return statement if ids is None else statement.where(column.in_(ids))
+
+    container_query = scoped(select(Container.id), Container.id)
+    summaries: Dict[str, Dict[str, int]] = {
+        container_id: dict.fromkeys(COUNTER_COLUMNS, 0)
+        for container_id in connection.execute(container_query).scalars()
+    }
+
+    # Active alerts by severity
+    alerts = scoped(
+        select(Alert.container_id, Alert.severity, func.count())
+        .where(Alert.active.is_(True))
+        .group_by(Alert.container_id, Alert.severity),
+        Alert.container_id
+    )
+    for container_id, severity, count in connection.execute(alerts):
+        if container_id in summaries:
+            summaries[container_id]["active_alerts"] += count
+            summaries[container_id][_counter("active_alerts", severity)] += count
+
+    # Devices by status
+    devices = scoped(
+        select(Device.container_id, Device.status, func.count())
+        .group_by(Device.container_id, Device.status),
+        Device.container_id
+    )
+    for container_id, device_status, count in connection.execute(devices):
+        if container_id in summaries:
+            summaries[container_id][_counter("devices", device_status)] += count
+
+    # Trays and panels, total and in use
+    for model, prefix in ((Tray, "trays"), (Panel, "panels")):
+        inventory = scoped(
+            select(
+                model.container_id,
+                func.count(),
+                func.count().filter(model.status == InventoryStatus.IN_USE)
+            ).group_by(model.container_id),
+            model.container_id
+        )
+        for container_id, total, in_use in connection.execute(inventory):
+            if container_id in summaries:
+                summaries[container_id][f"{prefix}_total"] = total
+                summaries[container_id][f"{prefix}_in_use"] = in_use
+
+    # Crops belong to a container through their tray or their panel, as in the crops listing
+    in_trays = scoped(
+        select(Tray.container_id, Crop.id, Crop.lifecycle_status, Crop.health_check)
+        .join(Tray, Tray.id == Crop.tray_id),
+        Tray.container_id
+    )
+    in_panels = scoped(
+        select(Panel.container_id, Crop.id, Crop.lifecycle_status, Crop.health_check)
+        .join(Panel, Panel.id == Crop.panel_id),
+        Panel.container_id
+    )
+    located = union(in_trays, in_panels).subquery()
+    crops = select(
+        located.c.container_id, located.c.lifecycle_status, located.c.health_check, func.count()
+    ).group_by(located.c.container_id, located.c.lifecycle_status, located.c.health_check)
+    for container_id, lifecycle_status, health_check, count in connection.execute(crops):
+        if container_id in summaries:
+            summaries[container_id][_counter("crops", lifecycle_status)] += count
+            summaries[container_id][_counter("crops", health_check)] += count
+
+    return summaries
+
+
+def write_summaries(connection: Connection, summaries: Dict[str, Dict[str, int]]) -> None:
+    """Upsert summary rows."""
+    if not summaries:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"container_id": container_id, **counters, "updated_at": now}
+        for container_id, counters in summaries.items()
+    ]
+    statement = insert(summary_table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[summary_table.c.container_id],
+        set_={name: statement.excluded[name] for name in COUNTER_COLUMNS + ["updated_at"]}
+    )
+    connection.execute(statement, rows)
+
+
+def refresh_container_summaries(connection: Connection, container_ids: Iterable[str]) -> None:
+    """Recompute the summary rows of the given containers."""
+    container_ids = set(container_ids)
+    if not container_ids:
+        return
+    summaries = compute_summaries(connection, container_ids)
+    write_summaries(connection, summaries)
+    # Containers that no longer exist
+    removed = container_ids - set(summaries)
+    if removed:
+        connection.execute(summary_table.delete().where(summary_table.c.container_id.in_(removed)))
+
+
+def reconcile_container_summaries(connection: Connection) -> int:
+    """
+    Recompute every summary and fix rows that drifted, e.g. after bulk writes.
+
+    Returns the number of rows inserted, corrected or removed.
+    """
+    expected = compute_summaries(connection)
+    existing = {
+        row.container_id: {name: row._mapping[name] for name in COUNTER_COLUMNS}
+        for row in connection.execute(select(summary_table))
+    }
+    stale = {
+        container_id: counters for container_id, counters in expected.items()
+        if existing.get(container_id) != counters
+    }
+    orphaned = set(existing) - set(expected)
+
+    write_summaries(connection, stale)
+    if orphaned:
+        connection.execute(summary_table.delete().where(summary_table.c.container_id.in_(orphaned)))
+    if stale or orphaned:
+        logger.info("Reconciled %d container summaries", len(stale) + len(orphaned))
+    return len(stale) + len(orphaned)
+
+
+def _values(obj, key: str) -> Set:
+    """Current and previous values of an attribute within the flush."""
+    history = inspect(obj).attrs[key].history
+    return {value for value in itertools.chain(history.added, history.unchanged, history.deleted) if value}
+
+
+def _changed(obj, keys) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[key].history.has_changes() for key in keys)
+
+
+@event.listens_for(Session, "after_flush")
+def update_container_summaries(session: Session, flush_context) -> None:
+    container_ids: Set[str] = set()
+    tray_ids: Set[str] = set()
+    panel_ids: Set[str] = set()
+
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Container):
+            container_ids.add(obj.id)
+            continue
+        tracked = TRACKED_ATTRIBUTES.get(type(obj))
+        if tracked is None:
+            continue
+        if obj in session.dirty and not _changed(obj, tracked):
+            continue
+        if isinstance(obj, Crop):
+            tray_ids |= _values(obj, "tray_id")
+            panel_ids |= _values(obj, "panel_id")
+        else:
+            container_ids |= _values(obj, "container_id")
+
+    if not (container_ids or tray_ids or panel_ids):
+        return
+
+    connection = session.connection()
+    if tray_ids or panel_ids:
+        located = union(
+            select(Tray.container_id).where(Tray.id.in_(tray_ids)),
+            select(Panel.container_id).where(Panel.id.in_(panel_ids))
+        )
+        container_ids.update(connection.execute(located).scalars())
+    refresh_container_summaries(connection, container_ids)
@@ -0,0 +1,172 @@
+"""
+Set-based deletion of containers and crops with everything that belongs to them.
+
+Deleting a container through the ORM loads each of its devices, trays,
+panels, alerts, activity log entries and metric snapshots into the session,
+and leaves the tables the ORM doesn't know about (summaries, rollups, chunks,
+archive partitions) behind. Instead every dependent table is cleared with
+one `DELETE ... WHERE container_id IN (...)`, children first:
+
+- crops placed in the container's trays or panels, their history and its
+  archived partitions
+- alerts, alert rules, devices, activity log entries and its archived
+  partitions, metric snapshots, rollups, chunks, latest metrics and the
+  container summary
+- seed type links, trays and panels; containers that copied the
+  environment of a deleted one keep their copy and lose the reference
+
+The foreign keys declare the same cascades (the connection enables them),
+but databases created before they did keep their old constraints, so the
+deletes here don't rely on them.
+
+Archive and segment files are only removed once the rows referencing them
+are committed (`remove_files`). For containers with a large history,
+`delete_container_in_batches` first drains the big tables in short
+transactions, so other writers aren't locked out for the whole delete.
+"""
+import os
+from typing import Any, Iterable, List, Sequence
+
+from sqlalchemy import literal_column, or_, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.database.archive import ACTIVITY_LOG_ARCHIVE, CROP_HISTORY_ARCHIVE, drop_archived
+from app.database.container_summary import refresh_container_summaries
+from app.database.metric_segments import remove_segments
+from app.models.models import (
+    ActivityLog, Alert, AlertRule, Container, ContainerLatestMetrics, ContainerSummary, Crop,
+    CropHistoryEntry, Device, MetricChunk, MetricRollup, MetricSnapshot, Panel, Tray,
+    container_seed_types
+)
+
+# Rows deleted per transaction by delete_container_in_batches
+CONTAINER_DELETE_BATCH_SIZE = int(os.getenv("CONTAINER_DELETE_BATCH_SIZE", "5000"))
+
+container_table = Container.__table__
+crop_table = Crop.__table__
+crop_history_table = CropHistoryEntry.__table__
+
+# Tables with a container_id column, deleted in this order
+CONTAINER_TABLES = [
+    Alert.__table__,
+    AlertRule.__table__,
+    Device.__table__,
+    ActivityLog.__table__,
+    MetricSnapshot.__table__,
+    MetricRollup.__table__,
+    MetricChunk.__table__,
+    ContainerLatestMetrics.__table__,
+    ContainerSummary.__table__,
+    container_seed_types,
+    Tray.__table__,
+    Panel.__table__,
+]
+
+# Tables that grow with a container's history, drained in batches
+HISTORY_TABLES = [
+    ActivityLog.__table__,
+    MetricSnapshot.__table__,
+    MetricRollup.__table__,
+    MetricChunk.__table__,
+    Alert.__table__,
+]
+
+
+def container_crop_ids(container_ids: Sequence[str]):
+    """Select of the crops placed in the containers' trays or panels."""
+    return select(crop_table.c.id).where(or_(
+        crop_table.c.tray_id.in_(select(Tray.id).where(Tray.container_id.in_(container_ids))),
+        crop_table.c.panel_id.in_(select(Panel.id).where(Panel.container_id.in_(container_ids))),
+    ))
+
+
+def delete_crops(connection: Connection, crop_ids: Any) -> List[str]:
+    """
+    Delete crops (a list or a select of ids) with their history.
+
+    Returns the archive files to remove after the commit. Container
+    summaries are left to the caller.
+    """
+    paths = drop_archived(connection, CROP_HISTORY_ARCHIVE, crop_ids)
+    connection.execute(crop_history_table.delete().where(crop_history_table.c.crop_id.in_(crop_ids)))
+    connection.execute(crop_table.delete().where(crop_table.c.id.in_(crop_ids)))
+    return paths
+
+
+def delete_containers(connection: Connection, container_ids: Sequence[str]) -> List[str]:
+    """
+    Delete containers and every row that belongs to them.
+
+    Returns the archive files to remove after the commit.
+    """
+    container_ids = list(container_ids)
+    paths = delete_crops(connection, container_crop_ids(container_ids))
+    paths += drop_archived(connection, ACTIVITY_LOG_ARCHIVE, container_ids)
+    for table in CONTAINER_TABLES:
+        connection.execute(table.delete().where(table.c.container_id.in_(container_ids)))
+    connection.execute(
+        container_table.update()
+        .where(container_table.c.copied_environment_from.in_(container_ids))
+        .values(copied_environment_from=None)
+    )
+    connection.execute(container_table.delete().where(container_table.c.id.in_(container_ids)))
+    return paths
+
+
+def delete_crop(connection: Connection, crop_id: str) -> List[str]:
+    """Delete one crop and update the summary of the container it was placed in."""
+    container_ids = connection.execute(
+        select(Tray.container_id).join(crop_table, crop_table.c.tray_id == Tray.id).where(crop_table.c.id == crop_id)
+        .union(
+            select(Panel.container_id).join(crop_table, crop_table.c.panel_id == Panel.id)
+            .where(crop_table.c.id == crop_id)
+        )
+    ).scalars().all()
+    paths = delete_crops(connection, [crop_id])
+    refresh_container_summaries(connection, container_ids)
+    return paths
+
+
+def remove_files(paths: Iterable[str], container_ids: Sequence[str] = ()) -> None:
+    """Remove archive files and the segment files of deleted containers, after the commit."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if container_ids:
+        remove_segments(container_ids)
+
+
+def _drain(engine: Engine, table, condition, batch_size: int) -> int:
+    rowid = literal_column("rowid")
+    deleted = 0
+    while True:
+        with engine.begin() as connection:
+            result = connection.execute(
+                table.delete().where(rowid.in_(select(rowid).select_from(table).where(condition).limit(batch_size)))
+            )
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def delete_container_in_batches(
+    engine: Engine,
+    container_id: str,
+    batch_size: int = CONTAINER_DELETE_BATCH_SIZE
+) -> int:
+    """
+    Delete a container, its history `batch_size` rows per transaction, the rest at once.
+
+    Readers see the container until the final transaction, and a partly
+    deleted history in between. Returns the number of history rows drained.
+    """
+    crop_ids = container_crop_ids([container_id])
+    drained = _drain(engine, crop_history_table, crop_history_table.c.crop_id.in_(crop_ids), batch_size)
+    for table in HISTORY_TABLES:
+        drained += _drain(engine, table, table.c.container_id == container_id, batch_size)
+    with engine.begin() as connection:
+        paths = delete_containers(connection, [container_id])
+    remove_files(paths, [container_id])
+    return drained
@@ -5,6 +5,7 @@ import random
 from sqlalchemy.orm import Session
 
 from app.database.database import Base, engine, SessionLocal
+from app.database.migrations import run_migrations
 from app.models.models import (
     Container, Tenant, SeedType, Alert, Device, Tray, Panel, 
     Crop, CropHistoryEntry, ActivityLog, MetricSnapshot
@@ -20,8 +21,9 @@ from app.database.container_details_samples import create_container_details_samp
 
 
 def create_tables():
-    """Create all database tables."""
+    """Create all database tables and bring existing ones up to date."""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 
 def populate_sample_data():
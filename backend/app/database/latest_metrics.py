@@ -0,0 +1,107 @@
+"""
+Latest environment readings per container in `container_latest_metrics`.
+
+Every inserted `MetricSnapshot` is upserted into its container's row in the
+same transaction. Snapshots can be partial, so a metric missing from a newer
+snapshot keeps its previous value, and snapshots older than the stored one
+(late arrivals) are ignored. Reading the current values of the whole fleet is
+then a scan of one small row per container instead of a
+"max(timestamp) per container" query over all snapshots.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+
+from app.models.models import ContainerLatestMetrics, MetricSnapshot
+
+latest_table = ContainerLatestMetrics.__table__
+
+METRIC_COLUMNS = [
+    "air_temperature",
+    "humidity",
+    "co2",
+    "yield_kg",
+    "space_utilization_percentage",
+    "nursery_utilization_percentage",
+    "cultivation_utilization_percentage",
+]
+
+
+def _upsert_statement():
+    statement = insert(latest_table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[latest_table.c.container_id],
+        set_={
+            "snapshot_id": excluded.snapshot_id,
+            "timestamp": excluded.timestamp,
+            **{
+                name: func.coalesce(excluded[name], latest_table.c[name])
+                for name in METRIC_COLUMNS
+            },
+        },
+        where=excluded.timestamp >= latest_table.c.timestamp
+    )
+
+
+UPSERT_LATEST = _upsert_statement()
+
+
+def upsert_latest_metrics(connection: Connection, rows: List[Dict[str, Any]]) -> None:
+    """Fold snapshot rows (dicts with container_id, id, timestamp and metrics) into the table."""
+    if not rows:
+        return
+    connection.execute(UPSERT_LATEST, [
+        {
+            "container_id": row["container_id"],
+            "snapshot_id": row["id"],
+            "timestamp": row["timestamp"],
+            **{name: row.get(name) for name in METRIC_COLUMNS},
+        }
+        for row in rows
+    ])
+
+
+@event.listens_for(MetricSnapshot, "after_insert")
+def update_latest_metrics(mapper, connection: Connection, snapshot: MetricSnapshot) -> None:
+    upsert_latest_metrics(connection, [{
+        "container_id": snapshot.container_id,
+        "id": snapshot.id,
+        "timestamp": snapshot.timestamp,
+        **{name: getattr(snapshot, name) for name in METRIC_COLUMNS},
+    }])
+
+
+def rebuild_latest_metrics(connection: Connection) -> int:
+    """
+    Rebuild the whole table from the snapshots, e.g. after Core bulk inserts.
+
+    Takes the latest non-null value of each metric per container. Returns the
+    number of containers.
+    """
+    connection.execute(latest_table.delete())
+    latest = ", ".join(
+        f"(SELECT {name} FROM metric_snapshots s WHERE s.container_id = c.container_id "
+        f"AND {name} IS NOT NULL ORDER BY timestamp DESC LIMIT 1)"
+        for name in METRIC_COLUMNS
+    )
+    result = connection.execute(text(f"""
+        INSERT INTO container_latest_metrics (container_id, snapshot_id, timestamp, {", ".join(METRIC_COLUMNS)})
+        SELECT c.container_id,
+               (SELECT id FROM metric_snapshots s WHERE s.container_id = c.container_id
+                ORDER BY timestamp DESC LIMIT 1),
+               c.timestamp, {latest}
+        FROM (SELECT container_id, max(timestamp) AS timestamp FROM metric_snapshots GROUP BY container_id) c
+    """))
+    return result.rowcount
+
+
+def initialize_latest_metrics(connection: Connection) -> None:
+    """Fill the table for databases that have snapshots from before it existed."""
+    if connection.execute(select(latest_table.c.container_id).limit(1)).first() is not None:
+        return
+    if connection.execute(select(MetricSnapshot.id).limit(1)).first() is None:
+        return
+    rebuild_latest_metrics(connection)
@@ -0,0 +1,105 @@
+"""
+Periodic background maintenance.
+
+Jobs are plain functions taking a database connection; each one runs in its
+own transaction in a worker thread, at its own interval, so a slow job never
+blocks the event loop. The loop is started on application startup and
+cancelled on shutdown.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy.engine import Connection, Engine
+
+from app.database.archive import archive_old_rows
+from app.database.container_summary import reconcile_container_summaries
+from app.database.database import engine as default_engine
+from app.database.metric_chunks import compact_metric_snapshots
+from app.database.metric_rollups import seal_metric_sketches
+from app.database.metric_segments import sync_metric_segments
+
+logger = logging.getLogger(__name__)
+
+# Seconds between loop iterations; jobs run when their own interval has elapsed
+TICK_INTERVAL = 5.0
+
+
+class MaintenanceJob(NamedTuple):
+    name: str
+    interval: float
+    run: Callable[[Connection], object]
+
+
+MAINTENANCE_JOBS: List[MaintenanceJob] = [
+    MaintenanceJob(
+        "reconcile_container_summaries",
+        float(os.getenv("CONTAINER_SUMMARY_RECONCILE_SECONDS", "300")),
+        reconcile_container_summaries,
+    ),
+    MaintenanceJob(
+        "seal_metric_sketches",
+        float(os.getenv("METRIC_SKETCH_SEAL_SECONDS", "60")),
+        seal_metric_sketches,
+    ),
+    MaintenanceJob(
+        "archive_old_rows",
+        float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600")),
+        archive_old_rows,
+    ),
+    MaintenanceJob(
+        "compact_metric_snapshots",
+        float(os.getenv("METRIC_CHUNK_COMPACT_SECONDS", "3600")),
+        compact_metric_snapshots,
+    ),
+    MaintenanceJob(
+        "sync_metric_segments",
+        float(os.getenv("METRIC_SEGMENT_SYNC_SECONDS", "3600")),
+        sync_metric_segments,
+    ),
+]
+
+
+def run_job(engine: Engine, job: MaintenanceJob) -> None:
+    started = time.perf_counter()
+    try:
+        with engine.begin() as connection:
+            result = job.run(connection)
+    except Exception:
+        logger.exception("Maintenance job %s failed", job.name)
+        return
+    logger.debug("Maintenance job %s finished in %.3fs: %s", job.name, time.perf_counter() - started, result)
+
+
+async def maintenance_loop(engine: Engine = default_engine, jobs: Optional[List[MaintenanceJob]] = None) -> None:
+    """Run every job once per interval, the first time one interval after startup."""
+    jobs = MAINTENANCE_JOBS if jobs is None else jobs
+    next_run = {job.name: time.monotonic() + job.interval for job in jobs}
+    while True:
+        await asyncio.sleep(TICK_INTERVAL)
+        for job in jobs:
+            if time.monotonic() >= next_run[job.name]:
+                await asyncio.to_thread(run_job, engine, job)
+                next_run[job.name] = time.monotonic() + job.interval
+
+
+_task: Optional[asyncio.Task] = None
+
+
+def start_maintenance() -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.get_running_loop().create_task(maintenance_loop())
+
+
+async def stop_maintenance() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,281 @@
+"""
+Compressed storage for cold metric snapshots in `metric_chunks`.
+
+A snapshot row costs about 150 bytes in SQLite, most of it the UUID key and
+the per-row overhead. Snapshots older than `METRIC_SNAPSHOT_COLD_DAYS` are
+rarely read one by one, so the maintenance loop compacts them into one chunk
+per container and day: a Gorilla-encoded block (app.utils.gorilla) of the
+timestamps and one column per SnapshotMetric, typically 15-25 bytes a row.
+Snapshots arriving later for a compacted day are merged into its chunk by
+the next run. Long-range readers slice the same data from the segment files
+of app.database.metric_segments.
+
+Readers get the compacted snapshots back in two shapes:
+
+- `cold_snapshots` yields `ColdSnapshot` tuples with the attributes of a
+  `MetricSnapshot` row, for code that also reads hot rows; their ids are
+  derived from the container and timestamp, as the original ones aren't kept
+- `cold_columns` returns whole `array.array` columns without creating a
+  Python object per row, for columnar exports and long-range scans
+
+Each chunk covers one day, so a range read decodes its days sequentially in
+primary key order. Decoded chunks are cached by content. Timezone-aware
+ranges are converted to naive UTC, the form of the stored timestamps.
+"""
+import os
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from math import isnan
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from app.models.enums import SnapshotMetric
+from app.models.models import MetricChunk, MetricSnapshot
+from app.utils.gorilla import decode_block, encode_block
+from app.utils.timestamps import naive_utc
+
+# Snapshots are compacted once older than this many days (whole days); 0 disables compaction
+COLD_AFTER_DAYS = int(os.getenv("METRIC_SNAPSHOT_COLD_DAYS", "7"))
+
+# Container days compacted per maintenance run
+COMPACT_BATCH_SIZE = int(os.getenv("METRIC_CHUNK_COMPACT_BATCH_SIZE", "200"))
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Value columns of a chunk, in this order
+METRICS = list(SnapshotMetric)
+
+chunk_table = MetricChunk.__table__
+snapshot_table = MetricSnapshot.__table__
+
+ContainerIds = Union[Sequence[str], Select, None]
+
+ColdSnapshot = NamedTuple(
+    "ColdSnapshot",
+    [("id", str), ("container_id", str), ("timestamp", datetime)]
+    + [(metric.value, Optional[float]) for metric in SnapshotMetric]
+)
+
+
+def epoch_microseconds(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_epoch_microseconds(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+@lru_cache(maxsize=512)
+def decode_chunk(data: bytes, metrics: Optional[Tuple[SnapshotMetric, ...]] = None) -> Tuple[array, List[Optional[array]]]:
+    """Timestamps and value columns of a chunk, NaN where missing. Cached; don't modify them."""
+    columns = None if metrics is None else [METRICS.index(metric) for metric in metrics]
+    return decode_block(data, columns)
+
+
+def _upsert_chunk_statement():
+    statement = insert(chunk_table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[chunk_table.c.container_id, chunk_table.c.day],
+        set_={
+            "row_count": excluded.row_count,
+            "first_timestamp": excluded.first_timestamp,
+            "last_timestamp": excluded.last_timestamp,
+            "data": excluded.data,
+            "segment_synced": False,
+        }
+    )
+
+
+UPSERT_CHUNK = _upsert_chunk_statement()
+
+
+def _compact_day(connection: Connection, container_id: str, day: date) -> int:
+    start = datetime.combine(day, time.min)
+    in_day = (
+        snapshot_table.c.container_id == container_id,
+        snapshot_table.c.timestamp >= start,
+        snapshot_table.c.timestamp < start + timedelta(days=1),
+    )
+    metric_columns = [snapshot_table.c[metric.value] for metric in METRICS]
+    rows = [
+        (epoch_microseconds(row[0]), *row[1:])
+        for row in connection.execute(
+            select(snapshot_table.c.timestamp, *metric_columns).where(*in_day).order_by(snapshot_table.c.timestamp)
+        )
+    ]
+    existing = connection.execute(
+        select(chunk_table.c.data).where(chunk_table.c.container_id == container_id, chunk_table.c.day == day)
+    ).scalar()
+    if existing is not None:
+        # Late snapshots for a compacted day
+        timestamps, columns = decode_block(existing)
+        rows = sorted(
+            [(timestamp, *(column[index] for column in columns)) for index, timestamp in enumerate(timestamps)] + rows,
+            key=lambda row: row[0]
+        )
+
+    timestamps, *columns = zip(*rows)
+    connection.execute(UPSERT_CHUNK, {
+        "container_id": container_id,
+        "day": day,
+        "row_count": len(rows),
+        "first_timestamp": from_epoch_microseconds(timestamps[0]),
+        "last_timestamp": from_epoch_microseconds(timestamps[-1]),
+        "data": encode_block(timestamps, columns),
+    })
+    result = connection.execute(snapshot_table.delete().where(*in_day))
+    return result.rowcount
+
+
+def compact_metric_snapshots(
+    connection: Connection,
+    now: Optional[datetime] = None,
+    limit: int = COMPACT_BATCH_SIZE,
+    cold_days: int = COLD_AFTER_DAYS
+) -> int:
+    """
+    Move snapshots older than `cold_days` into chunks, at most `limit` container days, oldest first.
+
+    Returns the number of compacted snapshots.
+    """
+    if cold_days <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = datetime.combine((now - timedelta(days=cold_days)).date(), time.min)
+    day = func.date(snapshot_table.c.timestamp)
+    pending = connection.execute(
+        select(snapshot_table.c.container_id, day)
+        .where(snapshot_table.c.timestamp < cutoff)
+        .group_by(snapshot_table.c.container_id, day)
+        .order_by(day)
+        .limit(limit)
+    ).all()
+    return sum(
+        _compact_day(connection, container_id, date.fromisoformat(day_text))
+        for container_id, day_text in pending
+    )
+
+
+def _chunk_query(
+    container_ids: ContainerIds,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    descending: bool = False
+) -> Select:
+    query = select(chunk_table.c.container_id, chunk_table.c.data)
+    if container_ids is not None:
+        query = query.where(chunk_table.c.container_id.in_(container_ids))
+    if start is not None:
+        query = query.where(chunk_table.c.last_timestamp >= start)
+    if end is not None:
+        query = query.where(chunk_table.c.first_timestamp < end)
+    day_order = chunk_table.c.day.desc() if descending else chunk_table.c.day
+    return query.order_by(chunk_table.c.container_id, day_order)
+
+
+def _slice(timestamps: array, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+    lower = bisect_left(timestamps, epoch_microseconds(start)) if start is not None else 0
+    upper = bisect_left(timestamps, epoch_microseconds(end)) if end is not None else len(timestamps)
+    return lower, upper
+
+
+def has_chunks(
+    connection: Connection,
+    container_ids: ContainerIds = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> bool:
+    start, end = naive_utc(start), naive_utc(end)
+    query = _chunk_query(container_ids, start, end).with_only_columns(chunk_table.c.day).limit(1)
+    return connection.execute(query).first() is not None
+
+
+def chunk_container_ids(
+    connection: Connection,
+    container_ids: ContainerIds = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[str]:
+    """Containers with compacted snapshots in the range."""
+    start, end = naive_utc(start), naive_utc(end)
+    query = _chunk_query(container_ids, start, end).with_only_columns(chunk_table.c.container_id).distinct()
+    return list(connection.execute(query.order_by(None).order_by(chunk_table.c.container_id)).scalars())
+
+
+def cold_snapshots(
+    connection: Connection,
+    container_ids: ContainerIds = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[Sequence[SnapshotMetric]] = None,
+    descending: bool = False
+) -> Iterator[ColdSnapshot]:
+    """
+    Compacted snapshots with timestamps in [start, end), by container and timestamp.
+
+    With `metrics`, only those are decoded and the others are None.
+    `descending` reverses the timestamp order within each container.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    metrics = None if metrics is None else tuple(metrics)
+    for container_id, data in connection.execute(_chunk_query(container_ids, start, end, descending)):
+        timestamps, columns = decode_chunk(data, metrics)
+        lower, upper = _slice(timestamps, start, end)
+        indexes = range(upper - 1, lower - 1, -1) if descending else range(lower, upper)
+        for index in indexes:
+            timestamp = timestamps[index]
+            values = (None if column is None or isnan(column[index]) else column[index] for column in columns)
+            yield ColdSnapshot(
+                f"{container_id}:{timestamp}", container_id, from_epoch_microseconds(timestamp), *values
+            )
+
+
+def count_cold_snapshots(
+    connection: Connection,
+    container_ids: ContainerIds,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    metric: SnapshotMetric
+) -> int:
+    """Compacted snapshots in [start, end) that have `metric`, decoding one chunk at a time."""
+    start, end = naive_utc(start), naive_utc(end)
+    total = 0
+    for _, data in connection.execute(_chunk_query(container_ids, start, end)):
+        timestamps, columns = decode_chunk(data, (metric,))
+        lower, upper = _slice(timestamps, start, end)
+        total += upper - lower - sum(map(isnan, columns[METRICS.index(metric)][lower:upper]))
+    return total
+
+
+def cold_columns(
+    connection: Connection,
+    container_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Sequence[SnapshotMetric] = METRICS
+) -> Tuple[array, Dict[SnapshotMetric, array]]:
+    """
+    Compacted snapshots of one container in [start, end), oldest first, as columns.
+
+    Timestamps are microseconds since the Unix epoch; values are NaN where missing.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    metrics = tuple(metrics)
+    timestamps = array("q")
+    values = {metric: array("d") for metric in metrics}
+    for _, data in connection.execute(_chunk_query([container_id], start, end)):
+        chunk_timestamps, columns = decode_chunk(data, metrics)
+        lower, upper = _slice(chunk_timestamps, start, end)
+        timestamps.extend(chunk_timestamps[lower:upper])
+        for metric in metrics:
+            values[metric].extend(columns[METRICS.index(metric)][lower:upper])
+    return timestamps, values
+
@@ -0,0 +1,466 @@
+"""
+Time-bucketed metric aggregation for `/metrics/query` and `/metrics/compare`,
+and percentiles over arbitrary ranges for `/metrics/percentiles`.
+
+A query runs as one grouped SQL statement, either over the raw snapshots or
+over the hourly/daily rollups. Rollups are used automatically when they can
+answer the query: buckets of at least the rollup resolution and a time range
+aligned to it. Percentiles come from the rollup sketches, which are merged in
+Python; buckets that aren't sealed yet are computed from their snapshots.
+
+Snapshots compacted into chunks (app.database.metric_chunks) are read along
+with the rows of `metric_snapshots`; raw queries over ranges that include
+them are aggregated in Python instead of SQL, slicing the compacted
+snapshots per bucket from their segment files (app.database.metric_segments).
+"""
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import chain
+from math import isnan
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.database.metric_chunks import (
+    chunk_container_ids, cold_snapshots, epoch_microseconds, from_epoch_microseconds, has_chunks
+)
+from app.database.metric_segments import historical_columns
+from app.database.metric_rollups import RESOLUTION_LENGTHS, bucket_start
+from app.models.enums import MetricAggregation, MetricBucket, MetricRollupResolution, SnapshotMetric
+from app.models.models import MetricRollup, MetricSnapshot
+from app.utils.tdigest import TDigest
+
+# Approximate bucket lengths, used to bound the number of buckets per query
+BUCKET_SECONDS = {
+    MetricBucket.MINUTE: 60,
+    MetricBucket.HOUR: 3600,
+    MetricBucket.DAY: 86400,
+    MetricBucket.WEEK: 7 * 86400,
+    MetricBucket.MONTH: 31 * 86400,
+}
+
+# Rollup resolutions able to serve each bucket size, coarsest first
+BUCKET_ROLLUPS = {
+    MetricBucket.MINUTE: [],
+    MetricBucket.HOUR: [MetricRollupResolution.HOUR],
+    MetricBucket.DAY: [MetricRollupResolution.DAY, MetricRollupResolution.HOUR],
+    MetricBucket.WEEK: [MetricRollupResolution.DAY, MetricRollupResolution.HOUR],
+    MetricBucket.MONTH: [MetricRollupResolution.DAY, MetricRollupResolution.HOUR],
+}
+
+PERCENTILES = {
+    MetricAggregation.P5: 5,
+    MetricAggregation.P50: 50,
+    MetricAggregation.P95: 95,
+}
+
+
+class MetricSeries(NamedTuple):
+    container_id: str
+    metric: SnapshotMetric
+    # (bucket start, {aggregation: value}) in time order
+    points: List[Tuple[datetime, Dict[MetricAggregation, Any]]]
+
+
+def bucket_expression(bucket: MetricBucket, column):
+    """SQL expression of the bucket start of a timestamp column; weeks start on Monday."""
+    if bucket == MetricBucket.MINUTE:
+        return func.strftime("%Y-%m-%d %H:%M:00", column)
+    if bucket == MetricBucket.HOUR:
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    if bucket == MetricBucket.DAY:
+        return func.strftime("%Y-%m-%d 00:00:00", column)
+    if bucket == MetricBucket.WEEK:
+        return func.strftime("%Y-%m-%d 00:00:00", column, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01 00:00:00", column)
+
+
+def bucket_floor(bucket: MetricBucket, timestamp: datetime) -> datetime:
+    """Bucket start of a timestamp, like `bucket_expression`."""
+    if bucket == MetricBucket.MINUTE:
+        return timestamp.replace(second=0, microsecond=0)
+    if bucket == MetricBucket.HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == MetricBucket.DAY:
+        return day
+    if bucket == MetricBucket.WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def choose_rollup(bucket: MetricBucket, start: datetime, end: datetime) -> Optional[MetricRollupResolution]:
+    """The coarsest rollup that answers the query, None to read raw snapshots."""
+    for resolution in BUCKET_ROLLUPS[bucket]:
+        if bucket_start(start, resolution) == start and bucket_start(end, resolution) == end:
+            return resolution
+    return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile of sorted values, with linear interpolation between the closest ranks."""
+    rank = (len(values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def _raw_statement(
+    db: Session,
+    bucket: MetricBucket,
+    metrics: Sequence[SnapshotMetric],
+    aggregations: Sequence[MetricAggregation]
+) -> Select:
+    columns = []
+    for metric in metrics:
+        column = getattr(MetricSnapshot, metric.value)
+        columns.append(func.count(column).label(f"{metric.value}__count"))
+        for aggregation in aggregations:
+            if aggregation == MetricAggregation.COUNT or aggregation in PERCENTILES:
+                continue
+            expression = getattr(func, aggregation.value)(column)
+            columns.append(expression.label(f"{metric.value}__{aggregation.value}"))
+        if any(aggregation in PERCENTILES for aggregation in aggregations):
+            # Values of the bucket, percentiles are computed in Python
+            columns.append(func.group_concat(column).label(f"{metric.value}__values"))
+    bucket_column = bucket_expression(bucket, MetricSnapshot.timestamp).label("bucket")
+    return (
+        db.query(MetricSnapshot.container_id, bucket_column, *columns)
+        .group_by(MetricSnapshot.container_id, bucket_column)
+        .order_by(MetricSnapshot.container_id, bucket_column)
+    )
+
+
+def _raw_series(rows, metrics, aggregations) -> List[MetricSeries]:
+    series: Dict[Tuple[str, SnapshotMetric], MetricSeries] = {}
+    for row in rows:
+        timestamp = datetime.fromisoformat(row.bucket)
+        for metric in metrics:
+            count = getattr(row, f"{metric.value}__count")
+            if not count:
+                continue
+            values = {}
+            bucket_values = None
+            for aggregation in aggregations:
+                if aggregation == MetricAggregation.COUNT:
+                    values[aggregation] = count
+                elif aggregation in PERCENTILES:
+                    if bucket_values is None:
+                        concatenated = getattr(row, f"{metric.value}__values")
+                        bucket_values = sorted(float(value) for value in concatenated.split(","))
+                    values[aggregation] = percentile(bucket_values, PERCENTILES[aggregation])
+                else:
+                    values[aggregation] = getattr(row, f"{metric.value}__{aggregation.value}")
+            key = (row.container_id, metric)
+            if key not in series:
+                series[key] = MetricSeries(row.container_id, metric, [])
+            series[key].points.append((timestamp, values))
+    return [series[key] for key in sorted(series, key=lambda key: (key[0], metrics.index(key[1])))]
+
+
+def _aggregate(values: List[float], aggregations) -> Dict[MetricAggregation, Any]:
+    result = {}
+    ordered = None
+    for aggregation in aggregations:
+        if aggregation == MetricAggregation.COUNT:
+            result[aggregation] = len(values)
+        elif aggregation == MetricAggregation.AVG:
+            result[aggregation] = sum(values) / len(values)
+        elif aggregation == MetricAggregation.MIN:
+            result[aggregation] = min(values)
+        elif aggregation == MetricAggregation.MAX:
+            result[aggregation] = max(values)
+        elif aggregation == MetricAggregation.SUM:
+            result[aggregation] = sum(values)
+        else:
+            if ordered is None:
+                ordered = sorted(values)
+            result[aggregation] = percentile(ordered, PERCENTILES[aggregation])
+    return result
+
+
+def _python_series(db: Session, container_ids, metrics, bucket, start, end, aggregations) -> List[MetricSeries]:
+    """Raw snapshot aggregation in Python, for ranges that include compacted snapshots."""
+    query = db.query(
+        MetricSnapshot.container_id,
+        MetricSnapshot.timestamp,
+        *(getattr(MetricSnapshot, metric.value) for metric in metrics)
+    ).filter(MetricSnapshot.timestamp >= start, MetricSnapshot.timestamp < end)
+    if container_ids is not None:
+        query = query.filter(MetricSnapshot.container_id.in_(container_ids))
+
+    buckets: Dict[Tuple[str, int, datetime], List[float]] = defaultdict(list)
+    for row in query:
+        timestamp = bucket_floor(bucket, row.timestamp)
+        for index, metric in enumerate(metrics):
+            value = getattr(row, metric.value)
+            if value is not None:
+                buckets[(row.container_id, index, timestamp)].append(value)
+
+    # Compacted snapshots come as columns: slice them per bucket instead of per row
+    step = timedelta(seconds=BUCKET_SECONDS[bucket])
+    connection = db.connection()
+    for container_id in chunk_container_ids(connection, container_ids, start, end):
+        timestamps, columns = historical_columns(connection, container_id, start, end, metrics)
+        lower = 0
+        while lower < len(timestamps):
+            timestamp = bucket_floor(bucket, from_epoch_microseconds(timestamps[lower]))
+            upper = bisect_left(timestamps, epoch_microseconds(bucket_floor(bucket, timestamp + step)), lower)
+            for index, metric in enumerate(metrics):
+                values = [value for value in columns[metric][lower:upper] if not isnan(value)]
+                if values:
+                    buckets[(container_id, index, timestamp)].extend(values)
+            lower = upper
+
+    series: List[MetricSeries] = []
+    # Sorted by container, then metric as requested, then time
+    for container_id, index, timestamp in sorted(buckets):
+        if not series or (series[-1].container_id, series[-1].metric) != (container_id, metrics[index]):
+            series.append(MetricSeries(container_id, metrics[index], []))
+        values = buckets[(container_id, index, timestamp)]
+        series[-1].points.append((timestamp, _aggregate(values, aggregations)))
+    return series
+
+
+def _rollup_values(row, aggregations, digest: Optional[TDigest] = None) -> Dict[MetricAggregation, Any]:
+    values = {}
+    for aggregation in aggregations:
+        if aggregation == MetricAggregation.AVG:
+            values[aggregation] = row.value_sum / row.value_count
+        elif aggregation == MetricAggregation.MIN:
+            values[aggregation] = row.value_min
+        elif aggregation == MetricAggregation.MAX:
+            values[aggregation] = row.value_max
+        elif aggregation == MetricAggregation.SUM:
+            values[aggregation] = row.value_sum
+        elif aggregation == MetricAggregation.COUNT:
+            values[aggregation] = row.value_count
+        else:
+            values[aggregation] = digest.quantile(PERCENTILES[aggregation] / 100)
+    return values
+
+
+def _rollup_series(rows, aggregations, digests=None) -> List[MetricSeries]:
+    series: List[MetricSeries] = []
+    for row in rows:
+        if not series or (series[-1].container_id, series[-1].metric) != (row.container_id, row.metric):
+            series.append(MetricSeries(row.container_id, row.metric, []))
+        digest = digests[(row.container_id, row.metric, row.bucket)] if digests is not None else None
+        series[-1].points.append((datetime.fromisoformat(row.bucket), _rollup_values(row, aggregations, digest)))
+    return series
+
+
+def _snapshot_digests(
+    db: Session,
+    resolution: MetricRollupResolution,
+    buckets: Sequence[Tuple[str, SnapshotMetric, datetime]]
+) -> Dict[Tuple[str, SnapshotMetric, datetime], TDigest]:
+    """Digests of unsealed rollup buckets, from one range query over their snapshots."""
+    wanted = set(buckets)
+    digests = {key: TDigest() for key in wanted}
+    if not wanted:
+        return digests
+    metrics = sorted({metric for _, metric, _ in wanted}, key=list(SnapshotMetric).index)
+    rows = db.query(
+        MetricSnapshot.container_id,
+        MetricSnapshot.timestamp,
+        *(getattr(MetricSnapshot, metric.value) for metric in metrics)
+    ).filter(
+        MetricSnapshot.container_id.in_({container_id for container_id, _, _ in wanted}),
+        MetricSnapshot.timestamp >= min(start for _, _, start in wanted),
+        MetricSnapshot.timestamp < max(start for _, _, start in wanted) + RESOLUTION_LENGTHS[resolution]
+    )
+    cold = cold_snapshots(
+        db.connection(),
+        sorted({container_id for container_id, _, _ in wanted}),
+        min(start for _, _, start in wanted),
+        max(start for _, _, start in wanted) + RESOLUTION_LENGTHS[resolution],
+        metrics
+    )
+    for row in chain(rows, cold):
+        start = bucket_start(row.timestamp, resolution)
+        for metric in metrics:
+            value = getattr(row, metric.value)
+            key = (row.container_id, metric, start)
+            if value is not None and key in digests:
+                digests[key].add(value)
+    return digests
+
+
+def _rollup_query(db: Session, container_ids, metrics, resolution, start, end, *columns):
+    query = db.query(MetricRollup.container_id, MetricRollup.metric, *columns).filter(
+        MetricRollup.resolution == resolution,
+        MetricRollup.metric.in_(metrics),
+        MetricRollup.bucket_start >= start,
+        MetricRollup.bucket_start < end
+    )
+    if container_ids is not None:
+        query = query.filter(MetricRollup.container_id.in_(container_ids))
+    return query
+
+
+def _merge_rollup_sketches(db: Session, resolution: MetricRollupResolution, rows, key) -> Dict[Any, TDigest]:
+    """Merge the sketches of rollup rows into one digest per key(row)."""
+    unsealed = _snapshot_digests(db, resolution, [
+        (row.container_id, row.metric, row.bucket_start) for row in rows if row.sketch is None
+    ])
+    digests: Dict[Any, TDigest] = defaultdict(TDigest)
+    for row in rows:
+        if row.sketch is None:
+            digest = unsealed[(row.container_id, row.metric, row.bucket_start)]
+        else:
+            digest = TDigest.from_bytes(row.sketch)
+        digests[key(row)].merge(digest)
+    return digests
+
+
+def query_metrics(
+    db: Session,
+    container_ids: Union[Sequence[str], Select, None],
+    metrics: Sequence[SnapshotMetric],
+    bucket: MetricBucket,
+    start: datetime,
+    end: datetime,
+    aggregations: Sequence[MetricAggregation]
+) -> Tuple[Optional[MetricRollupResolution], List[MetricSeries]]:
+    """
+    Aggregate `metrics` per container and bucket over [start, end).
+
+    `container_ids` is a list or a select of container IDs, None for all
+    containers. Buckets without values are left out. Returns the rollup
+    resolution that was used (None for raw snapshots) and the series ordered
+    by container and by metric as requested.
+    """
+    metrics = list(metrics)
+    rollup = choose_rollup(bucket, start, end)
+
+    if rollup is None:
+        if has_chunks(db.connection(), container_ids, start, end):
+            return None, _python_series(db, container_ids, metrics, bucket, start, end, aggregations)
+        query = _raw_statement(db, bucket, metrics, aggregations).filter(
+            MetricSnapshot.timestamp >= start,
+            MetricSnapshot.timestamp < end
+        )
+        if container_ids is not None:
+            query = query.filter(MetricSnapshot.container_id.in_(container_ids))
+        return None, _raw_series(query, metrics, aggregations)
+
+    bucket_column = bucket_expression(bucket, MetricRollup.bucket_start).label("bucket")
+    aggregates = (
+        func.sum(MetricRollup.value_count).label("value_count"),
+        func.sum(MetricRollup.value_sum).label("value_sum"),
+        func.min(MetricRollup.value_min).label("value_min"),
+        func.max(MetricRollup.value_max).label("value_max"),
+    )
+    query = _rollup_query(db, container_ids, metrics, rollup, start, end, bucket_column, *aggregates)
+    rows = query.group_by(MetricRollup.container_id, MetricRollup.metric, bucket_column).all()
+    rows.sort(key=lambda row: (row.container_id, metrics.index(row.metric), row.bucket))
+
+    digests = None
+    if any(aggregation in PERCENTILES for aggregation in aggregations):
+        # Sketches can't be merged in SQL: read them per rollup bucket and merge per output bucket
+        sketches = _rollup_query(
+            db, container_ids, metrics, rollup, start, end,
+            bucket_column, MetricRollup.bucket_start, MetricRollup.sketch
+        ).all()
+        digests = _merge_rollup_sketches(
+            db, rollup, sketches, key=lambda row: (row.container_id, row.metric, row.bucket)
+        )
+    return rollup, _rollup_series(rows, aggregations, digests)
+
+
+def _ceil(timestamp: datetime, resolution: MetricRollupResolution) -> datetime:
+    start = bucket_start(timestamp, resolution)
+    return start if start == timestamp else start + RESOLUTION_LENGTHS[resolution]
+
+
+def _range_pieces(start: datetime, end: datetime) -> List[Tuple[Optional[MetricRollupResolution], datetime, datetime]]:
+    """
+    Split [start, end) into whole days, whole hours around them and raw edges.
+
+    Returns (resolution or None for raw snapshots, piece start, piece end).
+    """
+    hours_start = _ceil(start, MetricRollupResolution.HOUR)
+    hours_end = bucket_start(end, MetricRollupResolution.HOUR)
+    if hours_start >= hours_end:
+        return [(None, start, end)]
+    days_start = _ceil(hours_start, MetricRollupResolution.DAY)
+    days_end = bucket_start(hours_end, MetricRollupResolution.DAY)
+    if days_start >= days_end:
+        pieces = [(MetricRollupResolution.HOUR, hours_start, hours_end)]
+    else:
+        pieces = [
+            (MetricRollupResolution.HOUR, hours_start, days_start),
+            (MetricRollupResolution.DAY, days_start, days_end),
+            (MetricRollupResolution.HOUR, days_end, hours_end),
+        ]
+    pieces = [(None, start, hours_start)] + pieces + [(None, hours_end, end)]
+    return [piece for piece in pieces if piece[1] < piece[2]]
+
+
+def range_digests(
+    db: Session,
+    container_ids: Union[Sequence[str], Select, None],
+    metrics: Sequence[SnapshotMetric],
+    start: datetime,
+    end: datetime
+) -> Dict[Tuple[str, SnapshotMetric], TDigest]:
+    """
+    Quantile digests of `metrics` per container over [start, end).
+
+    Whole days and hours are merged from the rollup sketches, so a year costs
+    a few hundred sketches; only the partial hours at the edges read snapshots.
+    """
+    metrics = list(metrics)
+    digests: Dict[Tuple[str, SnapshotMetric], TDigest] = defaultdict(TDigest)
+    for resolution, piece_start, piece_end in _range_pieces(start, end):
+        if resolution is None:
+            query = db.query(
+                MetricSnapshot.container_id,
+                *(getattr(MetricSnapshot, metric.value) for metric in metrics)
+            ).filter(MetricSnapshot.timestamp >= piece_start, MetricSnapshot.timestamp < piece_end)
+            if container_ids is not None:
+                query = query.filter(MetricSnapshot.container_id.in_(container_ids))
+            cold = cold_snapshots(db.connection(), container_ids, piece_start, piece_end, metrics)
+            for row in chain(query, cold):
+                for metric in metrics:
+                    value = getattr(row, metric.value)
+                    if value is not None:
+                        digests[(row.container_id, metric)].add(value)
+            continue
+        rows = _rollup_query(
+            db, container_ids, metrics, resolution, piece_start, piece_end,
+            MetricRollup.bucket_start, MetricRollup.sketch
+        ).all()
+        merged = _merge_rollup_sketches(db, resolution, rows, key=lambda row: (row.container_id, row.metric))
+        for key, digest in merged.items():
+            digests[key].merge(digest)
+    return dict(digests)
+
+
+def align_series(
+    series: Sequence[MetricSeries],
+    aggregation: MetricAggregation
+) -> Tuple[List[datetime], Dict[str, List[Any]]]:
+    """
+    Put single-metric series on common buckets.
+
+    The time-ordered series are k-way merged into the union of their buckets;
+    each container gets one value per bucket, None where it has no data.
+    """
+    timestamps: List[datetime] = []
+    for timestamp in heapq.merge(*([timestamp for timestamp, _ in item.points] for item in series)):
+        if not timestamps or timestamps[-1] != timestamp:
+            timestamps.append(timestamp)
+
+    positions = {timestamp: index for index, timestamp in enumerate(timestamps)}
+    values: Dict[str, List[Any]] = {}
+    for item in series:
+        column = values[item.container_id] = [None] * len(timestamps)
+        for timestamp, point in item.points:
+            column[positions[timestamp]] = point[aggregation]
+    return timestamps, values
@@ -0,0 +1,277 @@
+"""
+Hourly and daily metric aggregates in `metric_rollups`.
+
+Every inserted `MetricSnapshot` is added to the count/sum/min/max of its hour
+and day bucket, per reported metric, in the same transaction. Aggregates are
+additive, so late snapshots land in the right bucket without recomputation.
+Queries over long ranges (see app.database.metric_query) read a few hundred
+rollup rows instead of every snapshot.
+
+Quantile sketches can't be updated in SQL, so they are sealed afterwards:
+`seal_metric_sketches`, run by the maintenance loop, stores a t-digest on
+every complete bucket, built from the snapshots for hours and merged from the
+hour sketches for days. A late snapshot clears the sketch of its buckets until
+they are sealed again; queries compute unsealed buckets from the snapshots.
+"""
+import os
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, event, func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+
+from app.database.metric_chunks import cold_snapshots
+from app.models.enums import MetricRollupResolution, SnapshotMetric
+from app.models.models import MetricRollup, MetricSnapshot
+from app.utils.tdigest import TDigest
+
+rollup_table = MetricRollup.__table__
+
+RESOLUTION_LENGTHS = {
+    MetricRollupResolution.HOUR: timedelta(hours=1),
+    MetricRollupResolution.DAY: timedelta(days=1),
+}
+
+# Buckets sealed per resolution and maintenance run
+SEAL_BATCH_SIZE = int(os.getenv("METRIC_SKETCH_SEAL_BATCH_SIZE", "500"))
+
+# Bucket start of a raw timestamp, in the storage format of DateTime columns
+BUCKET_FORMATS = {
+    MetricRollupResolution.HOUR: "%Y-%m-%d %H:00:00.000000",
+    MetricRollupResolution.DAY: "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def bucket_start(timestamp: datetime, resolution: MetricRollupResolution) -> datetime:
+    if resolution == MetricRollupResolution.HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert_statement():
+    statement = insert(rollup_table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[
+            rollup_table.c.container_id, rollup_table.c.resolution,
+            rollup_table.c.metric, rollup_table.c.bucket_start
+        ],
+        set_={
+            "value_count": rollup_table.c.value_count + excluded.value_count,
+            "value_sum": rollup_table.c.value_sum + excluded.value_sum,
+            "value_min": func.min(rollup_table.c.value_min, excluded.value_min),
+            "value_max": func.max(rollup_table.c.value_max, excluded.value_max),
+            # The bucket changed; it is sealed again by the next maintenance run
+            "sketch": None,
+        }
+    )
+
+
+UPSERT_ROLLUP = _upsert_statement()
+
+
+def rollup_rows(container_id: str, timestamp: datetime, values: Dict[SnapshotMetric, Any]) -> List[Dict[str, Any]]:
+    """Rollup increments for one snapshot; metrics it doesn't report are left out."""
+    return [
+        {
+            "container_id": container_id,
+            "resolution": resolution,
+            "metric": metric,
+            "bucket_start": bucket_start(timestamp, resolution),
+            "value_count": 1,
+            "value_sum": value,
+            "value_min": value,
+            "value_max": value,
+        }
+        for resolution in MetricRollupResolution
+        for metric, value in values.items()
+        if value is not None
+    ]
+
+
+@event.listens_for(MetricSnapshot, "after_insert")
+def update_metric_rollups(mapper, connection: Connection, snapshot: MetricSnapshot) -> None:
+    rows = rollup_rows(
+        snapshot.container_id,
+        snapshot.timestamp,
+        {metric: getattr(snapshot, metric.value) for metric in SnapshotMetric}
+    )
+    if rows:
+        connection.execute(UPSERT_ROLLUP, rows)
+
+
+def rebuild_metric_rollups(connection: Connection) -> int:
+    """
+    Rebuild all rollups from the snapshots, e.g. after Core bulk inserts.
+
+    Returns the number of rollup rows.
+    """
+    connection.execute(rollup_table.delete())
+    for resolution, bucket_format in BUCKET_FORMATS.items():
+        for metric in SnapshotMetric:
+            column = getattr(MetricSnapshot, metric.value)
+            bucket = func.strftime(bucket_format, MetricSnapshot.timestamp)
+            aggregates = (
+                select(
+                    MetricSnapshot.container_id,
+                    # Enum columns store member names
+                    literal(resolution.name),
+                    literal(metric.name),
+                    bucket,
+                    func.count(column),
+                    func.sum(column),
+                    func.min(column),
+                    func.max(column),
+                )
+                .where(column.isnot(None))
+                .group_by(MetricSnapshot.container_id, bucket)
+            )
+            connection.execute(rollup_table.insert().from_select(
+                [
+                    "container_id", "resolution", "metric", "bucket_start",
+                    "value_count", "value_sum", "value_min", "value_max"
+                ],
+                aggregates
+            ))
+
+    # Compacted snapshots are no longer in metric_snapshots; add them per bucket
+    increments: Dict[Any, Dict[str, Any]] = {}
+    for snapshot in cold_snapshots(connection):
+        values = {metric: getattr(snapshot, metric.value) for metric in SnapshotMetric}
+        for row in rollup_rows(snapshot.container_id, snapshot.timestamp, values):
+            key = (row["container_id"], row["resolution"], row["metric"], row["bucket_start"])
+            if key not in increments:
+                increments[key] = row
+                continue
+            increment = increments[key]
+            increment["value_count"] += 1
+            increment["value_sum"] += row["value_sum"]
+            increment["value_min"] = min(increment["value_min"], row["value_min"])
+            increment["value_max"] = max(increment["value_max"], row["value_max"])
+    if increments:
+        connection.execute(UPSERT_ROLLUP, list(increments.values()))
+    return connection.execute(select(func.count()).select_from(rollup_table)).scalar()
+
+
+UPDATE_SKETCH = (
+    rollup_table.update()
+    .where(and_(
+        rollup_table.c.container_id == bindparam("b_container_id"),
+        rollup_table.c.resolution == bindparam("b_resolution"),
+        rollup_table.c.metric == bindparam("b_metric"),
+        rollup_table.c.bucket_start == bindparam("b_bucket_start"),
+        # Skip buckets that received values since they were read
+        rollup_table.c.value_count == bindparam("b_value_count"),
+    ))
+    .values(sketch=bindparam("b_sketch"))
+)
+
+
+def _seal_hours(connection: Connection, before: datetime, limit: Optional[int]) -> int:
+    pending = (
+        select(rollup_table.c.container_id, rollup_table.c.bucket_start)
+        .where(
+            rollup_table.c.resolution == MetricRollupResolution.HOUR,
+            rollup_table.c.sketch.is_(None),
+            rollup_table.c.bucket_start < before
+        )
+        .group_by(rollup_table.c.container_id, rollup_table.c.bucket_start)
+        .order_by(rollup_table.c.bucket_start)
+    )
+    if limit is not None:
+        pending = pending.limit(limit)
+    columns = [getattr(MetricSnapshot, metric.value) for metric in SnapshotMetric]
+    updates = []
+    for container_id, start in connection.execute(pending).all():
+        digests = {metric: TDigest() for metric in SnapshotMetric}
+        end = start + RESOLUTION_LENGTHS[MetricRollupResolution.HOUR]
+        rows = connection.execute(select(*columns).where(
+            MetricSnapshot.container_id == container_id,
+            MetricSnapshot.timestamp >= start,
+            MetricSnapshot.timestamp < end
+        ))
+        # Late snapshots may have been compacted before the bucket was sealed
+        for row in chain(rows, cold_snapshots(connection, [container_id], start, end)):
+            for metric in SnapshotMetric:
+                value = getattr(row, metric.value)
+                if value is not None:
+                    digests[metric].add(value)
+        updates.extend(
+            {
+                "b_container_id": container_id,
+                "b_resolution": MetricRollupResolution.HOUR,
+                "b_metric": metric,
+                "b_bucket_start": start,
+                "b_value_count": len(digest),
+                "b_sketch": digest.to_bytes(),
+            }
+            for metric, digest in digests.items()
+            if digest.count
+        )
+    if updates:
+        connection.execute(UPDATE_SKETCH, updates)
+    return len(updates)
+
+
+def _seal_days(connection: Connection, before: datetime, limit: Optional[int]) -> int:
+    pending = (
+        select(rollup_table.c.container_id, rollup_table.c.metric, rollup_table.c.bucket_start)
+        .where(
+            rollup_table.c.resolution == MetricRollupResolution.DAY,
+            rollup_table.c.sketch.is_(None),
+            rollup_table.c.bucket_start < before
+        )
+        .order_by(rollup_table.c.bucket_start)
+    )
+    if limit is not None:
+        pending = pending.limit(limit)
+    updates = []
+    for container_id, metric, start in connection.execute(pending).all():
+        hours = connection.execute(select(rollup_table.c.sketch).where(
+            rollup_table.c.container_id == container_id,
+            rollup_table.c.resolution == MetricRollupResolution.HOUR,
+            rollup_table.c.metric == metric,
+            rollup_table.c.bucket_start >= start,
+            rollup_table.c.bucket_start < start + RESOLUTION_LENGTHS[MetricRollupResolution.DAY]
+        )).scalars().all()
+        if not hours or any(sketch is None for sketch in hours):
+            # Wait until all hours of the day are sealed
+            continue
+        digest = TDigest()
+        for sketch in hours:
+            digest.merge(TDigest.from_bytes(sketch))
+        updates.append({
+            "b_container_id": container_id,
+            "b_resolution": MetricRollupResolution.DAY,
+            "b_metric": metric,
+            "b_bucket_start": start,
+            "b_value_count": len(digest),
+            "b_sketch": digest.to_bytes(),
+        })
+    if updates:
+        connection.execute(UPDATE_SKETCH, updates)
+    return len(updates)
+
+
+def seal_metric_sketches(connection: Connection, limit: Optional[int] = SEAL_BATCH_SIZE) -> int:
+    """
+    Store quantile sketches on complete rollup buckets that don't have one.
+
+    At most `limit` hour buckets (per container) and day buckets are sealed per
+    call, oldest first; None seals everything. Returns the number of sealed rows.
+    """
+    now = datetime.utcnow()
+    sealed = _seal_hours(connection, bucket_start(now, MetricRollupResolution.HOUR), limit)
+    sealed += _seal_days(connection, bucket_start(now, MetricRollupResolution.DAY), limit)
+    return sealed
+
+
+def initialize_metric_rollups(connection: Connection) -> None:
+    """Fill the rollups for databases that have snapshots from before they existed."""
+    if connection.execute(select(rollup_table.c.container_id).limit(1)).first() is not None:
+        return
+    if connection.execute(select(MetricSnapshot.id).limit(1)).first() is None:
+        return
+    rebuild_metric_rollups(connection)
@@ -0,0 +1,313 @@
+"""
+Memory-mapped segment files for long-range reads of compacted snapshots.
+
+Chunks (app.database.metric_chunks) are compact but have to be decoded bit
+by bit on every read. A maintenance job therefore also writes the compacted
+snapshots of each container to a fixed-width segment file that readers map
+into memory and slice without decoding or going through SQLite:
+
+- `<METRIC_SEGMENT_DIR>/<container>.seg`: one 64-byte record per snapshot,
+  sorted by time: int64 epoch microseconds followed by one float64 per
+  SnapshotMetric in chunk column order, NaN where missing, in native byte
+  order
+- `<container>.idx`: a header with the record count and the inode of the
+  segment it describes, followed by the timestamp of every
+  `SEGMENT_INDEX_INTERVAL`th record. Readers bisect this sparse index, then
+  only the records of one interval.
+
+Chunks stay the source of truth and are marked `segment_synced` once written
+to the segment; compacting late snapshots into a day clears the flag again.
+Syncing appends to the segment, after its last indexed record, when only
+days after that record are pending. Otherwise it rewrites the segment into a new file and renames it
+over the old one. The index is renamed into place last, so a reader never
+maps more records than the segment file holds. Days with unsynced chunks are
+read from the chunks.
+
+`historical_columns` returns the compacted snapshots of one container as
+columns, from the segment where it is in sync and from chunks elsewhere.
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime, time
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.engine import Connection
+
+from app.database.metric_chunks import METRICS, chunk_table, cold_columns, epoch_microseconds
+from app.models.enums import SnapshotMetric
+from app.utils.gorilla import decode_block
+from app.utils.timestamps import naive_utc
+
+METRIC_SEGMENT_DIR = os.getenv("METRIC_SEGMENT_DIR", "segments")
+
+# Records per sparse index entry: 1024 records are 64 KiB of segment
+SEGMENT_INDEX_INTERVAL = int(os.getenv("METRIC_SEGMENT_INDEX_INTERVAL", "1024"))
+
+# Containers synced per maintenance run
+SEGMENT_BATCH_SIZE = int(os.getenv("METRIC_SEGMENT_BATCH_SIZE", "50"))
+
+# Open segment mappings kept across reads
+SEGMENT_CACHE_SIZE = 128
+
+VERSION = 1
+
+# Timestamp and one value per metric
+FIELDS = 1 + len(METRICS)
+RECORD_SIZE = 8 * FIELDS
+
+# Magic, version, index interval, record count, segment inode
+_INDEX_HEADER = struct.Struct("=4sHIqQ")
+_MAGIC = b"MSEG"
+
+
+def segment_paths(container_id: str, segment_dir: Optional[str] = None) -> Tuple[str, str]:
+    """Paths of the segment and index files of a container."""
+    base = os.path.join(segment_dir or METRIC_SEGMENT_DIR, quote(container_id, safe=""))
+    return base + ".seg", base + ".idx"
+
+
+class MetricSegment:
+    """A mapped segment; its views stay valid as long as the object is referenced."""
+
+    def __init__(self, data, count: int, interval: int, sparse: array):
+        self.count = count
+        self._interval = interval
+        self._sparse = sparse
+        self._data = data
+        if count:
+            self._int64 = memoryview(data).cast("q")[:count * FIELDS]
+            self._float64 = memoryview(data).cast("d")[:count * FIELDS]
+            self.timestamps = self._int64[0::FIELDS]
+        else:
+            self.timestamps = memoryview(array("q"))
+
+    def find(self, timestamp: int, lower: int = 0) -> int:
+        """Index of the first record at or after `timestamp` (epoch microseconds)."""
+        block = max(bisect_left(self._sparse, timestamp) - 1, 0)
+        low = max(block * self._interval, lower)
+        high = min((block + 1) * self._interval, self.count)
+        if low >= high:
+            return min(lower, self.count)
+        return bisect_left(self.timestamps, timestamp, low, high)
+
+    def bounds(self, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+        lower = self.find(epoch_microseconds(start)) if start is not None else 0
+        upper = self.find(epoch_microseconds(end), lower) if end is not None else self.count
+        return lower, upper
+
+    def column(self, metric: SnapshotMetric) -> memoryview:
+        """Strided view of one value column; slicing it doesn't copy."""
+        return self._float64[1 + METRICS.index(metric)::FIELDS]
+
+    def records(self, lower: int, upper: int) -> memoryview:
+        """Raw bytes of records [lower, upper)."""
+        return memoryview(self._data)[lower * RECORD_SIZE:upper * RECORD_SIZE]
+
+
+class StaleSegment(Exception):
+    """The segment doesn't match its index, e.g. because it was replaced in between."""
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _map_segment(segment_path: str, index_path: str, index_modified: int, index_size: int) -> MetricSegment:
+    # Keyed by the index file: syncing always replaces it. Errors aren't cached.
+    with open(index_path, "rb") as index_file:
+        index = index_file.read()
+    magic, version, interval, count, inode = _INDEX_HEADER.unpack_from(index)
+    if magic != _MAGIC or version != VERSION:
+        raise StaleSegment(f"Unsupported segment index {index_path}")
+    sparse = array("q")
+    sparse.frombytes(index[_INDEX_HEADER.size:])
+    with open(segment_path, "rb") as segment_file:
+        stat = os.fstat(segment_file.fileno())
+        if stat.st_ino != inode or stat.st_size < count * RECORD_SIZE:
+            raise StaleSegment(f"Segment {segment_path} doesn't match its index")
+        data = mmap.mmap(segment_file.fileno(), count * RECORD_SIZE, access=mmap.ACCESS_READ) if count else b""
+    return MetricSegment(data, count, interval, sparse)
+
+
+def open_segment(container_id: str, segment_dir: Optional[str] = None) -> Optional[MetricSegment]:
+    """The current segment of a container, None if it has none or it can't be read consistently."""
+    segment_path, index_path = segment_paths(container_id, segment_dir)
+    for _ in range(3):
+        try:
+            stat = os.stat(index_path)
+            return _map_segment(segment_path, index_path, stat.st_mtime_ns, stat.st_size)
+        except (FileNotFoundError, StaleSegment):
+            # Files replaced while reading them; the index is renamed last, so try again
+            continue
+    return None
+
+
+def _encode_records(chunks: Sequence[bytes]) -> bytearray:
+    decoded = [decode_block(data) for data in chunks]
+    count = sum(len(timestamps) for timestamps, _ in decoded)
+    records = bytearray(count * RECORD_SIZE)
+    int64 = memoryview(records).cast("q")
+    float64 = memoryview(records).cast("d")
+    offset = 0
+    for timestamps, columns in decoded:
+        end = offset + len(timestamps) * FIELDS
+        int64[offset:end:FIELDS] = timestamps
+        for index, column in enumerate(columns):
+            float64[offset + 1 + index:end:FIELDS] = column
+        offset = end
+    return records
+
+
+def _write_index(index_path: str, segment_path: str, count: int) -> None:
+    with open(segment_path, "rb") as segment_file:
+        inode = os.fstat(segment_file.fileno()).st_ino
+        sparse = array("q")
+        if count:
+            with mmap.mmap(segment_file.fileno(), count * RECORD_SIZE, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data).cast("q")
+                sparse.extend(view[0:count * FIELDS:FIELDS * SEGMENT_INDEX_INTERVAL])
+                view.release()
+    temporary = index_path + ".tmp"
+    with open(temporary, "wb") as index_file:
+        index_file.write(_INDEX_HEADER.pack(_MAGIC, VERSION, SEGMENT_INDEX_INTERVAL, count, inode))
+        index_file.write(sparse.tobytes())
+        index_file.flush()
+        os.fsync(index_file.fileno())
+    os.replace(temporary, index_path)
+
+
+def _sync_container(connection: Connection, container_id: str, first_day, segment_dir: Optional[str]) -> int:
+    segment_path, index_path = segment_paths(container_id, segment_dir)
+    segment = open_segment(container_id, segment_dir)
+    if segment is None:
+        # No usable segment: write it from all chunks
+        first_day = None
+    query = select(chunk_table.c.day, chunk_table.c.row_count, chunk_table.c.data).where(
+        chunk_table.c.container_id == container_id
+    )
+    if first_day is not None:
+        query = query.where(chunk_table.c.day >= first_day)
+    chunks = connection.execute(query.order_by(chunk_table.c.day)).all()
+    records = _encode_records([chunk.data for chunk in chunks])
+
+    keep = 0
+    if segment is not None and first_day is not None:
+        keep = segment.find(epoch_microseconds(datetime.combine(first_day, time.min)))
+    if segment is not None and keep == segment.count:
+        with open(segment_path, "r+b") as segment_file:
+            # Drop records past the indexed count, left by a sync that failed before its index was written
+            segment_file.truncate(segment.count * RECORD_SIZE)
+            segment_file.seek(0, os.SEEK_END)
+            segment_file.write(records)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+    else:
+        os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+        temporary = segment_path + ".tmp"
+        with open(temporary, "wb") as segment_file:
+            if keep:
+                segment_file.write(segment.records(0, keep))
+            segment_file.write(records)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+        os.replace(temporary, segment_path)
+    _write_index(index_path, segment_path, keep + len(records) // RECORD_SIZE)
+
+    if chunks:
+        # Chunks changed since they were read stay unsynced
+        connection.execute(
+            chunk_table.update()
+            .where(
+                chunk_table.c.container_id == container_id,
+                chunk_table.c.day == bindparam("chunk_day"),
+                chunk_table.c.row_count == bindparam("chunk_row_count"),
+            )
+            .values(segment_synced=True),
+            [{"chunk_day": chunk.day, "chunk_row_count": chunk.row_count} for chunk in chunks]
+        )
+    return len(records) // RECORD_SIZE
+
+
+def sync_metric_segments(
+    connection: Connection,
+    limit: int = SEGMENT_BATCH_SIZE,
+    segment_dir: Optional[str] = None
+) -> int:
+    """
+    Write chunks that aren't in their container's segment yet, at most `limit` containers.
+
+    Returns the number of records written.
+    """
+    first_day = func.min(chunk_table.c.day)
+    pending = connection.execute(
+        select(chunk_table.c.container_id, first_day)
+        .where(chunk_table.c.segment_synced.is_(False))
+        .group_by(chunk_table.c.container_id)
+        .order_by(first_day)
+        .limit(limit)
+    ).all()
+    written = sum(
+        _sync_container(connection, container_id, day, segment_dir)
+        for container_id, day in pending
+    )
+    if pending:
+        # Drop mappings of replaced segments so their files can be freed
+        _map_segment.cache_clear()
+    return written
+
+
+def remove_segments(container_ids: Sequence[str], segment_dir: Optional[str] = None) -> None:
+    """Delete the segment files of containers, e.g. after deleting the containers."""
+    for container_id in container_ids:
+        for path in segment_paths(container_id, segment_dir):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    _map_segment.cache_clear()
+
+
+def historical_columns(
+    connection: Connection,
+    container_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Sequence[SnapshotMetric] = METRICS,
+    segment_dir: Optional[str] = None
+) -> Tuple[array, Dict[SnapshotMetric, array]]:
+    """
+    Compacted snapshots of one container in [start, end), oldest first, as
+    columns like `cold_columns`. Synced days are sliced from the segment.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    segment = open_segment(container_id, segment_dir)
+    if segment is None:
+        return cold_columns(connection, container_id, start, end, metrics)
+
+    unsynced = connection.execute(
+        select(func.min(chunk_table.c.day)).where(
+            chunk_table.c.container_id == container_id,
+            chunk_table.c.segment_synced.is_(False)
+        )
+    ).scalar()
+    split = datetime.combine(unsynced, time.min) if unsynced is not None else None
+    segment_end = end if split is None else min(end, split) if end is not None else split
+
+    timestamps = array("q")
+    values = {metric: array("d") for metric in metrics}
+    if start is None or segment_end is None or start < segment_end:
+        lower, upper = segment.bounds(start, segment_end)
+        timestamps.frombytes(segment.timestamps[lower:upper].tobytes())
+        for metric in metrics:
+            values[metric].frombytes(segment.column(metric)[lower:upper].tobytes())
+    if split is not None and (end is None or split < end):
+        chunk_timestamps, chunk_values = cold_columns(
+            connection, container_id, split if start is None else max(start, split), end, metrics
+        )
+        timestamps.extend(chunk_timestamps)
+        for metric in metrics:
+            values[metric].extend(chunk_values[metric])
+    return timestamps, values
@@ -0,0 +1,106 @@
+"""
+Lightweight schema upgrades for existing SQLite databases.
+
+`Base.metadata.create_all` only creates missing tables, so columns and
+indexes added to existing models later are applied here: missing columns are
+added with ALTER TABLE, missing indexes are created and data migrations
+back-fill the new columns. Every step is idempotent and runs on startup.
+"""
+from typing import Callable, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.database.container_summary import reconcile_container_summaries
+from app.database.database import Base
+from app.database.latest_metrics import initialize_latest_metrics
+from app.database.metric_rollups import initialize_metric_rollups
+from app.models.enums import AlertRelatedObjectType
+from app.utils.activity_types import classify_activity
+from app.utils.alert_dedup import alert_dedup_key
+
+
+def add_missing_columns(connection: Connection) -> List[str]:
+    """Add model columns that don't exist in the database yet. Returns their names."""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(connection: Connection) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def backfill_alert_dedup_keys(connection: Connection) -> None:
+    """Compute dedup keys for alerts created before deduplication existed."""
+    rows = connection.execute(text(
+        "SELECT id, container_id, related_object_type, related_object_id, description "
+        "FROM alerts WHERE dedup_key IS NULL"
+    )).all()
+    if not rows:
+        return
+    updates = [
+        {
+            "id": row.id,
+            "dedup_key": alert_dedup_key(
+                row.container_id,
+                # Enum columns store member names
+                AlertRelatedObjectType[row.related_object_type] if row.related_object_type else None,
+                row.related_object_id,
+                row.description
+            ),
+        }
+        for row in rows
+    ]
+    connection.execute(text("UPDATE alerts SET dedup_key = :dedup_key WHERE id = :id"), updates)
+    connection.execute(text(
+        "UPDATE alerts SET last_occurred_at = created_at WHERE last_occurred_at IS NULL"
+    ))
+
+
+def backfill_activity_types(connection: Connection) -> None:
+    """Classify activity log entries written before `activity_type` existed, one update per action type."""
+    action_types = connection.execute(text(
+        "SELECT DISTINCT action_type FROM activity_logs WHERE activity_type IS NULL"
+    )).scalars().all()
+    if not action_types:
+        return
+    connection.execute(
+        text("UPDATE activity_logs SET activity_type = :activity_type "
+             "WHERE action_type = :action_type AND activity_type IS NULL"),
+        # Enum columns store member names
+        [{"action_type": action_type, "activity_type": classify_activity(action_type).name}
+         for action_type in action_types]
+    )
+
+
+# Data migrations run after the schema is up to date, in order
+DATA_MIGRATIONS: List[Callable[[Connection], None]] = [
+    backfill_alert_dedup_keys,
+    backfill_activity_types,
+    reconcile_container_summaries,
+    initialize_latest_metrics,
+    initialize_metric_rollups,
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    with engine.begin() as connection:
+        add_missing_columns(connection)
+        create_missing_indexes(connection)
+        for migration in DATA_MIGRATIONS:
+            migration(connection)
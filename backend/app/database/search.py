@@ -0,0 +1,143 @@
+"""
+Full-text search index backed by SQLite FTS5.
+
+Every searchable table gets an external-content FTS5 table keyed by the
+content table's rowid and a set of triggers that keep it in sync on
+insert, update and delete. The index is created (and back-filled for
+existing rows) whenever the metadata is created.
+
+The indexed tables have string primary keys, so their rowids are implicit
+and `VACUUM` may renumber them, leaving the FTS tables pointing at the wrong
+rows. The application never vacuums; after a manual `VACUUM`, rebuild each
+FTS table with `INSERT INTO <fts_table>(<fts_table>) VALUES ('rebuild')`.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import literal_column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import ColumnElement
+
+
+class SearchIndex(NamedTuple):
+    content_table: str
+    fts_table: str
+    columns: List[str]
+
+
+SEARCH_INDEXES: Dict[str, SearchIndex] = {
+    "container": SearchIndex(
+        "containers", "containers_fts", ["name", "location_city", "location_country", "notes"]
+    ),
+    "seed_type": SearchIndex("seed_types", "seed_types_fts", ["name", "variety", "supplier"]),
+    "tenant": SearchIndex("tenants", "tenants_fts", ["name"]),
+    "crop": SearchIndex("crop_history_entries", "crop_history_entries_fts", ["event", "notes"]),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _index_ddl(index: SearchIndex) -> List[str]:
+    columns = ", ".join(index.columns)
+    new_values = ", ".join(f"new.{column}" for column in index.columns)
+    old_values = ", ".join(f"old.{column}" for column in index.columns)
+    fts, content = index.fts_table, index.content_table
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {content} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {content} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {content} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values}); END",
+    ]
+
+
+def create_search_index(target, connection: Connection, **kw) -> None:
+    """
+    Create the FTS5 tables and sync triggers.
+
+    Newly created FTS tables are rebuilt from their content table so that
+    rows which existed before the index are searchable too.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for index in SEARCH_INDEXES.values():
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": index.fts_table}
+        ).first()
+        if not exists:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {index.fts_table} USING fts5("
+                f"{', '.join(index.columns)}, content='{index.content_table}', content_rowid='rowid')"
+            ))
+            connection.execute(text(
+                f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')"
+            ))
+        for statement in _index_ddl(index):
+            connection.execute(text(statement))
+
+
+def drop_search_index(target, connection: Connection, **kw) -> None:
+    """
+    Drop the FTS5 tables and their sync triggers.
+
+    The triggers go first: with foreign keys enabled, dropping a referenced
+    content table deletes its rows, which would fire them.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for index in SEARCH_INDEXES.values():
+        for suffix in ("ai", "ad", "au"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {index.fts_table}_{suffix}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {index.fts_table}"))
+
+
+def build_match_query(term: str, columns: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression with prefix matching.
+
+    Every word of the input must match the start of a token, optionally
+    restricted to the given columns. Returns None if the input contains
+    no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(term)
+    if not tokens:
+        return None
+    expression = " AND ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+def match_filter(search_type: str, match: str) -> ColumnElement:
+    """
+    Return a WHERE clause restricting the content table to rows matching `match`.
+
+    Usable on ORM queries of the indexed model, e.g.
+    `query.filter(match_filter("container", build_match_query("fc", ["name"])))`.
+    """
+    index = SEARCH_INDEXES[search_type]
+    matching_rowids = select(literal_column("rowid")).select_from(
+        table(index.fts_table)
+    ).where(literal_column(index.fts_table).op("MATCH")(match))
+    return literal_column(f"{index.content_table}.rowid").in_(matching_rowids)
+
+
+def text_search_filter(
+    search_type: str,
+    term: str,
+    columns: List[str],
+    *fallback_columns: ColumnElement
+) -> ColumnElement:
+    """
+    Filter an indexed model by word-prefix matches of `term` in `columns`.
+
+    Input without any searchable words (e.g. only punctuation) falls back to
+    a substring match on `fallback_columns`.
+    """
+    match = build_match_query(term, columns)
+    if match is None:
+        return or_(*(column.ilike(f"%{term}%") for column in fallback_columns))
+    return match_filter(search_type, match)
@@ -1,10 +1,12 @@
 import uuid
 from datetime import datetime
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database.database import SessionLocal
-from app.models.models import Container, Tenant, Alert, SeedType
+from app.database.deletion import delete_containers, delete_crops, remove_files
+from app.models.models import Container, Tenant, Alert, AlertRule, Crop, SeedType, container_seed_types
 from app.models.enums import ContainerType, ContainerPurpose, ContainerStatus, AlertSeverity, AlertRelatedObjectType
 from app.database.container_details_samples import create_container_details_samples
 
@@ -15,13 +17,18 @@ def update_sample_data():
     db = SessionLocal()
     
     try:
-        # Clear existing alerts and containers
-        db.query(Alert).delete()
-        db.query(Container).delete()
+        # Clear existing containers with everything that belongs to them
+        connection = db.connection()
+        paths = delete_containers(connection, db.scalars(select(Container.id)).all())
+        paths += delete_crops(connection, select(Crop.id))
+        db.query(AlertRule).delete()
+        # Links left behind by containers deleted before they were cleared along
+        db.execute(container_seed_types.delete())
         
         # Clear seed types
         db.query(SeedType).delete()
         db.commit()
+        remove_files(paths)
         
         # Clear tenants
         db.query(Tenant).delete()
@@ -1,16 +1,23 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 
 from app.api.v1.api import api_router
+from app.database.activity_log_writer import activity_log_writer
 from app.database.init_db import create_tables, populate_sample_data
+from app.database.maintenance import start_maintenance, stop_maintenance
 from app.database.update_sample_data import update_sample_data
+from app.utils.serialization import NegotiatedResponse
 
 app = FastAPI(
     title="Vertical Farming Control Panel API",
     description="API for managing vertical farming containers and related resources",
     version="0.1.0",
-    docs_url=None
+    docs_url=None,
+    # orjson encodes several times faster than the stdlib json module; v1 routes also negotiate MessagePack
+    default_response_class=NegotiatedResponse
 )
 
 # Configure CORS
@@ -32,6 +39,13 @@ async def startup_event():
     populate_sample_data()
     # Update with the specified container data
     update_sample_data()
+    start_maintenance()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background maintenance and write queued activity logs"""
+    await stop_maintenance()
+    await asyncio.to_thread(activity_log_writer.stop)
 
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
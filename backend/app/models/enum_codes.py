@@ -0,0 +1,52 @@
+"""
+MessagePack wire codes of the API enums (see app.utils.msgpack).
+
+Codes are part of the API: clients decode enum values by code, so a code
+must never change or be reused. Give new members the next free code of
+their enum and leave the codes of removed members out.
+"""
+from enum import Enum
+from typing import Dict, Type
+
+from app.models import enums
+
+# Enum -> member name -> code
+ENUM_CODES: Dict[Type[Enum], Dict[str, int]] = {
+    enums.ContainerType: {"PHYSICAL": 0, "VIRTUAL": 1},
+    enums.ContainerPurpose: {"DEVELOPMENT": 0, "RESEARCH": 1, "PRODUCTION": 2},
+    enums.ContainerStatus: {"CREATED": 0, "ACTIVE": 1, "MAINTENANCE": 2, "INACTIVE": 3},
+    enums.AlertSeverity: {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3},
+    enums.DeviceStatus: {"RUNNING": 0, "IDLE": 1, "ISSUE": 2, "OFFLINE": 3},
+    enums.ShelfPosition: {"UPPER": 0, "LOWER": 1},
+    enums.WallPosition: {"WALL_1": 0, "WALL_2": 1, "WALL_3": 2, "WALL_4": 3},
+    enums.CropLifecycleStatus: {"SEEDED": 0, "TRANSPLANTED": 1, "HARVESTED": 2, "DISPOSED": 3},
+    enums.CropHealthCheck: {"HEALTHY": 0, "TREATMENT_REQUIRED": 1, "TO_BE_DISPOSED": 2},
+    enums.LocationType: {"TRAY": 0, "PANEL": 1},
+    enums.AlertRelatedObjectType: {"DEVICE": 0, "CROP": 1, "TRAY": 2, "PANEL": 3, "CONTAINER": 4, "ENVIRONMENT": 5},
+    enums.InventoryStatus: {"AVAILABLE": 0, "IN_USE": 1, "MAINTENANCE": 2, "DISPOSED": 3},
+    enums.FAEnvironment: {"ALPHA": 0, "PROD": 1},
+    enums.PYAEnvironment: {"DEV": 0, "TEST": 1, "STAGE": 2},
+    enums.AWSEnvironment: {"DEV": 0, "PROD": 1},
+    enums.MBAIEnvironment: {"PROD": 0},
+    enums.FHEnvironment: {"PROD": 0},
+    enums.CropLocationType: {"TRAY_LOCATION": 0, "PANEL_LOCATION": 1},
+    enums.ActorType: {"USER": 0, "SYSTEM": 1},
+    enums.MetricTimeRange: {"WEEK": 0, "MONTH": 1, "QUARTER": 2, "YEAR": 3},
+    enums.SnapshotMetric: {
+        "AIR_TEMPERATURE": 0,
+        "HUMIDITY": 1,
+        "CO2": 2,
+        "YIELD_KG": 3,
+        "SPACE_UTILIZATION": 4,
+        "NURSERY_UTILIZATION": 5,
+        "CULTIVATION_UTILIZATION": 6,
+    },
+    enums.MetricBucket: {"MINUTE": 0, "HOUR": 1, "DAY": 2, "WEEK": 3, "MONTH": 4},
+    enums.MetricAggregation: {"AVG": 0, "MIN": 1, "MAX": 2, "SUM": 3, "COUNT": 4, "P5": 5, "P50": 6, "P95": 7},
+    enums.MetricRollupResolution: {"HOUR": 0, "DAY": 1},
+    enums.ExportFormat: {"NDJSON": 0, "CSV": 1},
+    enums.SearchResultType: {"CONTAINER": 0, "SEED_TYPE": 1, "TENANT": 2, "CROP": 3},
+    enums.StreamOverflowPolicy: {"COALESCE": 0, "DROP_OLDEST": 1},
+    enums.AlertRuleOperator: {"ABOVE": 0, "BELOW": 1},
+    enums.ActivityType: {"CREATED": 0, "SEEDED": 1, "SYNCED": 2, "ENVIRONMENT_CHANGED": 3, "MAINTENANCE": 4},
+}
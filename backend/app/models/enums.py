@@ -97,4 +97,62 @@ class MetricTimeRange(str, Enum):
     WEEK = "WEEK"
     MONTH = "MONTH"
     QUARTER = "QUARTER"
-    YEAR = "YEAR"
\ No newline at end of file
+    YEAR = "YEAR"
+
+class SnapshotMetric(str, Enum):
+    AIR_TEMPERATURE = "air_temperature"
+    HUMIDITY = "humidity"
+    CO2 = "co2"
+    YIELD_KG = "yield_kg"
+    SPACE_UTILIZATION = "space_utilization_percentage"
+    NURSERY_UTILIZATION = "nursery_utilization_percentage"
+    CULTIVATION_UTILIZATION = "cultivation_utilization_percentage"
+
+class MetricBucket(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class MetricAggregation(str, Enum):
+    AVG = "avg"
+    MIN = "min"
+    MAX = "max"
+    SUM = "sum"
+    COUNT = "count"
+    P5 = "p5"
+    P50 = "p50"
+    P95 = "p95"
+
+class MetricRollupResolution(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class SearchResultType(str, Enum):
+    CONTAINER = "container"
+    SEED_TYPE = "seed_type"
+    TENANT = "tenant"
+    CROP = "crop"
+
+class StreamOverflowPolicy(str, Enum):
+    COALESCE = "coalesce"
+    DROP_OLDEST = "drop_oldest"
+
+# Alert rules watch the snapshot metrics
+AlertRuleMetric = SnapshotMetric
+
+class AlertRuleOperator(str, Enum):
+    ABOVE = "above"
+    BELOW = "below"
+
+class ActivityType(str, Enum):
+    CREATED = "CREATED"
+    SEEDED = "SEEDED"
+    SYNCED = "SYNCED"
+    ENVIRONMENT_CHANGED = "ENVIRONMENT_CHANGED"
+    MAINTENANCE = "MAINTENANCE"
@@ -3,7 +3,7 @@ from typing import List, Optional
 import uuid
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, String, Table
+    Boolean, Column, Date, DateTime, Enum, Float, ForeignKey, Index, Integer, LargeBinary, String, Table, event, false, text
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.mutable import MutableDict
@@ -11,20 +11,22 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.types import JSON
 
 from app.database.database import Base
+from app.database.search import create_search_index, drop_search_index
 from app.models.enums import (
     ContainerType, ContainerPurpose, ContainerStatus, AlertSeverity,
     DeviceStatus, ShelfPosition, WallPosition, CropLifecycleStatus,
     CropHealthCheck, LocationType, AlertRelatedObjectType, InventoryStatus,
     FAEnvironment, PYAEnvironment, AWSEnvironment, MBAIEnvironment,
-    FHEnvironment, CropLocationType, ActorType
+    FHEnvironment, CropLocationType, ActorType, AlertRuleMetric, AlertRuleOperator,
+    MetricRollupResolution, SnapshotMetric, ActivityType
 )
 
 # Association table for many-to-many relationship between Container and SeedType
 container_seed_types = Table(
     'container_seed_types',
     Base.metadata,
-    Column('container_id', String, ForeignKey('containers.id')),
-    Column('seed_type_id', String, ForeignKey('seed_types.id'))
+    Column('container_id', String, ForeignKey('containers.id', ondelete='CASCADE')),
+    Column('seed_type_id', String, ForeignKey('seed_types.id', ondelete='CASCADE'))
 )
 
 class Container(Base):
@@ -40,7 +42,7 @@ class Container(Base):
     location_address = Column(String)
     notes = Column(String)
     shadow_service_enabled = Column(Boolean, default=False)
-    copied_environment_from = Column(String, ForeignKey('containers.id'))
+    copied_environment_from = Column(String, ForeignKey('containers.id', ondelete='SET NULL'))
     robotics_simulation_enabled = Column(Boolean, default=False)
     ecosystem_connected = Column(Boolean, default=False)
     ecosystem_settings = Column(MutableDict.as_mutable(JSON))
@@ -51,12 +53,15 @@ class Container(Base):
     # Relationships
     tenant = relationship("Tenant", back_populates="containers")
     seed_types = relationship("SeedType", secondary=container_seed_types, back_populates="containers")
-    alerts = relationship("Alert", back_populates="container")
-    devices = relationship("Device", back_populates="container")
-    trays = relationship("Tray", back_populates="container")
-    panels = relationship("Panel", back_populates="container")
-    activity_logs = relationship("ActivityLog", back_populates="container")
-    metric_snapshots = relationship("MetricSnapshot", back_populates="container")
+    # Deleted by the database (ON DELETE CASCADE) or app.database.deletion, never loaded for it
+    alerts = relationship("Alert", back_populates="container", passive_deletes=True)
+    devices = relationship("Device", back_populates="container", passive_deletes=True)
+    trays = relationship("Tray", back_populates="container", passive_deletes=True)
+    panels = relationship("Panel", back_populates="container", passive_deletes=True)
+    activity_logs = relationship("ActivityLog", back_populates="container", passive_deletes=True)
+    metric_snapshots = relationship("MetricSnapshot", back_populates="container", passive_deletes=True)
+    # Maintained with Core statements, never through the ORM
+    summary = relationship("ContainerSummary", uselist=False, viewonly=True)
 
 
 class Tenant(Base):
@@ -87,23 +92,46 @@ class Alert(Base):
     __tablename__ = 'alerts'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     description = Column(String, nullable=False)
     severity = Column(Enum(AlertSeverity), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     active = Column(Boolean, default=True)
     related_object_type = Column(Enum(AlertRelatedObjectType))
     related_object_id = Column(String)
+    # Identical alerts within the suppression window are folded into one row
+    dedup_key = Column(String, index=True)
+    occurrence_count = Column(Integer, default=1, server_default="1", nullable=False)
+    last_occurred_at = Column(DateTime)
 
     # Relationships
     container = relationship("Container", back_populates="alerts")
 
 
+class AlertRule(Base):
+    __tablename__ = 'alert_rules'
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = Column(String, nullable=False)
+    # A rule applies to one container, all containers of a tenant, or everything if neither is set
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), index=True)
+    tenant_id = Column(String, ForeignKey('tenants.id', ondelete='CASCADE'), index=True)
+    metric = Column(Enum(AlertRuleMetric), nullable=False)
+    operator = Column(Enum(AlertRuleOperator), nullable=False)
+    threshold = Column(Float, nullable=False)
+    # Value the metric has to return to before the alert resolves; defaults to threshold
+    clear_threshold = Column(Float)
+    duration_seconds = Column(Integer, default=0, nullable=False)
+    severity = Column(Enum(AlertSeverity), nullable=False)
+    enabled = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Device(Base):
     __tablename__ = 'devices'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     name = Column(String, nullable=False)
     model = Column(String, nullable=False)
     serial_number = Column(String, nullable=False)
@@ -120,7 +148,7 @@ class Tray(Base):
     __tablename__ = 'trays'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     rfid_tag = Column(String, unique=True, nullable=False)
     shelf = Column(Enum(ShelfPosition))
     slot_number = Column(Integer)
@@ -139,7 +167,7 @@ class Panel(Base):
     __tablename__ = 'panels'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     rfid_tag = Column(String, unique=True, nullable=False)
     wall = Column(Enum(WallPosition))
     slot_number = Column(Integer)
@@ -169,8 +197,8 @@ class Crop(Base):
     
     # Location info
     current_location_type = Column(Enum(CropLocationType))
-    tray_id = Column(String, ForeignKey('trays.id'))
-    panel_id = Column(String, ForeignKey('panels.id'))
+    tray_id = Column(String, ForeignKey('trays.id', ondelete='SET NULL'))
+    panel_id = Column(String, ForeignKey('panels.id', ondelete='SET NULL'))
     
     # Position in tray
     tray_row = Column(Integer)
@@ -191,14 +219,14 @@ class Crop(Base):
     seed_type_ref = relationship("SeedType", back_populates="crops")
     tray = relationship("Tray", back_populates="crops")
     panel = relationship("Panel", back_populates="crops")
-    history = relationship("CropHistoryEntry", back_populates="crop")
+    history = relationship("CropHistoryEntry", back_populates="crop", passive_deletes=True)
 
 
 class CropHistoryEntry(Base):
     __tablename__ = 'crop_history_entries'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    crop_id = Column(String, ForeignKey('crops.id'), nullable=False)
+    crop_id = Column(String, ForeignKey('crops.id', ondelete='CASCADE'), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     event = Column(String, nullable=False)
     performed_by = Column(String, nullable=False)
@@ -210,11 +238,16 @@ class CropHistoryEntry(Base):
 
 class ActivityLog(Base):
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        Index('ix_activity_logs_container_id_activity_type_timestamp', 'container_id', 'activity_type', 'timestamp'),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     action_type = Column(String, nullable=False)
+    # Derived from action_type on write (app.utils.activity_types)
+    activity_type = Column(Enum(ActivityType))
     actor_type = Column(Enum(ActorType), nullable=False)
     actor_id = Column(String, nullable=False)
     description = Column(String, nullable=False)
@@ -227,7 +260,7 @@ class MetricSnapshot(Base):
     __tablename__ = 'metric_snapshots'
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    container_id = Column(String, ForeignKey('containers.id'), nullable=False)
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     air_temperature = Column(Float)
     humidity = Column(Float)
@@ -240,6 +273,127 @@ class MetricSnapshot(Base):
     # Relationships
     container = relationship("Container", back_populates="metric_snapshots")
 
+    __table_args__ = (
+        # Time-range reads per container walk this index in timestamp order
+        Index('ix_metric_snapshots_container_id_timestamp', 'container_id', 'timestamp'),
+    )
+
+
+class ContainerSummary(Base):
+    """
+    Per-container counters, kept up to date on flush by
+    app.database.container_summary and corrected by its periodic reconciler.
+    """
+    __tablename__ = 'container_summary'
+
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), primary_key=True)
+    # Active alerts by severity
+    active_alerts = Column(Integer, default=0, nullable=False)
+    active_alerts_low = Column(Integer, default=0, nullable=False)
+    active_alerts_medium = Column(Integer, default=0, nullable=False)
+    active_alerts_high = Column(Integer, default=0, nullable=False)
+    active_alerts_critical = Column(Integer, default=0, nullable=False)
+    # Devices by status
+    devices_running = Column(Integer, default=0, nullable=False)
+    devices_idle = Column(Integer, default=0, nullable=False)
+    devices_issue = Column(Integer, default=0, nullable=False)
+    devices_offline = Column(Integer, default=0, nullable=False)
+    # Crops by lifecycle status and health check
+    crops_seeded = Column(Integer, default=0, nullable=False)
+    crops_transplanted = Column(Integer, default=0, nullable=False)
+    crops_harvested = Column(Integer, default=0, nullable=False)
+    crops_disposed = Column(Integer, default=0, nullable=False)
+    crops_healthy = Column(Integer, default=0, nullable=False)
+    crops_treatment_required = Column(Integer, default=0, nullable=False)
+    crops_to_be_disposed = Column(Integer, default=0, nullable=False)
+    # Inventory
+    trays_total = Column(Integer, default=0, nullable=False)
+    trays_in_use = Column(Integer, default=0, nullable=False)
+    panels_total = Column(Integer, default=0, nullable=False)
+    panels_in_use = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    container = relationship("Container", viewonly=True)
+
+
+class ContainerLatestMetrics(Base):
+    """
+    Most recent value of every metric per container, upserted on snapshot
+    ingest by app.database.latest_metrics.
+    """
+    __tablename__ = 'container_latest_metrics'
+
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), primary_key=True)
+    snapshot_id = Column(String)
+    timestamp = Column(DateTime, nullable=False)
+    air_temperature = Column(Float)
+    humidity = Column(Float)
+    co2 = Column(Float)
+    yield_kg = Column(Float)
+    space_utilization_percentage = Column(Float)
+    nursery_utilization_percentage = Column(Float)
+    cultivation_utilization_percentage = Column(Float)
+
+    # Relationships
+    container = relationship("Container", viewonly=True)
+
+
+class MetricRollup(Base):
+    """
+    Per container, metric and hour/day bucket aggregates of the metric snapshots,
+    maintained on snapshot ingest by app.database.metric_rollups. `sketch` is a
+    serialized t-digest of the bucket's values, set once the bucket is complete.
+    """
+    __tablename__ = 'metric_rollups'
+
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), primary_key=True)
+    resolution = Column(Enum(MetricRollupResolution), primary_key=True)
+    metric = Column(Enum(SnapshotMetric), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    value_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    sketch = Column(LargeBinary)
+
+
+class MetricChunk(Base):
+    """
+    Metric snapshots of one container and day, moved out of `metric_snapshots`
+    once cold by app.database.metric_chunks. `data` is a Gorilla-encoded block
+    (app.utils.gorilla) of the timestamps and one column per SnapshotMetric.
+    """
+    __tablename__ = 'metric_chunks'
+    __table_args__ = (
+        Index('ix_metric_chunks_unsynced', 'container_id', 'day', sqlite_where=text('segment_synced = 0')),
+    )
+
+    container_id = Column(String, ForeignKey('containers.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+    first_timestamp = Column(DateTime, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    # Written to the container's segment file (app.database.metric_segments)
+    segment_synced = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class ArchivePartition(Base):
+    """
+    Rows moved out of a hot table by app.database.archive, per owner (container
+    of an activity log entry, crop of a history entry) and day. Each partition
+    has its own archive file holding only that owner's rows of the day.
+    """
+    __tablename__ = 'archive_partitions'
+
+    table_name = Column(String, primary_key=True)
+    owner_id = Column(String, primary_key=True)
+    partition_day = Column(Date, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+    min_timestamp = Column(DateTime, nullable=False)
+    max_timestamp = Column(DateTime, nullable=False)
+
 
 class EnvironmentLinks(Base):
     __tablename__ = 'environment_links'
@@ -253,4 +407,12 @@ class EnvironmentLinks(Base):
     aws_dev = Column(String)
     aws_prod = Column(String)
     mbai_prod = Column(String)
-    fh_prod = Column(String)
\ No newline at end of file
+    fh_prod = Column(String)
+
+
+# Keep the full-text search index in sync with the tables above
+event.listen(Base.metadata, "after_create", create_search_index)
+event.listen(Base.metadata, "before_drop", drop_search_index)
+
+# Keep the derived per-container tables up to date; registers ORM event listeners
+from app.database import container_summary, latest_metrics, metric_rollups  # noqa: E402,F401
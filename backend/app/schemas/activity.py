@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional, List, Dict
 from pydantic import BaseModel, Field
 
-from app.models.enums import ActorType
+from app.models.enums import ActivityType, ActorType
 
 
 class ActivityLogBase(BaseModel):
@@ -14,12 +14,23 @@ class ActivityLogBase(BaseModel):
 
 class ActivityLogCreate(ActivityLogBase):
     container_id: str = Field(..., description="Container ID")
+    timestamp: Optional[datetime] = Field(None, description="When the activity happened (defaults to now)")
+
+
+class ActivityLogBatchCreate(BaseModel):
+    entries: List[ActivityLogCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class ActivityLogBatchAccepted(BaseModel):
+    accepted: int = Field(..., description="Number of queued entries")
+    ids: List[str] = Field(..., description="IDs the entries will be stored under, in request order")
 
 
 class ActivityLog(ActivityLogBase):
     id: str
     container_id: str
     timestamp: datetime
+    activity_type: Optional[ActivityType] = Field(None, description="Activity type derived from action_type")
 
     class Config:
         from_attributes = True
@@ -29,6 +29,9 @@ class AlertInDBBase(AlertBase):
     id: str
     container_id: str
     created_at: datetime
+    dedup_key: Optional[str] = None
+    occurrence_count: int = 1
+    last_occurred_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -50,4 +53,26 @@ class AlertSummary(BaseModel):
 
 class AlertList(BaseModel):
     total: int
-    results: List[Alert]
\ No newline at end of file
+    results: List[Alert]
+
+
+class AlertGroup(BaseModel):
+    dedup_key: str
+    container_id: str
+    description: str = Field(..., description="Description of the most recent alert in the group")
+    severity: AlertSeverity = Field(..., description="Severity of the most recent alert in the group")
+    related_object_type: Optional[AlertRelatedObjectType] = None
+    related_object_id: Optional[str] = None
+    alert_count: int = Field(..., description="Number of alert rows in the group")
+    active_count: int = Field(..., description="Number of active alert rows in the group")
+    occurrence_count: int = Field(..., description="Total occurrences, including suppressed duplicates")
+    first_created_at: datetime
+    last_occurred_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AlertGroupList(BaseModel):
+    total: int
+    results: List[AlertGroup]
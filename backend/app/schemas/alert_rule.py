@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional, List
+from pydantic import BaseModel, Field
+
+from app.models.enums import AlertSeverity, AlertRuleMetric, AlertRuleOperator
+
+
+class AlertRuleBase(BaseModel):
+    name: str = Field(..., description="Rule name, used as the alert description prefix")
+    container_id: Optional[str] = Field(None, description="Container the rule applies to")
+    tenant_id: Optional[str] = Field(None, description="Tenant whose containers the rule applies to")
+    metric: AlertRuleMetric = Field(..., description="Snapshot metric to watch")
+    operator: AlertRuleOperator = Field(..., description="Fire when the metric is above or below the threshold")
+    threshold: float = Field(..., description="Threshold that opens the alert")
+    clear_threshold: Optional[float] = Field(
+        None, description="Threshold the metric has to cross back before the alert resolves (hysteresis)"
+    )
+    duration_seconds: int = Field(0, ge=0, description="How long the threshold must be exceeded before firing")
+    severity: AlertSeverity = Field(..., description="Severity of the alerts opened by this rule")
+    enabled: bool = True
+
+
+class AlertRuleCreate(AlertRuleBase):
+    pass
+
+
+class AlertRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    threshold: Optional[float] = None
+    clear_threshold: Optional[float] = None
+    duration_seconds: Optional[int] = Field(None, ge=0)
+    severity: Optional[AlertSeverity] = None
+    enabled: Optional[bool] = None
+
+
+class AlertRuleInDBBase(AlertRuleBase):
+    id: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AlertRule(AlertRuleInDBBase):
+    pass
+
+
+class AlertRuleList(BaseModel):
+    total: int
+    results: List[AlertRule]
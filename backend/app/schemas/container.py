@@ -125,6 +125,39 @@ class ContainerStats(BaseModel):
     virtual_count: int
 
 
+class ContainerCounts(BaseModel):
+    container_id: str
+    active_alerts: int
+    active_alerts_low: int
+    active_alerts_medium: int
+    active_alerts_high: int
+    active_alerts_critical: int
+    devices_running: int
+    devices_idle: int
+    devices_issue: int
+    devices_offline: int
+    crops_seeded: int
+    crops_transplanted: int
+    crops_harvested: int
+    crops_disposed: int
+    crops_healthy: int
+    crops_treatment_required: int
+    crops_to_be_disposed: int
+    trays_total: int
+    trays_in_use: int
+    panels_total: int
+    panels_in_use: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ContainerCountsList(BaseModel):
+    total: int
+    results: List[ContainerCounts]
+
+
 class SystemIntegration(BaseModel):
     name: str
     enabled: bool
@@ -2,6 +2,8 @@ from datetime import date, datetime
 from typing import Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 
+from app.models.enums import ContainerType, MetricAggregation, MetricBucket, SnapshotMetric
+
 
 class MetricSnapshotBase(BaseModel):
     air_temperature: Optional[float] = None
@@ -26,6 +28,82 @@ class MetricSnapshot(MetricSnapshotBase):
         from_attributes = True
 
 
+class LatestMetrics(MetricSnapshotBase):
+    container_id: str
+    snapshot_id: Optional[str] = None
+    timestamp: datetime = Field(..., description="Timestamp of the latest snapshot")
+
+    class Config:
+        from_attributes = True
+
+
+class LatestMetricsList(BaseModel):
+    total: int
+    results: List[LatestMetrics]
+
+
+class MetricQueryPoint(BaseModel):
+    timestamp: datetime = Field(..., description="Start of the bucket")
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sum: Optional[float] = None
+    count: Optional[int] = None
+    p5: Optional[float] = None
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+
+
+class MetricQuerySeries(BaseModel):
+    container_id: str
+    metric: SnapshotMetric
+    points: List[MetricQueryPoint]
+
+
+class MetricQueryResult(BaseModel):
+    bucket: MetricBucket
+    start: datetime
+    end: datetime
+    aggregations: List[MetricAggregation]
+    source: str = Field(..., description="'raw', or the rollup resolution the query was answered from")
+    series: List[MetricQuerySeries]
+
+
+class MetricPercentileResult(BaseModel):
+    container_id: str
+    metric: SnapshotMetric
+    count: int
+    min: float
+    max: float
+    percentiles: Dict[str, float] = Field(..., description="Estimated value per requested percentile")
+
+
+class MetricPercentiles(BaseModel):
+    start: datetime
+    end: datetime
+    results: List[MetricPercentileResult]
+
+
+class ComparedContainer(BaseModel):
+    id: str
+    name: str
+    type: ContainerType
+
+
+class MetricComparison(BaseModel):
+    metric: SnapshotMetric
+    bucket: MetricBucket
+    aggregation: MetricAggregation
+    start: datetime
+    end: datetime
+    source: str = Field(..., description="'raw', or the rollup resolution the query was answered from")
+    containers: List[ComparedContainer]
+    timestamps: List[datetime] = Field(..., description="Bucket starts shared by all value arrays")
+    values: Dict[str, List[Optional[float]]] = Field(
+        ..., description="Per container ID, one value per timestamp (null where the container has no data)"
+    )
+
+
 class DailyMetric(BaseModel):
     date: date
     value: float
@@ -0,0 +1,19 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from app.models.enums import SearchResultType
+
+
+class SearchHit(BaseModel):
+    type: SearchResultType
+    id: str
+    title: str
+    subtitle: Optional[str] = None
+    score: float = Field(..., description="Relevance score, higher is better")
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    facets: Dict[str, int] = Field(..., description="Number of matches per result type")
+    results: List[SearchHit]
@@ -0,0 +1,36 @@
+"""
+Activity types of activity log entries.
+
+`action_type` is free-form text; the container activity feed groups entries
+into a few `ActivityType`s by keywords in it. The type is computed once when
+an entry is written and stored in the indexed `activity_type` column, so
+entries can be filtered by type in SQL.
+"""
+from sqlalchemy import event
+
+from app.models.enums import ActivityType
+from app.models.models import ActivityLog
+
+# Checked in order; the first keyword found in the action type wins
+ACTIVITY_TYPE_KEYWORDS = (
+    ("seed", ActivityType.SEEDED),
+    ("sync", ActivityType.SYNCED),
+    ("environment", ActivityType.ENVIRONMENT_CHANGED),
+    ("maintenance", ActivityType.MAINTENANCE),
+)
+
+
+def classify_activity(action_type: str) -> ActivityType:
+    """Activity type of a free-form action type, CREATED when no keyword matches."""
+    action = action_type.lower()
+    for keyword, activity_type in ACTIVITY_TYPE_KEYWORDS:
+        if keyword in action:
+            return activity_type
+    return ActivityType.CREATED
+
+
+@event.listens_for(ActivityLog, "before_insert")
+def set_activity_type(mapper, connection, log: ActivityLog) -> None:
+    """Classify entries inserted without an activity type, e.g. sample data."""
+    if log.activity_type is None:
+        log.activity_type = classify_activity(log.action_type)
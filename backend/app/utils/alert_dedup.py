@@ -0,0 +1,128 @@
+"""
+Alert deduplication and storm suppression.
+
+Alerts describing the same problem share a dedup key built from the
+container, the related object and a fingerprint of the description in which
+numbers are masked, so "Temperature 25.3" and "Temperature 25.4" are the same
+alert. While an active alert with the same key was seen within the
+suppression window, new occurrences only bump its counter and timestamp
+instead of inserting another row.
+"""
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.enums import AlertSeverity, AlertRelatedObjectType
+from app.models.models import Alert
+
+SUPPRESSION_WINDOW = timedelta(seconds=int(os.getenv("ALERT_SUPPRESSION_WINDOW_SECONDS", "900")))
+
+SEVERITY_ORDER = {severity: rank for rank, severity in enumerate(AlertSeverity)}
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def alert_fingerprint(description: str) -> str:
+    """Normalize a description so that alerts differing only in values match."""
+    masked = _NUMBER_RE.sub("#", description.lower())
+    return _SPACE_RE.sub(" ", masked).strip()
+
+
+def alert_dedup_key(
+    container_id: str,
+    related_object_type: Optional[AlertRelatedObjectType],
+    related_object_id: Optional[str],
+    description: str
+) -> str:
+    parts = [
+        container_id,
+        related_object_type.value if related_object_type else "",
+        related_object_id or "",
+        alert_fingerprint(description),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@event.listens_for(Alert, "before_insert")
+def set_dedup_key(mapper, connection, alert: Alert) -> None:
+    """Key alerts inserted without record_alert, e.g. sample data."""
+    if alert.dedup_key is None:
+        alert.dedup_key = alert_dedup_key(
+            alert.container_id, alert.related_object_type, alert.related_object_id, alert.description
+        )
+    if alert.created_at is None:
+        alert.created_at = datetime.utcnow()
+    if alert.last_occurred_at is None:
+        alert.last_occurred_at = alert.created_at
+
+
+# Attributes the dedup key is built from
+DEDUP_KEY_ATTRIBUTES = ("container_id", "related_object_type", "related_object_id", "description")
+
+
+@event.listens_for(Alert, "before_update")
+def update_dedup_key(mapper, connection, alert: Alert) -> None:
+    """Re-key alerts whose description or related object was edited."""
+    state = inspect(alert)
+    if any(state.attrs[name].history.has_changes() for name in DEDUP_KEY_ATTRIBUTES):
+        alert.dedup_key = alert_dedup_key(
+            alert.container_id, alert.related_object_type, alert.related_object_id, alert.description
+        )
+
+
+def record_alert(
+    db: Session,
+    *,
+    container_id: str,
+    description: str,
+    severity: AlertSeverity,
+    related_object_type: Optional[AlertRelatedObjectType] = None,
+    related_object_id: Optional[str] = None,
+    active: bool = True,
+    now: Optional[datetime] = None
+) -> Tuple[Alert, bool]:
+    """
+    Add a new alert to the session or fold it into a recent duplicate.
+
+    Returns the alert and whether it was newly created. A duplicate takes the
+    latest description and the higher of both severities. Nothing is committed.
+    """
+    now = now or datetime.utcnow()
+    dedup_key = alert_dedup_key(container_id, related_object_type, related_object_id, description)
+
+    if active:
+        existing = db.query(Alert).filter(
+            Alert.dedup_key == dedup_key,
+            Alert.active.is_(True),
+            Alert.last_occurred_at >= now - SUPPRESSION_WINDOW
+        ).order_by(Alert.last_occurred_at.desc()).first()
+        if existing:
+            existing.occurrence_count = (existing.occurrence_count or 1) + 1
+            existing.last_occurred_at = now
+            existing.description = description
+            if SEVERITY_ORDER[severity] > SEVERITY_ORDER[existing.severity]:
+                existing.severity = severity
+            return existing, False
+
+    alert = Alert(
+        id=str(uuid.uuid4()),
+        container_id=container_id,
+        description=description,
+        severity=severity,
+        active=active,
+        related_object_type=related_object_type,
+        related_object_id=related_object_id,
+        dedup_key=dedup_key,
+        occurrence_count=1,
+        created_at=now,
+        last_occurred_at=now
+    )
+    db.add(alert)
+    return alert, True
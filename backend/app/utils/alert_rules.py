@@ -0,0 +1,209 @@
+"""
+Threshold alert rules evaluated incrementally as metric snapshots arrive.
+
+Enabled rules are cached in memory, indexed by container, tenant and global
+scope, together with a small state per (rule, container): when the threshold
+was first exceeded and which alert is currently open. Evaluating a snapshot
+only touches the rules that apply to its container and their state, so the
+cost per snapshot does not grow with the history or the number of containers.
+
+A rule opens an `Alert` once its threshold has been exceeded for at least
+`duration_seconds` and resolves it when the metric crosses back over
+`clear_threshold` (hysteresis), so a value oscillating around the threshold
+doesn't open and resolve alerts on every snapshot.
+
+Evaluation doesn't change the cached state: it returns the new states with
+the alerts, and the caller applies them once the alerts are committed, so a
+failed commit can't leave a rule pointing at an alert that doesn't exist.
+The lock only guards the cache; database queries run outside it.
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.enums import AlertRelatedObjectType, AlertRuleOperator
+from app.models.models import Alert, AlertRule, Container, MetricSnapshot
+from app.utils.alert_dedup import record_alert
+
+
+@dataclass
+class RuleState:
+    breaching_since: Optional[datetime] = None
+    alert_id: Optional[str] = None
+
+
+@dataclass
+class RuleEvaluation:
+    """Alerts opened or resolved for a snapshot, and the rule states to apply after committing them."""
+    changes: List[Tuple[Alert, str]] = field(default_factory=list)
+    states: Dict[Tuple[str, str], RuleState] = field(default_factory=dict)
+    # Cache generation the states were computed from
+    generation: int = 0
+
+
+@dataclass(frozen=True)
+class CachedRule:
+    id: str
+    name: str
+    metric: str
+    operator: AlertRuleOperator
+    threshold: float
+    clear_threshold: float
+    duration: timedelta
+    severity: str
+
+    def breaches(self, value: float) -> bool:
+        if self.operator == AlertRuleOperator.ABOVE:
+            return value > self.threshold
+        return value < self.threshold
+
+    def clears(self, value: float) -> bool:
+        if self.operator == AlertRuleOperator.ABOVE:
+            return value <= self.clear_threshold
+        return value >= self.clear_threshold
+
+
+class AlertRuleEngine:
+    """Evaluates the cached rules against new snapshots and opens/resolves alerts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Incremented by invalidate(); states computed from an older cache are dropped
+        self._generation = 0
+        self._by_container: Dict[str, List[CachedRule]] = {}
+        self._by_tenant: Dict[str, List[CachedRule]] = {}
+        self._global: List[CachedRule] = []
+        self._states: Dict[Tuple[str, str], RuleState] = {}
+
+    def invalidate(self) -> None:
+        """Drop the cache; it is reloaded on the next evaluation. Call after changing rules."""
+        with self._lock:
+            self._loaded = False
+            self._generation += 1
+
+    def _read(self, db: Session):
+        by_container: Dict[str, List[CachedRule]] = {}
+        by_tenant: Dict[str, List[CachedRule]] = {}
+        global_rules: List[CachedRule] = []
+        for rule in db.query(AlertRule).filter(AlertRule.enabled.is_(True)):
+            cached = CachedRule(
+                id=rule.id,
+                name=rule.name,
+                metric=rule.metric.value,
+                operator=rule.operator,
+                threshold=rule.threshold,
+                clear_threshold=rule.clear_threshold if rule.clear_threshold is not None else rule.threshold,
+                duration=timedelta(seconds=rule.duration_seconds or 0),
+                severity=rule.severity,
+            )
+            if rule.container_id:
+                by_container.setdefault(rule.container_id, []).append(cached)
+            elif rule.tenant_id:
+                by_tenant.setdefault(rule.tenant_id, []).append(cached)
+            else:
+                global_rules.append(cached)
+
+        # Rebuild the state from the alerts that are still open; pending durations restart
+        states = {}
+        open_alerts = db.query(Alert.id, Alert.container_id, Alert.related_object_id).filter(
+            Alert.active.is_(True),
+            Alert.related_object_type == AlertRelatedObjectType.ENVIRONMENT,
+            Alert.related_object_id.isnot(None)
+        )
+        for alert_id, container_id, rule_id in open_alerts:
+            states[(rule_id, container_id)] = RuleState(alert_id=alert_id)
+        return by_container, by_tenant, global_rules, states
+
+    def _ensure_loaded(self, db: Session) -> None:
+        while True:
+            with self._lock:
+                if self._loaded:
+                    return
+                generation = self._generation
+            loaded = self._read(db)
+            with self._lock:
+                # Rules changed while reading: read again
+                if self._generation == generation:
+                    self._by_container, self._by_tenant, self._global, self._states = loaded
+                    self._loaded = True
+                    return
+
+    def rules_for(self, container: Container) -> List[CachedRule]:
+        return (
+            self._by_container.get(container.id, [])
+            + self._by_tenant.get(container.tenant_id, [])
+            + self._global
+        )
+
+    def evaluate(
+        self,
+        db: Session,
+        container: Container,
+        snapshot: MetricSnapshot
+    ) -> RuleEvaluation:
+        """
+        Evaluate the rules of `container` against a new snapshot.
+
+        Opened and resolved alerts are added to the session but not committed;
+        opening goes through alert deduplication like any other alert. Pass
+        the result to `apply` after the commit, then publish its changes.
+        """
+        self._ensure_loaded(db)
+        timestamp = snapshot.timestamp or datetime.utcnow()
+        evaluation = RuleEvaluation()
+        opening: List[Tuple[CachedRule, float]] = []
+        resolving: List[Tuple[str, str]] = []
+        with self._lock:
+            evaluation.generation = self._generation
+            for rule in self.rules_for(container):
+                value = getattr(snapshot, rule.metric)
+                if value is None:
+                    continue
+                current = self._states.get((rule.id, container.id), RuleState())
+                state = evaluation.states[(rule.id, container.id)] = RuleState(
+                    current.breaching_since, current.alert_id
+                )
+
+                if state.alert_id is None:
+                    if not rule.breaches(value):
+                        state.breaching_since = None
+                        continue
+                    if state.breaching_since is None:
+                        state.breaching_since = timestamp
+                    if timestamp - state.breaching_since >= rule.duration:
+                        opening.append((rule, value))
+                elif rule.clears(value):
+                    resolving.append((rule.id, state.alert_id))
+
+        for rule, value in opening:
+            alert, created = record_alert(
+                db,
+                container_id=container.id,
+                description=f"{rule.name}: {rule.metric} {value:g} {rule.operator.value} {rule.threshold:g}",
+                severity=rule.severity,
+                related_object_type=AlertRelatedObjectType.ENVIRONMENT,
+                related_object_id=rule.id
+            )
+            evaluation.states[(rule.id, container.id)] = RuleState(alert_id=alert.id)
+            evaluation.changes.append((alert, "alert_created" if created else "alert_updated"))
+        for rule_id, alert_id in resolving:
+            evaluation.states[(rule_id, container.id)] = RuleState()
+            alert = db.get(Alert, alert_id)
+            # The alert may have been resolved or deleted by hand in the meantime
+            if alert is not None and alert.active:
+                alert.active = False
+                evaluation.changes.append((alert, "alert_resolved"))
+        return evaluation
+
+    def apply(self, evaluation: RuleEvaluation) -> None:
+        """Record the rule states of an evaluation whose alerts have been committed."""
+        with self._lock:
+            if evaluation.generation == self._generation:
+                self._states.update(evaluation.states)
+
+
+alert_rule_engine = AlertRuleEngine()
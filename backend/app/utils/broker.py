@@ -0,0 +1,158 @@
+"""
+In-process publish/subscribe broker for live container events.
+
+Write endpoints run in the threadpool and publish events after they commit;
+subscribers are streaming responses on the event loop. Every subscriber has
+its own bounded buffer so a slow client can never block publishers or other
+clients. When the buffer is full the oldest event is dropped and the client
+is told how many events it missed. With the coalesce policy, events sharing
+a coalesce key (e.g. the latest metric snapshot of a container) replace the
+pending one instead of queuing up.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set
+
+from pydantic import BaseModel
+
+from app.models.enums import StreamOverflowPolicy
+
+DEFAULT_MAX_QUEUE = 100
+
+
+class Message(NamedTuple):
+    id: int
+    event: str
+    data: str
+
+    def frame(self) -> str:
+        """Format the message as a Server-Sent Events frame."""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    """A bounded buffer of messages for one subscriber."""
+
+    def __init__(
+        self,
+        topics: Optional[Set[str]],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        policy: StreamOverflowPolicy = StreamOverflowPolicy.COALESCE
+    ):
+        self.topics = topics
+        self.max_queue = max_queue
+        self.policy = policy
+        self.dropped = 0
+        self._loop = loop or asyncio.get_running_loop()
+        self._pending: "OrderedDict[Any, Message]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def put(self, message: Message, coalesce_key: Optional[str] = None) -> None:
+        """Buffer a message; safe to call from any thread."""
+        key = message.id
+        if coalesce_key is not None and self.policy == StreamOverflowPolicy.COALESCE:
+            key = coalesce_key
+        with self._lock:
+            if key in self._pending:
+                # Keep the position of the pending message, replace its content
+                self._pending[key] = message
+            else:
+                if len(self._pending) >= self.max_queue:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                self._pending[key] = message
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The subscriber's loop is closed; it will be unsubscribed shortly
+            pass
+
+    def take_dropped(self) -> int:
+        """Return and reset the number of messages dropped since the last call."""
+        with self._lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Message]:
+        """Wait for the next message; returns None if none arrived within timeout."""
+        while True:
+            with self._lock:
+                if self._pending:
+                    return self._pending.popitem(last=False)[1]
+                self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+class Broker:
+    """Routes published events to the subscriptions of their topic."""
+
+    def __init__(self):
+        self._subscriptions: Dict[Optional[str], Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        policy: StreamOverflowPolicy = StreamOverflowPolicy.COALESCE
+    ) -> Subscription:
+        """Subscribe to the given topics, or to every topic if none are given."""
+        topic_set = set(topics) if topics else None
+        subscription = Subscription(topic_set, loop, max_queue, policy)
+        with self._lock:
+            for topic in topic_set or [None]:
+                self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics or [None]:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        """Cheap check so publishers can skip building payloads nobody receives."""
+        return topic in self._subscriptions or None in self._subscriptions
+
+    def publish(
+        self,
+        topic: str,
+        event: str,
+        data: Any,
+        coalesce_key: Optional[str] = None
+    ) -> int:
+        """
+        Publish an event to every subscriber of `topic`.
+
+        The payload is serialized once and shared by all subscribers. Returns
+        the number of subscribers the event was delivered to.
+        """
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ())) + list(self._subscriptions.get(None, ()))
+        if not subscribers:
+            return 0
+
+        if isinstance(data, BaseModel):
+            payload = data.model_dump_json()
+        else:
+            payload = json.dumps(data, default=str)
+        message = Message(next(self._ids), event, payload)
+        for subscription in subscribers:
+            subscription.put(message, coalesce_key)
+        return len(subscribers)
+
+
+broker = Broker()
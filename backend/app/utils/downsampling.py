@@ -0,0 +1,69 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for chart series.
+
+LTTB keeps the first and last point and splits the rest into equal buckets.
+From each bucket it keeps the point forming the largest triangle with the
+point kept from the previous bucket and the average of the next bucket. Peaks
+and dips survive, unlike with averaging or taking every n-th point.
+
+The input is consumed as a stream: only two buckets are held in memory, so
+the rows can come straight from a `yield_per` query in timestamp order.
+"""
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def _buckets(rows: Iterator[T], count: int, threshold: int) -> Iterator[List[T]]:
+    """Split everything after the first row into threshold - 2 buckets plus the remainder."""
+    position = 1
+    for index in range(threshold - 2):
+        end = (index + 1) * (count - 2) // (threshold - 2) + 1
+        yield list(islice(rows, end - position))
+        position = end
+    # Normally just the last row, more if rows were added since counting
+    yield list(rows)
+
+
+def lttb(
+    rows: Iterable[T],
+    count: int,
+    threshold: int,
+    x: Callable[[T], float],
+    y: Callable[[T], float]
+) -> Iterator[T]:
+    """
+    Downsample `rows`, ordered by x, to at most `threshold` rows.
+
+    `count` is the number of rows, known up front so the rows can be streamed.
+    Series that already fit are returned unchanged.
+    """
+    rows = iter(rows)
+    if count <= threshold or threshold < 3:
+        yield from rows
+        return
+
+    first = next(rows, None)
+    if first is None:
+        return
+    yield first
+    ax, ay = x(first), y(first)
+
+    buckets = _buckets(rows, count, threshold)
+    current = next(buckets)
+    for following in buckets:
+        if current and following:
+            avg_x = sum(x(row) for row in following) / len(following)
+            avg_y = sum(y(row) for row in following) / len(following)
+            # Twice the triangle area; the constant factor doesn't change the maximum
+            selected = max(
+                current,
+                key=lambda row: abs((ax - avg_x) * (y(row) - ay) - (ax - x(row)) * (avg_y - ay))
+            )
+            yield selected
+            ax, ay = x(selected), y(selected)
+        current = following
+
+    if current:
+        yield current[-1]
@@ -0,0 +1,65 @@
+"""
+Sparse fieldsets for list endpoints (`?fields=id,name,status`).
+
+Thin clients such as dashboard tiles only need a few fields per row. A list
+endpoint maps each field of its response schema to a SQL expression; when
+`fields` is given, only those expressions are SELECTed and rows are rendered
+with a schema holding just the requested fields, so both the database read
+and the payload shrink.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, create_model
+
+from app.utils.serialization import model_response
+
+# Cached partial schemas; one per schema and field combination in use
+SPARSE_SCHEMA_CACHE_SIZE = 256
+
+
+def column_fields(model: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Schema fields backed by a model column of the same name."""
+    columns = model.__table__.columns
+    return {name: getattr(model, name) for name in schema.model_fields if name in columns}
+
+
+def parse_fields(fields: Optional[str], available: Mapping[str, Any]) -> Optional[List[str]]:
+    """
+    Split a comma separated `fields` value, in request order without duplicates.
+
+    Returns None when `fields` is absent (all fields). Unknown or missing field
+    names are a 400.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}; "
+                   f"available fields: {', '.join(available)}"
+        )
+    return names
+
+
+@lru_cache(maxsize=SPARSE_SCHEMA_CACHE_SIZE)
+def sparse_list_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A `{total, results}` list schema whose items have only `fields` of `schema`."""
+    item = create_model(
+        f"{schema.__name__}Fields",
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    )
+    return create_model(f"{schema.__name__}FieldsList", total=(int, ...), results=(List[item], ...))
+
+
+def select_fields(query: Any, available: Mapping[str, Any], fields: Sequence[str]) -> Any:
+    """Restrict an ORM query to the columns of `fields`, labelled with the field names."""
+    return query.with_entities(*(available[name].label(name) for name in fields))
+
+
+def sparse_response(schema: Type[BaseModel], fields: Sequence[str], total: int, rows: Sequence[Any]) -> ORJSONResponse:
+    return model_response(sparse_list_schema(schema, tuple(fields)), {"total": total, "results": rows})
@@ -0,0 +1,245 @@
+"""
+Gorilla compression for metric time series (Pelkonen et al., "Gorilla: A
+Fast, Scalable, In-Memory Time Series Database", VLDB 2015).
+
+A block holds one timestamp column and any number of float columns, each
+encoded as its own bit stream so readers decode only the columns they need:
+
+- timestamps (integer microseconds) as delta-of-delta; regular sampling
+  intervals cost one bit per row
+- floats XORed with the previous value of the column, storing only the
+  meaningful bits of the result; repeated values cost one bit, slowly
+  changing sensor readings a few bits more than their changing mantissa
+
+Missing values (None or NaN, as SQLite has no NaN) are left out of the value
+stream and recorded in a presence bitmap, written only for columns that have
+gaps. Decoding returns `array.array` columns: int64 timestamps and float64
+values with NaN for missing ones, the layout of app.utils.npz.
+"""
+import math
+import struct
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+VERSION = 1
+
+# Version, row count, column count; followed by the byte length of every stream
+_HEADER = struct.Struct("<BIB")
+_LENGTH = struct.Struct("<I")
+
+_MASK64 = (1 << 64) - 1
+
+# Delta-of-delta ranges: (prefix, prefix bits, value bits); anything larger is '11111' + 64 bits
+_DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 12), (0b1110, 4, 20), (0b11110, 5, 32))
+
+
+class BitWriter:
+    __slots__ = ("_bytes", "_acc", "_bits")
+
+    def __init__(self):
+        self._bytes = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, width: int) -> None:
+        """Append the low `width` bits of a non-negative `value`, most significant first."""
+        self._acc = (self._acc << width) | value
+        self._bits += width
+        while self._bits >= 8:
+            self._bits -= 8
+            self._bytes.append((self._acc >> self._bits) & 0xff)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            return bytes(self._bytes) + bytes([(self._acc << (8 - self._bits)) & 0xff])
+        return bytes(self._bytes)
+
+
+class BitReader:
+    __slots__ = ("_data", "_position", "_acc", "_bits")
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._position = 0
+        self._acc = 0
+        self._bits = 0
+
+    def read(self, width: int) -> int:
+        while self._bits < width:
+            self._acc = (self._acc << 8) | self._data[self._position]
+            self._position += 1
+            self._bits += 8
+        self._bits -= width
+        value = self._acc >> self._bits
+        self._acc &= (1 << self._bits) - 1
+        return value
+
+
+def _signed(value: int, width: int) -> int:
+    return value - (1 << width) if value >= 1 << (width - 1) else value
+
+
+def encode_timestamps(timestamps: Sequence[int]) -> bytes:
+    writer = BitWriter()
+    previous = delta = 0
+    for index, timestamp in enumerate(timestamps):
+        if index == 0:
+            writer.write(timestamp & _MASK64, 64)
+            previous = timestamp
+            continue
+        new_delta = timestamp - previous
+        dod = new_delta - delta
+        if dod == 0:
+            writer.write(0, 1)
+        else:
+            for prefix, prefix_bits, value_bits in _DOD_BUCKETS:
+                if -(1 << (value_bits - 1)) <= dod < 1 << (value_bits - 1):
+                    writer.write(prefix, prefix_bits)
+                    writer.write(dod & ((1 << value_bits) - 1), value_bits)
+                    break
+            else:
+                writer.write(0b11111, 5)
+                writer.write(dod & _MASK64, 64)
+        previous, delta = timestamp, new_delta
+    return writer.getvalue()
+
+
+def decode_timestamps(data: bytes, count: int) -> array:
+    timestamps = array("q")
+    if not count:
+        return timestamps
+    reader = BitReader(data)
+    previous = _signed(reader.read(64), 64)
+    timestamps.append(previous)
+    delta = 0
+    for _ in range(count - 1):
+        prefix_bits = 0
+        while prefix_bits < 5 and reader.read(1):
+            prefix_bits += 1
+        if prefix_bits == 0:
+            dod = 0
+        elif prefix_bits < 5:
+            value_bits = _DOD_BUCKETS[prefix_bits - 1][2]
+            dod = _signed(reader.read(value_bits), value_bits)
+        else:
+            dod = _signed(reader.read(64), 64)
+        delta += dod
+        previous += delta
+        timestamps.append(previous)
+    return timestamps
+
+
+def _float_bits(values: Sequence[float]) -> array:
+    bits = array("Q")
+    bits.frombytes(array("d", values).tobytes())
+    return bits
+
+
+def encode_values(values: Sequence[Optional[float]]) -> bytes:
+    writer = BitWriter()
+    present = [value is not None and not math.isnan(value) for value in values]
+    if all(present):
+        writer.write(0, 1)
+    else:
+        writer.write(1, 1)
+        for flag in present:
+            writer.write(flag, 1)
+
+    previous = None
+    leading = trailing = -1
+    for bits in _float_bits([value for value, flag in zip(values, present) if flag]):
+        if previous is None:
+            writer.write(bits, 64)
+            previous = bits
+            continue
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        # Leading zeros are stored in 5 bits
+        new_leading = min(64 - xor.bit_length(), 31)
+        new_trailing = (xor & -xor).bit_length() - 1
+        if leading >= 0 and new_leading >= leading and new_trailing >= trailing:
+            # Fits the previous window of meaningful bits
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            leading, trailing = new_leading, new_trailing
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            # 64 meaningful bits are written as 0
+            writer.write(meaningful & 63, 6)
+            writer.write(xor >> trailing, meaningful)
+    return writer.getvalue()
+
+
+def decode_values(data: bytes, count: int) -> array:
+    values = array("d", [math.nan]) * count
+    if not count:
+        return values
+    reader = BitReader(data)
+    if reader.read(1):
+        positions = [index for index in range(count) if reader.read(1)]
+    else:
+        positions = range(count)
+    if not positions:
+        return values
+
+    bits = array("Q")
+    previous = reader.read(64)
+    bits.append(previous)
+    leading = trailing = 0
+    for _ in range(len(positions) - 1):
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            previous ^= reader.read(64 - leading - trailing) << trailing
+        bits.append(previous)
+    decoded = array("d")
+    decoded.frombytes(bits.tobytes())
+    if len(positions) == count:
+        return decoded
+    for position, value in zip(positions, decoded):
+        values[position] = value
+    return values
+
+
+def encode_block(timestamps: Sequence[int], columns: Sequence[Sequence[Optional[float]]]) -> bytes:
+    """Encode rows given as a timestamp column and equally long value columns."""
+    streams = [encode_timestamps(timestamps)] + [encode_values(column) for column in columns]
+    header = _HEADER.pack(VERSION, len(timestamps), len(columns))
+    return header + b"".join(_LENGTH.pack(len(stream)) for stream in streams) + b"".join(streams)
+
+
+def decode_block(data: bytes, columns: Optional[Sequence[int]] = None) -> Tuple[array, List[Optional[array]]]:
+    """
+    Decode a block into its timestamp column and value columns.
+
+    With `columns`, only the value columns at those indexes are decoded; the
+    others are None.
+    """
+    version, count, column_count = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported Gorilla block version {version}")
+    offset = _HEADER.size
+    lengths = []
+    for _ in range(column_count + 1):
+        lengths.append(_LENGTH.unpack_from(data, offset)[0])
+        offset += _LENGTH.size
+    streams = []
+    for length in lengths:
+        streams.append(data[offset:offset + length])
+        offset += length
+
+    wanted = range(column_count) if columns is None else set(columns)
+    timestamps = decode_timestamps(streams[0], count)
+    values = [
+        decode_values(stream, count) if index in wanted else None
+        for index, stream in enumerate(streams[1:])
+    ]
+    return timestamps, values
@@ -0,0 +1,83 @@
+"""
+MessagePack encoding of API responses, on top of the msgpack C extension.
+
+The payload values (None, bools, ints, floats, strings, bytes, lists and
+dicts) are written by msgpack itself; a `default` hook converts the rest:
+
+- datetimes to integer microseconds since the Unix epoch (naive datetimes
+  are UTC, like everywhere in the API); dates to the epoch microseconds of
+  their midnight
+- enum members to their integer code from app.models.enum_codes instead
+  of the value string; codes are pinned per member, so reordering or
+  extending an enum doesn't change them
+
+Types are packed strictly, so str and int enums reach the hook instead of
+being written as their value, and tuples are written as arrays by it.
+Floats are always written as float64.
+"""
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Type
+
+import msgpack
+
+from app.models.enum_codes import ENUM_CODES
+
+MEDIA_TYPE = "application/msgpack"
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=None)
+def enum_codes(enum_type: Type[Enum]) -> Dict[Enum, int]:
+    codes = ENUM_CODES.get(enum_type)
+    if codes is None:
+        raise TypeError(f"Enum has no MessagePack codes: {enum_type.__name__}")
+    # KeyError for members added without a code
+    return {member: codes[member.name] for member in enum_type}
+
+
+def epoch_microseconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        return (value - EPOCH) // MICROSECOND
+    return (value - EPOCH_UTC) // MICROSECOND
+
+
+def _date_microseconds(value: date) -> int:
+    return epoch_microseconds(datetime(value.year, value.month, value.day))
+
+
+@lru_cache(maxsize=None)
+def _converter(value_type: type) -> Callable[[Any], Any]:
+    """Conversion of values of a type msgpack can't write itself; looked up once per type."""
+    if issubclass(value_type, Enum):
+        return enum_codes(value_type).__getitem__
+    if issubclass(value_type, datetime):
+        return epoch_microseconds
+    if issubclass(value_type, date):
+        return _date_microseconds
+    if issubclass(value_type, tuple):
+        return list
+    if issubclass(value_type, (bytearray, memoryview)):
+        return bytes
+    # Subclasses of the basic types, written as their base type
+    for base in (bool, int, float, str, bytes, dict, list):
+        if issubclass(value_type, base):
+            return base
+    raise TypeError(f"Type is not MessagePack serializable: {value_type.__name__}")
+
+
+def _default(value: Any) -> Any:
+    return _converter(type(value))(value)
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_default, strict_types=True, datetime=False)
+
+
+def unpackb(data: bytes) -> Any:
+    """Decode a payload written by `packb`, mainly for tests and Python clients."""
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
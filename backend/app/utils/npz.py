@@ -0,0 +1,42 @@
+"""
+Minimal writer for NumPy `.npz` archives, without depending on NumPy.
+
+An `.npz` file is a zip of `.npy` files, one per array; `.npy` is a short
+header describing dtype and shape followed by the raw array bytes. Arrays are
+written from `array.array` buffers, so 1-D int64/float64 columns go out as a
+plain memory copy and load with `numpy.load` without any parsing.
+"""
+import io
+import sys
+import zipfile
+from array import array
+from typing import Dict
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+# array.array typecodes and the matching little-endian NumPy dtypes
+DTYPES = {
+    "q": "<i8",
+    "d": "<f8",
+}
+
+
+def npy_bytes(values: array) -> bytes:
+    """Serialize a 1-D array to the `.npy` format (version 1.0)."""
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (DTYPES[values.typecode], len(values))
+    # Magic, version, header length and header are padded to a multiple of 64 bytes
+    padding = -(len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return NPY_MAGIC + len(header).to_bytes(2, "little") + header + values.tobytes()
+
+
+def write_npz(arrays: Dict[str, array], compress: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, values in arrays.items():
+            archive.writestr(f"{name}.npy", npy_bytes(values))
+    return buffer.getvalue()
@@ -0,0 +1,136 @@
+"""
+Fast response serialization for large payloads, and response format negotiation.
+
+A handler's return value normally goes through FastAPI's `response_model`
+handling: it is validated into the response model (even when the handler
+already built that model), converted by `jsonable_encoder` and encoded with
+the stdlib `json` module. For pages of a thousand rows that is most of the
+request. `model_response` validates once, with a cached `TypeAdapter` reading
+ORM attributes directly, or not at all for payloads built with
+`model_construct` from trusted data, and encodes with orjson.
+
+FastAPI returns Response objects untouched, so the route's `response_model`
+only documents the endpoint.
+
+Routers created with `route_class=NegotiatedRoute` also answer in
+MessagePack when the request prefers `application/msgpack` in its Accept
+header; JSON stays the default. The response model is then dumped in Python
+mode, so datetimes and enums reach the encoder as objects and are written as
+epoch microseconds and integer codes (see app.utils.msgpack). The route class
+also applies single-flight coalescing to endpoints marked with
+`app.utils.singleflight.coalesce`.
+"""
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Coroutine, Dict
+
+from fastapi import Request, Response
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from app.utils import msgpack
+from app.utils.singleflight import coalesced_handler, request_key
+
+# Media types accepted for MessagePack; the IANA type and the older x- form
+MSGPACK_MEDIA_TYPES = (msgpack.MEDIA_TYPE, "application/x-msgpack")
+
+# Whether the request being handled negotiated MessagePack
+msgpack_requested: ContextVar[bool] = ContextVar("msgpack_requested", default=False)
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """True if the Accept header ranks MessagePack at least as high as JSON."""
+    qualities: Dict[str, float] = {}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type.lower()] = max(quality, qualities.get(media_type.lower(), 0.0))
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return msgpack_quality > 0 and msgpack_quality >= qualities.get("application/json", 0.0)
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """orjson response that renders MessagePack instead when the request negotiated it."""
+
+    def __init__(self, content: Any = None, *args: Any, **kwargs: Any) -> None:
+        if msgpack_requested.get():
+            self.media_type = msgpack.MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+        self.headers["vary"] = "Accept"
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == msgpack.MEDIA_TYPE:
+            return msgpack.packb(content)
+        return super().render(content)
+
+
+class _NegotiatedField:
+    """Response field that keeps datetimes and enums as objects for MessagePack."""
+
+    def __init__(self, field: Any) -> None:
+        self.field = field
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.field, name)
+
+    def serialize(self, value: Any, **kwargs: Any) -> Any:
+        if msgpack_requested.get():
+            kwargs["mode"] = "python"
+        return self.field.serialize(value, **kwargs)
+
+
+class NegotiatedRoute(APIRoute):
+    """Route that answers in JSON or MessagePack depending on the Accept header."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        if self.secure_cloned_response_field is not None and not isinstance(
+            self.secure_cloned_response_field, _NegotiatedField
+        ):
+            self.secure_cloned_response_field = _NegotiatedField(self.secure_cloned_response_field)
+        if isinstance(self.response_class, DefaultPlaceholder):
+            self.response_class = Default(NegotiatedResponse)
+        handler = super().get_route_handler()
+        max_waiters = getattr(self.endpoint, "single_flight_max_waiters", None)
+        if max_waiters:
+            # Identical requests negotiating different formats get different responses
+            handler = coalesced_handler(
+                handler, max_waiters, key=lambda request: request_key(request, msgpack_requested.get())
+            )
+
+        async def negotiated_handler(request: Request) -> Response:
+            token = msgpack_requested.set(accepts_msgpack(request.headers.get("accept", "")))
+            try:
+                return await handler(request)
+            finally:
+                msgpack_requested.reset(token)
+
+        return negotiated_handler
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """Adapters build their validator and serializer on creation; build each once."""
+    return TypeAdapter(schema)
+
+
+def model_response(schema: Any, content: Any, *, validate: bool = True, status_code: int = 200) -> NegotiatedResponse:
+    """
+    Render `content` as `schema` with orjson, or MessagePack if negotiated.
+
+    With `validate`, content is validated first and may hold ORM objects;
+    without it, content must already be an instance of `schema`.
+    """
+    adapter = type_adapter(schema)
+    if validate:
+        content = adapter.validate_python(content, from_attributes=True)
+    # Python mode leaves datetimes and enums to the encoder; orjson encodes them like pydantic
+    return NegotiatedResponse(adapter.dump_python(content), status_code=status_code)
@@ -0,0 +1,128 @@
+"""
+Single-flight request coalescing for expensive, idempotent reads.
+
+When many clients request the same thing at once (e.g. a fleet dashboard
+loading `/performance/?time_range=WEEK` for every user), only the first
+request computes the response; identical requests arriving while it is in
+flight wait for it and receive a copy of the same response. Nothing is
+cached: once the computation finishes, the next request computes again.
+
+Routes opt in with the `coalesce` decorator, placed below the route
+decorator; `NegotiatedRoute` (app.utils.serialization) applies it. Requests
+are identical when they have the same method, path, query parameters (in
+any order) and response format. At most `max_waiters` requests wait on one
+computation; further identical requests compute on their own rather than
+piling up behind it.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from fastapi import Request, Response
+
+T = TypeVar("T")
+
+# Requests allowed to wait on one in-flight computation
+DEFAULT_MAX_WAITERS = int(os.getenv("SINGLE_FLIGHT_MAX_WAITERS", "64"))
+
+COALESCED_METHODS = ("GET", "HEAD")
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: "asyncio.Future[Any]"):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key, within one event loop."""
+
+    def __init__(self, max_waiters: int = DEFAULT_MAX_WAITERS):
+        self.max_waiters = max_waiters
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Return the result of `func`, shared with concurrent calls for `key`.
+
+        The flag is True when the result came from another call's computation.
+        Exceptions of the computation are raised in every waiter.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            if flight.waiters >= self.max_waiters:
+                return await func(), False
+            flight.waiters += 1
+            try:
+                # Shielded so a disconnecting waiter doesn't cancel the shared computation
+                return await asyncio.shield(flight.future), True
+            except asyncio.CancelledError:
+                if not flight.future.cancelled():
+                    raise
+            finally:
+                flight.waiters -= 1
+            # The computing call was cancelled (e.g. its client went away); compute instead
+            return await func(), False
+
+        flight = _Flight(asyncio.get_running_loop().create_future())
+        self._flights[key] = flight
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except BaseException as exc:
+            if flight.waiters:
+                flight.future.set_exception(exc)
+            else:
+                # Nobody waits; don't leave an unretrieved exception behind
+                flight.future.cancel()
+            raise
+        else:
+            flight.future.set_result(result)
+            return result, False
+        finally:
+            del self._flights[key]
+
+
+def coalesce(max_waiters: Optional[int] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Mark an endpoint for single-flight coalescing of identical concurrent requests."""
+    def decorator(endpoint: Callable[..., T]) -> Callable[..., T]:
+        endpoint.single_flight_max_waiters = max_waiters or DEFAULT_MAX_WAITERS
+        return endpoint
+    return decorator
+
+
+def request_key(request: Request, *extra: Hashable) -> Tuple[Hashable, ...]:
+    """Key of identical requests: method, path and sorted query parameters."""
+    return (request.method, request.url.path, tuple(sorted(request.query_params.multi_items())), *extra)
+
+
+def _copy_response(response: Response) -> Response:
+    copy = Response(content=response.body, status_code=response.status_code)
+    copy.raw_headers = list(response.raw_headers)
+    return copy
+
+
+def coalesced_handler(
+    handler: Callable[[Request], Awaitable[Response]],
+    max_waiters: int,
+    key: Callable[[Request], Hashable] = request_key
+) -> Callable[[Request], Awaitable[Response]]:
+    """Wrap a route handler so identical concurrent requests share one response."""
+    flights = SingleFlight(max_waiters)
+
+    async def handle(request: Request) -> Response:
+        if request.method not in COALESCED_METHODS:
+            return await handler(request)
+        response, shared = await flights.do(key(request), lambda: handler(request))
+        if not shared:
+            return response
+        if not hasattr(response, "body"):
+            # Streaming bodies can only be sent once
+            return await handler(request)
+        return _copy_response(response)
+
+    return handle
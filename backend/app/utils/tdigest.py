@@ -0,0 +1,135 @@
+"""
+Mergeable quantile sketch (merging t-digest, Dunning & Ertl).
+
+Values are summarized into weighted centroids that are small near the tails
+and larger around the median, so extreme quantiles (p5/p95/p99) stay accurate
+with a few hundred centroids regardless of how many values were added. Two
+digests merge into a digest of the union, which is what lets percentiles of
+an arbitrary range be computed from per-bucket sketches.
+"""
+import math
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+# Bound on the number of centroids; about 2 * compression at most
+DEFAULT_COMPRESSION = 100
+
+_HEADER = struct.Struct("<dddI")
+
+
+class TDigest:
+    __slots__ = ("compression", "centroids", "count", "min", "max", "_buffer")
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        # (mean, weight) sorted by mean
+        self.centroids: List[Tuple[float, float]] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+
+    def __len__(self) -> int:
+        return int(self.count)
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> None:
+        """Add everything summarized by `other` to this digest."""
+        if not other.count:
+            return
+        other._compress()
+        self._buffer.extend(other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k_limit(self, q: float) -> float:
+        """Upper quantile a centroid starting at q may reach (k1 scale function)."""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        items = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        merged: List[Tuple[float, float]] = []
+        mean, weight = items[0]
+        before = 0.0
+        limit = self._k_limit(0.0)
+        for next_mean, next_weight in items[1:]:
+            if (before + weight + next_weight) / self.count <= limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                before += weight
+                limit = self._k_limit(before / self.count)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimated q-quantile (0 <= q <= 1), None if empty.
+
+        Interpolates linearly between centroid centers, ranked like
+        linear-interpolation percentiles: exact while every centroid holds a
+        single value.
+        """
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * (self.count - 1) + 0.5
+        first_mean, first_weight = self.centroids[0]
+        if target < first_weight / 2:
+            # Between the minimum and the first center
+            return self.min + (first_mean - self.min) * (target - 0.5) / (first_weight / 2 - 0.5)
+        cumulative = 0.0
+        for (mean, weight), (next_mean, next_weight) in zip(self.centroids, self.centroids[1:]):
+            center = cumulative + weight / 2
+            next_center = cumulative + weight + next_weight / 2
+            if target <= next_center:
+                return mean + (next_mean - mean) * (target - center) / (next_center - center)
+            cumulative += weight
+        # Between the last center and the maximum
+        last_mean, last_weight = self.centroids[-1]
+        center = cumulative + last_weight / 2
+        span = self.count - 0.5 - center
+        if span <= 0:
+            return last_mean
+        return last_mean + (self.max - last_mean) * min(1.0, (target - center) / span)
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        values = [value for centroid in self.centroids for value in centroid]
+        return _HEADER.pack(self.compression, self.min, self.max, len(self.centroids)) + struct.pack(
+            f"<{len(values)}d", *values
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        compression, minimum, maximum, size = _HEADER.unpack_from(data)
+        values = struct.unpack_from(f"<{2 * size}d", data, _HEADER.size)
+        digest = cls(compression)
+        digest.centroids = list(zip(values[::2], values[1::2]))
+        digest.count = sum(values[1::2])
+        digest.min = minimum
+        digest.max = maximum
+        return digest
@@ -0,0 +1,16 @@
+"""
+Timestamps are stored as naive UTC datetimes (`datetime.utcnow()`).
+
+Query parameters may carry an offset (`2024-03-01T00:00:00Z`). SQLite compares
+them as text either way, but code comparing them with stored timestamps in
+Python, such as the chunk, segment and archive readers, normalizes them first.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """`value` as a naive UTC datetime; naive values are returned unchanged."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
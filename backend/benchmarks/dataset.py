@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+"""
+Generate a large, deterministic dataset for benchmarking the API.
+
+Rows are written with bulk Core inserts so that generating hundreds of
+thousands of snapshots takes seconds rather than minutes.
+"""
+import argparse
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from app.database.container_summary import reconcile_container_summaries
+from app.database.database import Base
+from app.database.latest_metrics import rebuild_latest_metrics
+from app.database.metric_rollups import rebuild_metric_rollups, seal_metric_sketches
+from app.models.models import (
+    Container, Tenant, SeedType, Alert, Device, Tray, Panel,
+    Crop, CropHistoryEntry, ActivityLog, MetricSnapshot, container_seed_types
+)
+from app.models.enums import (
+    ContainerType, ContainerPurpose, ContainerStatus, AlertSeverity,
+    AlertRelatedObjectType, DeviceStatus, ShelfPosition, WallPosition,
+    CropLifecycleStatus, CropHealthCheck, CropLocationType, InventoryStatus,
+    ActorType
+)
+from app.utils.alert_dedup import alert_dedup_key
+
+CITIES = [
+    ("Seattle", "USA"), ("Portland", "USA"), ("Berlin", "Germany"),
+    ("Amsterdam", "Netherlands"), ("Lyon", "France"), ("Osaka", "Japan"),
+    ("Toronto", "Canada"), ("Austin", "USA"),
+]
+
+SEED_TYPES = [
+    ("Basil", "Genovese", "SeedCorp"),
+    ("Lettuce", "Butterhead", "GreenSeeds"),
+    ("Kale", "Lacinato", "SeedCorp"),
+    ("Spinach", "Bloomsdale", "GreenSeeds"),
+    ("Arugula", "Wild Rocket", "HerbMasters"),
+    ("Salanova", "Cousteau", "HerbMasters"),
+]
+
+ACTION_TYPES = ["SEEDED", "SYNCED", "ENVIRONMENT_CHANGED", "MAINTENANCE", "CREATED", "HARVESTED"]
+
+# Number of containers at scale=1.0, and rows generated per container
+DEFAULT_SIZES = {
+    "containers": 500,
+    "trays": 8,
+    "panels": 8,
+    "crops": 100,
+    "snapshots": 500,
+    "alerts": 6,
+    "devices": 4,
+    "activity_logs": 50,
+}
+
+CHUNK_SIZE = 10000
+
+
+def _bulk_insert(engine: Engine, table: Any, rows: List[Dict[str, Any]]) -> None:
+    """Insert rows in chunks inside a single transaction."""
+    with engine.begin() as connection:
+        for start in range(0, len(rows), CHUNK_SIZE):
+            connection.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def generate_dataset(engine: Engine, scale: float = 1.0, seed: int = 42) -> Dict[str, int]:
+    """
+    Create all tables on the engine and fill them with generated data.
+
+    Returns the number of rows written per table.
+    """
+    rng = random.Random(seed)
+    sizes = dict(DEFAULT_SIZES, containers=max(1, int(DEFAULT_SIZES["containers"] * scale)))
+    now = datetime.utcnow()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    tenants = [{"id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"Tenant {i:02d}"} for i in range(10)]
+    seed_types = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": name,
+            "variety": variety,
+            "supplier": supplier,
+            "batch_id": f"B-{i:03d}",
+        }
+        for i, (name, variety, supplier) in enumerate(SEED_TYPES)
+    ]
+
+    containers, links, trays, panels, crops, history = [], [], [], [], [], []
+    alerts, devices, activity_logs, snapshots = [], [], [], []
+
+    for c in range(sizes["containers"]):
+        container_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        is_physical = rng.random() < 0.5
+        city, country = rng.choice(CITIES)
+        containers.append({
+            "id": container_id,
+            "name": f"{'FC' if is_physical else 'VC'}-{c:05d}",
+            "type": ContainerType.PHYSICAL if is_physical else ContainerType.VIRTUAL,
+            "tenant_id": rng.choice(tenants)["id"],
+            "purpose": rng.choice(list(ContainerPurpose)),
+            "location_city": city if is_physical else None,
+            "location_country": country if is_physical else None,
+            "notes": f"Benchmark container {c}",
+            "shadow_service_enabled": rng.random() < 0.5,
+            "robotics_simulation_enabled": not is_physical,
+            "ecosystem_connected": True,
+            "ecosystem_settings": {"fa_environment": "Alpha", "aws_environment": "Dev"},
+            "status": rng.choice(list(ContainerStatus)),
+            "created_at": now - timedelta(days=rng.randint(30, 365)),
+            "updated_at": now - timedelta(days=rng.randint(0, 29)),
+        })
+        for seed_type in rng.sample(seed_types, 2):
+            links.append({"container_id": container_id, "seed_type_id": seed_type["id"]})
+
+        tray_ids, panel_ids = [], []
+        for t in range(sizes["trays"]):
+            tray_ids.append(str(uuid.UUID(int=rng.getrandbits(128))))
+            trays.append({
+                "id": tray_ids[-1],
+                "container_id": container_id,
+                "rfid_tag": f"T-{c:05d}-{t:02d}",
+                "shelf": rng.choice(list(ShelfPosition)),
+                "slot_number": t,
+                "utilization_percentage": rng.uniform(0, 100),
+                "provisioned_at": now - timedelta(days=rng.randint(1, 200)),
+                "status": rng.choice([InventoryStatus.AVAILABLE, InventoryStatus.IN_USE]),
+                "capacity": 180,
+                "tray_type": "Standard",
+            })
+        for p in range(sizes["panels"]):
+            panel_ids.append(str(uuid.UUID(int=rng.getrandbits(128))))
+            panels.append({
+                "id": panel_ids[-1],
+                "container_id": container_id,
+                "rfid_tag": f"P-{c:05d}-{p:02d}",
+                "wall": rng.choice(list(WallPosition)),
+                "slot_number": p,
+                "utilization_percentage": rng.uniform(0, 100),
+                "provisioned_at": now - timedelta(days=rng.randint(1, 200)),
+                "status": rng.choice([InventoryStatus.AVAILABLE, InventoryStatus.IN_USE]),
+                "capacity": 40,
+                "panel_type": "Standard",
+            })
+
+        for _ in range(sizes["crops"]):
+            crop_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            seed_date = now - timedelta(days=rng.randint(1, 90))
+            in_tray = rng.random() < 0.5
+            crops.append({
+                "id": crop_id,
+                "seed_type_id": rng.choice(seed_types)["id"],
+                "seed_date": seed_date,
+                "transplanting_date_planned": seed_date + timedelta(days=14),
+                "harvesting_date_planned": seed_date + timedelta(days=45),
+                "transplanted_date": None if in_tray else seed_date + timedelta(days=15),
+                "harvesting_date": None,
+                "lifecycle_status": CropLifecycleStatus.SEEDED if in_tray else CropLifecycleStatus.TRANSPLANTED,
+                "health_check": rng.choice(list(CropHealthCheck)),
+                "current_location_type": CropLocationType.TRAY_LOCATION if in_tray else CropLocationType.PANEL_LOCATION,
+                "tray_id": rng.choice(tray_ids) if in_tray else None,
+                "panel_id": None if in_tray else rng.choice(panel_ids),
+                "tray_row": rng.randint(1, 10) if in_tray else None,
+                "tray_column": rng.randint(1, 18) if in_tray else None,
+                "panel_channel": None if in_tray else rng.randint(1, 4),
+                "panel_position": None if in_tray else rng.uniform(0, 10),
+                "area": rng.uniform(1, 5),
+                "weight": rng.uniform(0.01, 0.5),
+            })
+            history.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "crop_id": crop_id,
+                "timestamp": seed_date,
+                "event": "Crop created with Seeded status",
+                "performed_by": "System",
+                "notes": None,
+            })
+
+        for _ in range(sizes["alerts"]):
+            description = rng.choice(["Temperature exceeds normal range", "Device offline", "Low humidity"])
+            related_object_type = rng.choice(list(AlertRelatedObjectType))
+            created_at = now - timedelta(hours=rng.randint(1, 2000))
+            alerts.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "container_id": container_id,
+                "description": description,
+                "severity": rng.choice(list(AlertSeverity)),
+                "created_at": created_at,
+                "active": rng.random() < 0.3,
+                "related_object_type": related_object_type,
+                "related_object_id": None,
+                "dedup_key": alert_dedup_key(container_id, related_object_type, None, description),
+                "occurrence_count": rng.choice([1, 1, 1, 5, 40]),
+                "last_occurred_at": created_at,
+            })
+
+        for d in range(sizes["devices"]):
+            devices.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "container_id": container_id,
+                "name": f"Sensor {d}",
+                "model": "EnvPro-3000",
+                "serial_number": f"EP-{c:05d}-{d:02d}",
+                "firmware_version": "2.4.1",
+                "port": f"COM{d}",
+                "status": rng.choice(list(DeviceStatus)),
+                "last_active_at": now - timedelta(minutes=rng.randint(1, 600)),
+            })
+
+        for _ in range(sizes["activity_logs"]):
+            activity_logs.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "container_id": container_id,
+                "timestamp": now - timedelta(minutes=rng.randint(1, 60 * 24 * 180)),
+                "action_type": rng.choice(ACTION_TYPES),
+                "actor_type": rng.choice(list(ActorType)),
+                "actor_id": "bench",
+                "description": "Generated activity",
+            })
+
+        # One snapshot every 15 minutes, newest last
+        for s in range(sizes["snapshots"]):
+            snapshots.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "container_id": container_id,
+                "timestamp": now - timedelta(minutes=15 * (sizes["snapshots"] - s)),
+                "air_temperature": round(rng.gauss(21.0, 1.2), 2),
+                "humidity": round(rng.gauss(68.0, 3.0), 2),
+                "co2": round(rng.gauss(800.0, 40.0), 1),
+                "yield_kg": round(rng.uniform(0, 3), 2),
+                "space_utilization_percentage": round(rng.uniform(50, 95), 1),
+                "nursery_utilization_percentage": round(rng.uniform(50, 95), 1),
+                "cultivation_utilization_percentage": round(rng.uniform(50, 95), 1),
+            })
+
+    tables = [
+        (Tenant, tenants), (SeedType, seed_types), (Container, containers),
+        (container_seed_types, links), (Tray, trays), (Panel, panels),
+        (Crop, crops), (CropHistoryEntry, history), (Alert, alerts),
+        (Device, devices), (ActivityLog, activity_logs), (MetricSnapshot, snapshots),
+    ]
+    counts = {}
+    for table, rows in tables:
+        _bulk_insert(engine, table, rows)
+        name = getattr(table, "__tablename__", None) or table.name
+        counts[name] = len(rows)
+
+    # Core inserts bypass the ORM events that maintain derived tables
+    with engine.begin() as connection:
+        counts["container_summary"] = reconcile_container_summaries(connection)
+        counts["container_latest_metrics"] = rebuild_latest_metrics(connection)
+        counts["metric_rollups"] = rebuild_metric_rollups(connection)
+        counts["metric_rollup_sketches"] = seal_metric_sketches(connection, limit=None)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a benchmark dataset")
+    parser.add_argument("--db", default="benchmark.db", help="Path of the SQLite file to create")
+    parser.add_argument("--scale", type=float, default=1.0, help="Dataset scale factor")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    counts = generate_dataset(engine, scale=args.scale, seed=args.seed)
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
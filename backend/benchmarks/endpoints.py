@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+Endpoint benchmarks for the Control Panel API.
+
+Drives the real FastAPI application in-process through an async HTTP client
+against a generated dataset and reports latency percentiles, throughput,
+SQL statement counts and peak RSS as JSON. A previous report can be passed
+as a baseline to flag regressions.
+
+Usage:
+    python -m benchmarks.endpoints --db benchmark.db --generate --output results.json
+    python -m benchmarks.endpoints --db benchmark.db --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import get_db
+from app.main import app
+from benchmarks.dataset import generate_dataset
+
+API_PREFIX = "/api/v1"
+
+# Relative slowdown of a percentile that counts as a regression
+DEFAULT_TOLERANCE = 0.20
+
+
+class StatementCounter:
+    """Counts SQL statements executed on an engine."""
+
+    def __init__(self, engine: Engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def load_fixture_ids(engine: Engine) -> Dict[str, Any]:
+    """Pick representative identifiers from the dataset for the scenarios."""
+    with engine.connect() as connection:
+        container_id = connection.execute(text(
+            "SELECT id FROM containers ORDER BY name LIMIT 1"
+        )).scalar()
+        tenant_id = connection.execute(text(
+            "SELECT tenant_id FROM containers ORDER BY name LIMIT 1"
+        )).scalar()
+        compared_ids = connection.execute(text(
+            "SELECT id FROM containers ORDER BY name LIMIT 30"
+        )).scalars().all()
+    return {"container_id": container_id, "tenant_id": tenant_id, "compared_ids": compared_ids}
+
+
+def build_scenarios(ids: Dict[str, Any]) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Return (name, path, query params) for every benchmarked request."""
+    container_id = ids["container_id"]
+    # Day-aligned range covering the generated snapshots, so daily rollups apply
+    query_end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    query_range = {"start": (query_end - timedelta(days=7)).isoformat(), "end": query_end.isoformat()}
+    return [
+        ("list_containers", "/containers/", {}),
+        ("list_containers[name]", "/containers/", {"name": "FC-001"}),
+        ("list_containers[tenant_id]", "/containers/", {"tenant_id": ids["tenant_id"]}),
+        ("list_containers[type]", "/containers/", {"type": "Physical"}),
+        ("list_containers[purpose]", "/containers/", {"purpose": "Research"}),
+        ("list_containers[status]", "/containers/", {"status": "Active"}),
+        ("list_containers[has_alerts=true]", "/containers/", {"has_alerts": "true"}),
+        ("list_containers[has_alerts=false]", "/containers/", {"has_alerts": "false"}),
+        ("list_containers[location]", "/containers/", {"location": "Berlin"}),
+        ("search", "/search/", {"q": "FC-00"}),
+        ("search[container]", "/search/", {"q": "Berlin", "types": "container"}),
+        ("list_containers[page=1000]", "/containers/", {"limit": 1000}),
+        ("list_containers[page=1000,fields]", "/containers/", {"limit": 1000, "fields": "id,name,status,has_alerts"}),
+        ("list_container_counts[page=1000]", "/containers/counts", {"limit": 1000}),
+        ("list_crops[page=1000]", "/crops/", {"limit": 1000}),
+        ("list_trays[page=1000]", "/inventory/trays", {"limit": 1000}),
+        ("get_container_crops", f"/containers/{container_id}/crops", {"page_size": 50}),
+        ("get_container_crops[seed_type]", f"/containers/{container_id}/crops", {"seed_type": "Kale"}),
+        ("container_metrics[WEEK]", f"/metrics/container/{container_id}", {"time_range": "WEEK"}),
+        ("get_metric_snapshots", f"/metrics/snapshots/{container_id}", {"limit": 500}),
+        ("get_metric_snapshots[points=500]", f"/metrics/snapshots/{container_id}", {"points": 500}),
+        ("query_metrics[tenant,day]", "/metrics/query", {
+            "metrics": ["air_temperature", "co2"], "tenant_id": ids["tenant_id"], "bucket": "day",
+            "aggregations": ["avg", "min", "max"], **query_range
+        }),
+        ("query_metrics[hour,p95]", "/metrics/query", {
+            "metrics": "air_temperature", "container_ids": container_id, "bucket": "hour",
+            "aggregations": ["avg", "p95"], **query_range
+        }),
+        ("metric_percentiles[tenant]", "/metrics/percentiles", {
+            "metrics": ["air_temperature", "humidity", "co2"], "tenant_id": ids["tenant_id"], **query_range
+        }),
+        ("compare_containers[30,hour]", "/metrics/compare", {
+            "container_ids": ids["compared_ids"], "metric": "air_temperature", "bucket": "hour", **query_range
+        }),
+        ("export_snapshots[ndjson]", f"/exports/containers/{container_id}/snapshots", {}),
+        ("export_snapshots[csv]", f"/exports/containers/{container_id}/snapshots", {"format": "csv"}),
+        ("export_snapshots[npz]", f"/exports/containers/{container_id}/snapshots.npz", {}),
+        ("list_alerts", "/alerts/", {}),
+        ("list_alerts[active]", "/alerts/", {"active": "true", "severity": "High"}),
+        ("list_alert_groups", "/alerts/groups", {"active": "true"}),
+        ("list_activity_logs", f"/activity/logs/{container_id}", {}),
+        ("performance[WEEK]", "/performance/", {"time_range": "WEEK"}),
+        ("performance[YEAR]", "/performance/", {"time_range": "YEAR"}),
+    ]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    counter: StatementCounter,
+    path: str,
+    params: Dict[str, Any],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Issue `requests` GETs with at most `concurrency` in flight."""
+    for _ in range(warmup):
+        await client.get(API_PREFIX + path, params=params)
+
+    latencies: List[float] = []
+    response_bytes = 0
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal response_bytes, errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(API_PREFIX + path, params=params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.is_error:
+                errors += 1
+            response_bytes += len(response.content)
+
+    counter.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    statements = counter.reset()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "sql_statements_per_request": round(statements / requests, 2),
+        "avg_response_bytes": response_bytes // requests,
+    }
+
+
+async def run_benchmarks(
+    engine: Engine,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    only: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run every scenario against the app with the given engine."""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    counter = StatementCounter(engine)
+    scenarios = build_scenarios(load_fixture_ids(engine))
+    if only:
+        scenarios = [scenario for scenario in scenarios if only in scenario[0]]
+
+    results: Dict[str, Any] = {}
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name, path, params in scenarios:
+                results[name] = await run_scenario(
+                    client, counter, path, params, requests, concurrency, warmup
+                )
+                print(f"{name:40s} p50={results[name]['p50_ms']:8.2f}ms "
+                      f"p99={results[name]['p99_ms']:8.2f}ms "
+                      f"sql={results[name]['sql_statements_per_request']}", file=sys.stderr)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    return results
+
+
+def compare_to_baseline(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Return a description of every scenario that regressed against the baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]} -> {current[metric]}"
+                )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        if current["sql_statements_per_request"] > previous["sql_statements_per_request"]:
+            regressions.append(
+                f"{name}: sql_statements_per_request "
+                f"{previous['sql_statements_per_request']} -> {current['sql_statements_per_request']}"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints in-process")
+    parser.add_argument("--db", default="benchmark.db", help="SQLite dataset to benchmark against")
+    parser.add_argument("--generate", action="store_true", help="(Re)generate the dataset first")
+    parser.add_argument("--scale", type=float, default=1.0, help="Dataset scale when generating")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--warmup", type=int, default=5, help="Warmup requests per scenario")
+    parser.add_argument("--only", help="Only run scenarios whose name contains this string")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative latency increase before flagging a regression")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        f"sqlite:///{args.db}", connect_args={"check_same_thread": False}
+    )
+    if args.generate or not os.path.exists(args.db):
+        generate_dataset(engine, scale=args.scale)
+
+    scenarios = asyncio.run(
+        run_benchmarks(engine, args.requests, args.concurrency, args.warmup, args.only)
+    )
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "db": args.db,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(scenarios, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
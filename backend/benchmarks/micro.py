@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks for CPU-side code that runs on every request.
+
+Covers the mock metric/performance builders, crop age/overdue calculation,
+activity type mapping, pydantic construction and serialization of the
+response schemas, and whole list responses through FastAPI's default
+response_model path versus the orjson `model_response` path. Each case is timed with timeit (best of several repeats)
+and reported as time per call and per item, so construction can be compared
+with serialization cost.
+
+Usage:
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --baseline micro.json
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.endpoints import metrics, performance
+from app.api.v1.endpoints.containers import calculate_crop_age, get_activity_type
+from app.models.enums import (
+    ContainerType, ContainerPurpose, ContainerStatus, CropLifecycleStatus, CropHealthCheck
+)
+from app.models.enums import InventoryStatus
+from app.models.models import Crop as CropModel, Tray as TrayModel
+from app.schemas.container import (
+    ContainerList, ContainerSummary, ContainerDetail, Location, SystemIntegration, SystemIntegrations
+)
+from app.schemas.inventory import TrayList
+from app.schemas.crop import ContainerCrop
+from app.schemas.metrics import MetricResponse
+from app.utils.serialization import model_response
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Relative slowdown per item that counts as a regression
+DEFAULT_TOLERANCE = 0.20
+
+ACTION_TYPES = ["SEEDED", "Data synced", "ENVIRONMENT_CHANGED", "maintenance", "CREATED", "HARVESTED"]
+
+
+def time_case(func: Callable[[], Any], items: int = 1, repeat: int = 5) -> Dict[str, Any]:
+    """Time func with timeit and report the best run."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {
+        "items": items,
+        "us_per_call": round(best * 1e6, 3),
+        "ns_per_item": round(best * 1e9 / items, 1),
+    }
+
+
+def summary_kwargs(i: int, now: datetime) -> Dict[str, Any]:
+    return dict(
+        id=f"container-{i}",
+        name=f"FC-{i:06d}",
+        type=ContainerType.PHYSICAL,
+        tenant_name="AgroTech Inc.",
+        purpose=ContainerPurpose.PRODUCTION,
+        location_city="Seattle",
+        location_country="USA",
+        status=ContainerStatus.ACTIVE,
+        created_at=now,
+        updated_at=now,
+        has_alerts=i % 3 == 0,
+    )
+
+
+def container_crop_kwargs(i: int) -> Dict[str, Any]:
+    return dict(
+        id=f"crop-{i}",
+        seed_type="Salanova Cousteau",
+        cultivation_area=2.5,
+        nursery_table=i % 10,
+        last_sd="2024-01-30",
+        last_td="2024-02-10",
+        last_hd=None,
+        avg_age=30,
+        overdue=i % 5,
+    )
+
+
+def detail_kwargs(i: int, now: datetime) -> Dict[str, Any]:
+    return dict(
+        id=f"container-{i}",
+        name=f"FC-{i:06d}",
+        type=ContainerType.PHYSICAL,
+        tenant="AgroTech Inc.",
+        purpose=ContainerPurpose.PRODUCTION,
+        location=Location(city="Seattle", country="USA", address="1 Farm Way"),
+        status=ContainerStatus.ACTIVE,
+        created=now,
+        modified=now,
+        creator="System",
+        seed_types=["Basil", "Kale"],
+        notes="Primary production container",
+        shadow_service_enabled=True,
+        ecosystem_connected=True,
+        system_integrations=SystemIntegrations(
+            fa_integration=SystemIntegration(name="Alpha", enabled=True),
+            aws_environment=SystemIntegration(name="Dev", enabled=True),
+            mbai_environment=SystemIntegration(name="Disabled", enabled=False),
+        ),
+    )
+
+
+def make_crops(count: int, now: datetime) -> List[CropModel]:
+    crops = []
+    for i in range(count):
+        seed_date = now - timedelta(days=i % 90)
+        crops.append(CropModel(
+            id=f"crop-{i}",
+            seed_type_id="seed-type-1",
+            seed_date=seed_date,
+            transplanting_date_planned=seed_date + timedelta(days=14),
+            harvesting_date_planned=seed_date + timedelta(days=45),
+            lifecycle_status=CropLifecycleStatus.SEEDED if i % 2 else CropLifecycleStatus.TRANSPLANTED,
+            health_check=CropHealthCheck.HEALTHY,
+        ))
+    return crops
+
+
+def make_trays(count: int, now: datetime) -> List[TrayModel]:
+    return [
+        TrayModel(
+            id=f"tray-{i}",
+            container_id="container-1",
+            rfid_tag=f"RFID-TRAY-{i:06d}",
+            slot_number=i % 20,
+            capacity=180,
+            status=InventoryStatus.IN_USE,
+            utilization_percentage=75.0,
+            provisioned_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def fastapi_default_body(schema: Any, content: Any) -> bytes:
+    """What FastAPI does with a returned model: dump, validate again, encode with json."""
+    if not isinstance(content, dict):
+        content = content.model_dump()
+    return json.dumps(jsonable_encoder(schema.model_validate(content))).encode()
+
+
+def response_cases(size: int, now: datetime) -> List[Tuple[str, Callable[[], Any]]]:
+    """List responses through the default response_model path and through model_response."""
+    summaries = [summary_kwargs(i, now) for i in range(size)]
+    trays = make_trays(size, now)
+    return [
+        (f"ContainerList.fastapi_default[{size}]", lambda: fastapi_default_body(ContainerList, ContainerList(
+            total=size, results=[ContainerSummary(**kwargs) for kwargs in summaries]
+        ))),
+        (f"ContainerList.model_response[{size}]", lambda: model_response(ContainerList, ContainerList.model_construct(
+            total=size, results=[ContainerSummary.model_construct(**kwargs) for kwargs in summaries]
+        ), validate=False).body),
+        (f"TrayList.fastapi_default[{size}]", lambda: fastapi_default_body(
+            TrayList, TrayList(total=size, results=trays)
+        )),
+        (f"TrayList.model_response[{size}]", lambda: model_response(
+            TrayList, {"total": size, "results": trays}
+        ).body),
+    ]
+
+
+def schema_cases(
+    name: str,
+    schema: Any,
+    kwargs_list: List[Dict[str, Any]],
+) -> Dict[str, Dict[str, Any]]:
+    """Time validated construction, trusted construction and JSON serialization."""
+    items = len(kwargs_list)
+    models = [schema(**kwargs) for kwargs in kwargs_list]
+    return {
+        f"{name}.construct[{items}]": time_case(
+            lambda: [schema(**kwargs) for kwargs in kwargs_list], items, repeat=3
+        ),
+        f"{name}.model_construct[{items}]": time_case(
+            lambda: [schema.model_construct(**kwargs) for kwargs in kwargs_list], items, repeat=3
+        ),
+        f"{name}.model_dump_json[{items}]": time_case(
+            lambda: [model.model_dump_json() for model in models], items, repeat=3
+        ),
+    }
+
+
+def run_microbenchmarks(sizes: List[int], only: Optional[str] = None) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    cases: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    for time_range in ("weekly", "monthly", "quarterly", "yearly"):
+        builder = getattr(metrics, f"generate_{time_range}_container_metrics")
+        cases.append((
+            f"metrics.generate_{time_range}_container_metrics",
+            lambda builder=builder: time_case(lambda: builder("container-1", "PHYSICAL", 1234)),
+        ))
+        builder = getattr(performance, f"generate_{time_range}_data")
+        cases.append((
+            f"performance.generate_{time_range}_data",
+            lambda builder=builder: time_case(builder),
+        ))
+
+    for size in sizes:
+        crops = make_crops(size, now)
+        action_types = [ACTION_TYPES[i % len(ACTION_TYPES)] for i in range(size)]
+        cases.append((
+            f"calculate_crop_age[{size}]",
+            lambda crops=crops: time_case(
+                lambda: [calculate_crop_age(crop, now) for crop in crops], len(crops)
+            ),
+        ))
+        cases.append((
+            f"get_activity_type[{size}]",
+            lambda action_types=action_types: time_case(
+                lambda: [get_activity_type(action_type) for action_type in action_types],
+                len(action_types),
+            ),
+        ))
+
+    results: Dict[str, Any] = {}
+    for name, run in cases:
+        if only and only not in name:
+            continue
+        results[name] = run()
+        print(f"{name:50s} {results[name]['ns_per_item']:12.1f} ns/item", file=sys.stderr)
+
+    for size in sizes:
+        schema_sets = [
+            ("ContainerSummary", ContainerSummary, lambda: [summary_kwargs(i, now) for i in range(size)]),
+            ("ContainerCrop", ContainerCrop, lambda: [container_crop_kwargs(i) for i in range(size)]),
+            ("ContainerDetail", ContainerDetail, lambda: [detail_kwargs(i, now) for i in range(size)]),
+            (
+                "MetricResponse",
+                MetricResponse,
+                lambda: [metrics.generate_weekly_container_metrics("c", "PHYSICAL", i).model_dump()
+                         for i in range(size)],
+            ),
+        ]
+        for name, schema, build_kwargs in schema_sets:
+            if only and only not in name:
+                continue
+            for case_name, result in schema_cases(name, schema, build_kwargs()).items():
+                results[case_name] = result
+                print(f"{case_name:50s} {result['ns_per_item']:12.1f} ns/item", file=sys.stderr)
+        for case_name, render in response_cases(size, now):
+            if only and only not in case_name:
+                continue
+            results[case_name] = time_case(render, size, repeat=3)
+            print(f"{case_name:50s} {results[case_name]['ns_per_item']:12.1f} ns/item", file=sys.stderr)
+
+    return results
+
+
+def compare_to_baseline(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Return a description of every case that got slower than the baseline allows."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous and current["ns_per_item"] > previous["ns_per_item"] * (1 + tolerance):
+            regressions.append(f"{name}: ns_per_item {previous['ns_per_item']} -> {current['ns_per_item']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmark request hot paths")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma separated item counts for per-item cases")
+    parser.add_argument("--only", help="Only run cases whose name contains this string")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": run_microbenchmarks(sizes, args.only),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report["cases"], baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database.activity_log_writer import ActivityLogQueueFull, ActivityLogWriter, get_activity_log_writer
+from app.main import app
+from app.models.enums import ActorType
+from app.models.models import ActivityLog
+from tests.conftest import engine
+
+
+def entry(i: int):
+    return {
+        "container_id": "container-123",
+        "action_type": "ENVIRONMENT_CHANGED",
+        "actor_type": ActorType.SYSTEM,
+        "actor_id": "automation",
+        "description": f"Setpoint {i}",
+    }
+
+
+def test_writer_batches_entries(db_session: Session):
+    """Test that queued entries are written in batches, one statement per batch."""
+    batches = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO activity_logs"):
+            batches.append(len(parameters) if executemany else 1)
+
+    writer = ActivityLogWriter(engine=engine, batch_size=3, flush_interval=60)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        queued = writer.log_many(entry(i) for i in range(7))
+        writer.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+        writer.stop()
+
+    assert batches == [3, 3, 1]
+    logs = db_session.query(ActivityLog).filter(ActivityLog.actor_id == "automation").all()
+    assert sorted(log.id for log in logs) == sorted(log["id"] for log in queued)
+    assert logs[0].actor_type == ActorType.SYSTEM
+
+
+def test_writer_backpressure():
+    """Test that a full queue raises instead of growing."""
+    writer = ActivityLogWriter(engine=engine, max_queue=2, enqueue_timeout=0.01)
+    # No writer thread: nothing drains the queue
+    writer.start = lambda: None
+    writer.log(**entry(1))
+    writer.log(**entry(2))
+    with pytest.raises(ActivityLogQueueFull):
+        writer.log(**entry(3))
+
+
+def test_writer_batch_shares_one_timeout():
+    """Test that queueing many entries waits one enqueue timeout in total and reports what was queued."""
+    writer = ActivityLogWriter(engine=engine, max_queue=2, enqueue_timeout=0.1)
+    writer.start = lambda: None
+    started = time.monotonic()
+    with pytest.raises(ActivityLogQueueFull) as raised:
+        writer.log_many(entry(i) for i in range(20))
+    assert time.monotonic() - started < 1
+    assert [queued["description"] for queued in raised.value.queued] == ["Setpoint 0", "Setpoint 1"]
+
+
+def test_create_activity_logs_batch_queue_full(client: TestClient):
+    """Test that the batch endpoint answers 503 with the entries it queued before the queue filled up."""
+    writer = ActivityLogWriter(engine=engine, max_queue=1, enqueue_timeout=0.01)
+    writer.start = lambda: None
+    app.dependency_overrides[get_activity_log_writer] = lambda: writer
+    try:
+        body = {"entries": [{**entry(i), "actor_type": "System"} for i in range(3)]}
+        response = client.post("/api/v1/activity/logs/batch", json=body)
+        assert response.status_code == 503
+        detail = response.json()["detail"]
+        assert detail["accepted"] == 1
+        assert detail["ids"] == [writer._queue.get_nowait()["id"]]
+    finally:
+        app.dependency_overrides.pop(get_activity_log_writer)
+
+
+def test_create_activity_logs_batch(client: TestClient, db_session: Session):
+    """Test that the batch endpoint queues entries and answers 202."""
+    writer = ActivityLogWriter(engine=engine, flush_interval=60)
+    app.dependency_overrides[get_activity_log_writer] = lambda: writer
+    try:
+        body = {"entries": [
+            {**entry(i), "actor_type": "System", "timestamp": f"2024-01-01T00:0{i}:00"} for i in range(3)
+        ]}
+        response = client.post("/api/v1/activity/logs/batch", json=body)
+        assert response.status_code == 202
+        assert response.json()["accepted"] == 3
+        writer.flush()
+
+        stored = [
+            log.id for log in db_session.query(ActivityLog)
+            .filter(ActivityLog.actor_id == "automation").order_by(ActivityLog.timestamp.desc())
+        ]
+        assert stored == list(reversed(response.json()["ids"]))
+
+        body["entries"][0]["container_id"] = "unknown"
+        assert client.post("/api/v1/activity/logs/batch", json=body).status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_activity_log_writer)
+        writer.stop()
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.enums import AlertRuleMetric, AlertRuleOperator, AlertSeverity
+from app.models.models import AlertRule, Container, MetricSnapshot
+from app.utils.alert_rules import alert_rule_engine
+
+
+def post_snapshot(client: TestClient, timestamp: datetime, **values) -> None:
+    response = client.post("/api/v1/metrics/snapshots", json={
+        "container_id": "container-123",
+        "timestamp": timestamp.isoformat(),
+        **values
+    })
+    assert response.status_code == 201
+
+
+def rule_alerts(client: TestClient, rule_id: str):
+    alerts = client.get("/api/v1/alerts/?container_id=container-123").json()["results"]
+    return [alert for alert in alerts if alert["related_object_id"] == rule_id]
+
+
+def test_alert_rule_duration_and_hysteresis(client: TestClient, db_session: Session):
+    """Test that a rule opens an alert after its duration and resolves it past the clear threshold."""
+    response = client.post("/api/v1/alert-rules/", json={
+        "name": "Too warm",
+        "tenant_id": "tenant-123",
+        "metric": "air_temperature",
+        "operator": "above",
+        "threshold": 24.0,
+        "clear_threshold": 22.0,
+        "duration_seconds": 300,
+        "severity": "High"
+    })
+    assert response.status_code == 201
+    rule_id = response.json()["id"]
+
+    start = datetime(2024, 1, 1, 12, 0)
+    post_snapshot(client, start, air_temperature=25.0)
+    post_snapshot(client, start + timedelta(minutes=2), air_temperature=25.5)
+    assert rule_alerts(client, rule_id) == []
+
+    # Exceeded for five minutes
+    post_snapshot(client, start + timedelta(minutes=5), air_temperature=26.0)
+    alerts = rule_alerts(client, rule_id)
+    assert len(alerts) == 1
+    assert alerts[0]["active"] is True
+    assert alerts[0]["severity"] == "High"
+    assert alerts[0]["related_object_type"] == "Environment"
+
+    # Back under the threshold but not under the clear threshold
+    post_snapshot(client, start + timedelta(minutes=6), air_temperature=23.0)
+    post_snapshot(client, start + timedelta(minutes=7), air_temperature=24.5)
+    alerts = rule_alerts(client, rule_id)
+    assert len(alerts) == 1
+    assert alerts[0]["active"] is True
+
+    # Snapshots without the metric are ignored
+    post_snapshot(client, start + timedelta(minutes=8), humidity=70.0)
+    assert rule_alerts(client, rule_id)[0]["active"] is True
+
+    post_snapshot(client, start + timedelta(minutes=9), air_temperature=21.5)
+    alerts = rule_alerts(client, rule_id)
+    assert len(alerts) == 1
+    assert alerts[0]["active"] is False
+
+
+def test_alert_rule_crud(client: TestClient, db_session: Session):
+    """Test validation, updates and disabling of alert rules."""
+    rule = {
+        "name": "Low CO2",
+        "container_id": "container-123",
+        "metric": "co2",
+        "operator": "below",
+        "threshold": 600.0,
+        "severity": "Medium"
+    }
+    response = client.post("/api/v1/alert-rules/", json={**rule, "clear_threshold": 500.0})
+    assert response.status_code == 400
+    response = client.post("/api/v1/alert-rules/", json={**rule, "tenant_id": "tenant-123"})
+    assert response.status_code == 400
+    response = client.post("/api/v1/alert-rules/", json={**rule, "container_id": "missing"})
+    assert response.status_code == 404
+
+    response = client.post("/api/v1/alert-rules/", json=rule)
+    assert response.status_code == 201
+    rule_id = response.json()["id"]
+    assert response.json()["duration_seconds"] == 0
+
+    response = client.put(f"/api/v1/alert-rules/{rule_id}", json={"enabled": False})
+    assert response.status_code == 200
+    post_snapshot(client, datetime(2024, 1, 1), co2=400.0)
+    assert rule_alerts(client, rule_id) == []
+
+    client.put(f"/api/v1/alert-rules/{rule_id}", json={"enabled": True})
+    post_snapshot(client, datetime(2024, 1, 1, 0, 1), co2=400.0)
+    assert len(rule_alerts(client, rule_id)) == 1
+
+    response = client.get("/api/v1/alert-rules/?container_id=container-123")
+    assert response.json()["total"] == 1
+
+    response = client.delete(f"/api/v1/alert-rules/{rule_id}")
+    assert response.status_code == 204
+    response = client.get(f"/api/v1/alert-rules/{rule_id}")
+    assert response.status_code == 404
+
+
+def test_alert_rule_state_follows_commit(db_session: Session):
+    """Test that rule states are only kept once the alerts they point at are committed."""
+    db_session.add(AlertRule(
+        name="Dry",
+        container_id="container-123",
+        metric=AlertRuleMetric.HUMIDITY,
+        operator=AlertRuleOperator.BELOW,
+        threshold=40.0,
+        severity=AlertSeverity.LOW
+    ))
+    db_session.commit()
+    alert_rule_engine.invalidate()
+    container = db_session.get(Container, "container-123")
+    snapshot = MetricSnapshot(container_id="container-123", timestamp=datetime(2024, 1, 1), humidity=30.0)
+
+    evaluation = alert_rule_engine.evaluate(db_session, container, snapshot)
+    assert len(evaluation.changes) == 1
+    # Commit failed: the state isn't applied and the alert is opened again
+    db_session.rollback()
+    evaluation = alert_rule_engine.evaluate(db_session, container, snapshot)
+    assert [event for _, event in evaluation.changes] == ["alert_created"]
+    db_session.commit()
+    alert_rule_engine.apply(evaluation)
+    assert alert_rule_engine.evaluate(db_session, container, snapshot).changes == []
+
+    # States computed before the rules changed are dropped
+    recovered = MetricSnapshot(timestamp=datetime(2024, 1, 1, 0, 1), humidity=50.0)
+    stale = alert_rule_engine.evaluate(db_session, container, recovered)
+    db_session.rollback()
+    alert_rule_engine.invalidate()
+    alert_rule_engine.apply(stale)
+    assert [event for _, event in alert_rule_engine.evaluate(db_session, container, recovered).changes] == [
+        "alert_resolved"
+    ]
@@ -0,0 +1,96 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.utils.alert_dedup import alert_fingerprint
+
+
+def test_alert_deduplication(client: TestClient, db_session: Session):
+    """Test that duplicate alerts within the suppression window are folded into one."""
+    alert = {
+        "container_id": "container-123",
+        "description": "Humidity at 81.5%",
+        "severity": "Medium",
+        "related_object_type": "Device",
+        "related_object_id": "device-1"
+    }
+    response = client.post("/api/v1/alerts/", json=alert)
+    assert response.status_code == 201
+    first = response.json()
+    assert first["occurrence_count"] == 1
+
+    # Same alert with a different value and a higher severity
+    response = client.post("/api/v1/alerts/", json={**alert, "description": "Humidity at 83%", "severity": "High"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == first["id"]
+    assert data["occurrence_count"] == 2
+    assert data["severity"] == "High"
+    assert data["description"] == "Humidity at 83%"
+
+    # A different related object is a different alert
+    response = client.post("/api/v1/alerts/", json={**alert, "related_object_id": "device-2"})
+    assert response.status_code == 201
+
+    # Once resolved, a new occurrence opens a new alert
+    client.post(f"/api/v1/alerts/{first['id']}/resolve")
+    response = client.post("/api/v1/alerts/", json=alert)
+    assert response.status_code == 201
+    assert response.json()["id"] != first["id"]
+
+    response = client.get("/api/v1/alerts/?container_id=container-123")
+    assert response.json()["total"] == 3
+
+    assert alert_fingerprint("Temp  25.3 C") == alert_fingerprint("temp 19 c")
+
+
+def test_list_alert_groups(client: TestClient, db_session: Session):
+    """Test grouped alert listing."""
+    alert = {"container_id": "container-123", "description": "Device offline", "severity": "Low"}
+    first = client.post("/api/v1/alerts/", json=alert).json()
+    client.post("/api/v1/alerts/", json=alert)
+    client.post(f"/api/v1/alerts/{first['id']}/resolve")
+    client.post("/api/v1/alerts/", json=alert)
+    client.post("/api/v1/alerts/", json={**alert, "description": "Door open"})
+
+    response = client.get("/api/v1/alerts/groups?container_id=container-123")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    offline = next(group for group in data["results"] if group["description"] == "Device offline")
+    assert offline["alert_count"] == 2
+    assert offline["active_count"] == 1
+    assert offline["occurrence_count"] == 3
+
+    response = client.get("/api/v1/alerts/groups?active=true")
+    groups = {group["description"]: group for group in response.json()["results"]}
+    assert groups["Device offline"]["alert_count"] == 1
+
+
+def test_alert_group_shows_latest_alert(client: TestClient, db_session: Session):
+    """Test that a group takes its description and severity from the most recently occurred alert."""
+    alert = {"container_id": "container-123", "description": "Tank 1 level low", "severity": "Low"}
+    first = client.post("/api/v1/alerts/", json=alert).json()
+    client.post(f"/api/v1/alerts/{first['id']}/resolve")
+    client.post("/api/v1/alerts/", json={**alert, "description": "Tank 2 level low", "severity": "High"})
+
+    groups = client.get("/api/v1/alerts/groups?container_id=container-123").json()["results"]
+    assert len(groups) == 1
+    assert groups[0]["description"] == "Tank 2 level low"
+    assert groups[0]["severity"] == "High"
+    assert groups[0]["alert_count"] == 2
+    assert groups[0]["first_created_at"] == first["created_at"]
+
+
+def test_update_alert_rekeys_deduplication(client: TestClient, db_session: Session):
+    """Test that an edited alert deduplicates under its new description."""
+    alert = {"container_id": "container-123", "description": "Pump 2 stalled", "severity": "Low"}
+    first = client.post("/api/v1/alerts/", json=alert).json()
+
+    response = client.put(f"/api/v1/alerts/{first['id']}", json={"description": "Door open"})
+    assert response.status_code == 200
+
+    response = client.post("/api/v1/alerts/", json={**alert, "description": "Door open"})
+    assert response.status_code == 200
+    assert response.json()["id"] == first["id"]
+    response = client.post("/api/v1/alerts/", json=alert)
+    assert response.status_code == 201
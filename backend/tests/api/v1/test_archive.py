@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database import archive
+from app.models.enums import ActorType
+from app.models.models import ActivityLog, ArchivePartition, CropHistoryEntry
+from tests.conftest import engine
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    yield tmp_path
+    archive.partition_cache.clear()
+
+
+def add_logs(db: Session, days_ago: range, actor_type: ActorType = ActorType.SYSTEM):
+    for days in days_ago:
+        db.add(ActivityLog(
+            container_id="container-123",
+            timestamp=NOW - timedelta(days=days, hours=1),
+            action_type="ENVIRONMENT_CHANGED",
+            actor_type=actor_type,
+            actor_id="automation",
+            description=f"{days} days ago",
+        ))
+    db.commit()
+
+
+def archive_logs(retention_days: int = 30, limit: int = archive.ARCHIVE_BATCH_SIZE) -> int:
+    with engine.begin() as connection:
+        return archive.archive_rows(
+            connection, archive.ACTIVITY_LOG_ARCHIVE._replace(retention_days=retention_days), now=NOW, limit=limit
+        )
+
+
+def test_archive_moves_expired_rows(db_session: Session, archive_dir):
+    """Test that rows past the retention period move to day files and the partition table."""
+    db_session.query(ActivityLog).delete()
+    add_logs(db_session, range(28, 34))
+
+    assert archive_logs() == 3
+    assert db_session.query(ActivityLog).count() == 3
+    assert sorted(str(path.relative_to(archive_dir)) for path in archive_dir.rglob("*.gz")) == [
+        "activity_logs/2024-04-29/container-123.ndjson.gz",
+        "activity_logs/2024-04-30/container-123.ndjson.gz",
+        "activity_logs/2024-05-01/container-123.ndjson.gz",
+    ]
+    partitions = db_session.query(ArchivePartition).all()
+    assert sorted(p.row_count for p in partitions) == [1, 1, 1]
+
+    rows = list(archive.archived_rows(db_session.connection(), archive.ACTIVITY_LOG_ARCHIVE, "container-123"))
+    assert [row["description"] for row in rows] == ["31 days ago", "32 days ago", "33 days ago"]
+    assert rows[0]["actor_type"] == ActorType.SYSTEM
+    assert rows[0]["timestamp"] == NOW - timedelta(days=31, hours=1)
+
+
+def test_archive_appends_in_batches(db_session: Session, archive_dir):
+    """Test that later runs append to existing day files and add to the partition counts."""
+    db_session.query(ActivityLog).delete()
+    add_logs(db_session, range(40, 41))
+    add_logs(db_session, range(40, 41), actor_type=ActorType.USER)
+
+    assert archive_logs(limit=1) == 1
+    assert archive_logs(limit=1) == 1
+    assert archive_logs(limit=1) == 0
+
+    partition = db_session.query(ArchivePartition).one()
+    assert partition.row_count == 2
+    connection = db_session.connection()
+    assert archive.count_archived_rows(connection, archive.ACTIVITY_LOG_ARCHIVE, "container-123") == 2
+    assert archive.count_archived_rows(
+        connection, archive.ACTIVITY_LOG_ARCHIVE, "container-123", filters={"actor_type": ActorType.USER}
+    ) == 1
+
+
+def test_list_activity_logs_reads_archive(client: TestClient, db_session: Session, archive_dir):
+    """Test that the listing pages through hot entries, then archived ones."""
+    db_session.query(ActivityLog).delete()
+    add_logs(db_session, range(25, 35))
+    archive_logs()
+
+    url = "/api/v1/activity/logs/container-123"
+    descriptions = []
+    for skip in range(0, 10, 4):
+        data = client.get(url, params={"skip": skip, "limit": 4}).json()
+        assert data["total"] == 10
+        descriptions += [log["description"] for log in data["results"]]
+    assert descriptions == [f"{days} days ago" for days in range(25, 35)]
+
+    data = client.get(url, params={"start_date": (NOW - timedelta(days=33)).isoformat()}).json()
+    assert data["total"] == 8
+    assert data["results"][-1]["description"] == "32 days ago"
+
+    # A UTC offset selects the same entries
+    data = client.get(url, params={"start_date": (NOW - timedelta(days=33)).isoformat() + "Z"}).json()
+    assert data["total"] == 8
+    assert data["results"][-1]["description"] == "32 days ago"
+
+
+def test_crop_history_reads_archive(client: TestClient, db_session: Session, archive_dir):
+    """Test that crop history includes archived entries after recent ones."""
+    for days in (1, 60):
+        db_session.add(CropHistoryEntry(
+            crop_id="crop-1", timestamp=NOW - timedelta(days=days), event=f"{days} days ago", performed_by="system"
+        ))
+    db_session.commit()
+    with engine.begin() as connection:
+        archive.archive_rows(connection, archive.CROP_HISTORY_ARCHIVE._replace(retention_days=30), now=NOW)
+
+    response = client.get("/api/v1/crops/crop-1/history")
+    assert response.status_code == 200
+    assert [entry["event"] for entry in response.json()] == ["1 days ago", "60 days ago"]
+
+
+def test_partition_cache_is_bounded():
+    """Test that the cache evicts the least recently used files past its size."""
+    cache = archive.PartitionCache(max_bytes=100)
+    cache.put(("a", 0, 0), 40, ({"id": "a"},))
+    cache.put(("b", 0, 0), 40, ({"id": "b"},))
+    assert cache.get(("a", 0, 0)) == ({"id": "a"},)
+    cache.put(("c", 0, 0), 40, ({"id": "c"},))
+    assert cache.get(("b", 0, 0)) is None
+    assert cache.get(("a", 0, 0)) is not None and cache.get(("c", 0, 0)) is not None
+    # Files larger than the whole cache aren't kept
+    cache.put(("d", 0, 0), 101, ())
+    assert cache.get(("d", 0, 0)) is None and cache.get(("a", 0, 0)) is not None
@@ -0,0 +1,88 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.container_summary import reconcile_container_summaries
+from app.models.enums import (
+    ContainerType, ContainerPurpose, ContainerStatus, CropLifecycleStatus, DeviceStatus, InventoryStatus
+)
+from app.models.models import Alert, Container, Crop, Device, Panel
+
+
+def get_counts(client: TestClient, container_id: str = "container-123"):
+    response = client.get(f"/api/v1/containers/counts?container_ids={container_id}")
+    assert response.status_code == 200
+    return response.json()["results"][0]
+
+
+def test_container_summary_follows_writes(client: TestClient, db_session: Session):
+    """Test that the container summary is kept up to date on flush."""
+    counts = get_counts(client)
+    assert counts["crops_seeded"] == 1
+    assert counts["crops_transplanted"] == 1
+    assert counts["crops_healthy"] == 2
+    assert counts["trays_total"] == 1
+    assert counts["panels_total"] == 1
+    assert counts["active_alerts"] == 0
+
+    alert = client.post("/api/v1/alerts/", json={
+        "container_id": "container-123", "description": "Door open", "severity": "Critical"
+    }).json()
+    db_session.add(Device(
+        id="device-1", container_id="container-123", name="Sensor", model="EnvPro",
+        serial_number="SN-1", status=DeviceStatus.RUNNING
+    ))
+    db_session.commit()
+    counts = get_counts(client)
+    assert counts["active_alerts"] == 1
+    assert counts["active_alerts_critical"] == 1
+    assert counts["devices_running"] == 1
+    response = client.get("/api/v1/containers/?has_alerts=true")
+    assert [c["id"] for c in response.json()["results"]] == ["container-123"]
+    assert response.json()["results"][0]["has_alerts"] is True
+    response = client.get("/api/v1/devices/stats/container-123")
+    assert response.json()["running_count"] == 1
+
+    client.post(f"/api/v1/alerts/{alert['id']}/resolve")
+    assert get_counts(client)["active_alerts"] == 0
+    response = client.get("/api/v1/containers/?has_alerts=false")
+    assert response.json()["total"] == 1
+
+    # Moving a crop to a panel of another container updates both summaries
+    second = Container(
+        id="container-456", name="Second Container", type=ContainerType.PHYSICAL, tenant_id="tenant-123",
+        purpose=ContainerPurpose.RESEARCH, status=ContainerStatus.ACTIVE
+    )
+    db_session.add(second)
+    db_session.add(Panel(
+        id="panel-456", container_id="container-456", rfid_tag="RFID-PANEL-456",
+        status=InventoryStatus.IN_USE
+    ))
+    db_session.commit()
+    crop = db_session.get(Crop, "crop-1")
+    crop.tray_id = None
+    crop.panel_id = "panel-456"
+    crop.lifecycle_status = CropLifecycleStatus.TRANSPLANTED
+    db_session.commit()
+
+    counts = get_counts(client)
+    assert counts["crops_seeded"] == 0
+    assert counts["crops_transplanted"] == 1
+    counts = get_counts(client, "container-456")
+    assert counts["crops_transplanted"] == 1
+    assert counts["panels_in_use"] == 1
+
+
+def test_reconcile_container_summaries(client: TestClient, db_session: Session):
+    """Test that the reconciler fixes counters after writes that bypass the ORM."""
+    db_session.execute(Alert.__table__.insert().values(
+        id="alert-bulk", container_id="container-123", description="Bulk", severity="HIGH", active=True
+    ))
+    db_session.commit()
+    assert get_counts(client)["active_alerts"] == 0
+
+    assert reconcile_container_summaries(db_session.connection()) == 1
+    db_session.commit()
+    counts = get_counts(client)
+    assert counts["active_alerts"] == 1
+    assert counts["active_alerts_high"] == 1
+    assert reconcile_container_summaries(db_session.connection()) == 0
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.database import archive, metric_segments
+from app.database.database import Base
+from app.database.deletion import delete_container_in_batches
+from app.database.metric_chunks import compact_metric_snapshots
+from app.database.metric_segments import sync_metric_segments
+from app.models.enums import (
+    ActorType, AlertRuleMetric, AlertRuleOperator, AlertSeverity, ContainerPurpose, ContainerStatus,
+    ContainerType, DeviceStatus
+)
+from app.models.models import (
+    ActivityLog, Alert, AlertRule, ArchivePartition, Container, ContainerSummary, Crop, CropHistoryEntry,
+    Device, MetricSnapshot, SeedType, Tray, container_seed_types
+)
+from tests.conftest import engine
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(metric_segments, "METRIC_SEGMENT_DIR", str(tmp_path / "segments"))
+    yield tmp_path
+    archive.partition_cache.clear()
+
+
+def add_history(db: Session):
+    """Old history of container-123 in every derived table, archive and segment file, and a second container."""
+    old = NOW - timedelta(days=40)
+    db.add_all([
+        MetricSnapshot(container_id="container-123", timestamp=old + timedelta(minutes=10 * i), air_temperature=20.0)
+        for i in range(10)
+    ])
+    db.add_all([
+        ActivityLog(
+            container_id="container-123", timestamp=old, action_type="SYNCED",
+            actor_type=ActorType.SYSTEM, actor_id="system", description="Data synced"
+        ),
+        CropHistoryEntry(crop_id="crop-1", timestamp=old, event="Seeded", performed_by="user-123"),
+        CropHistoryEntry(crop_id="crop-1", timestamp=NOW, event="Checked", performed_by="user-123"),
+        Alert(container_id="container-123", description="Too hot", severity=AlertSeverity.HIGH),
+        AlertRule(
+            name="Too hot", container_id="container-123", metric=AlertRuleMetric.AIR_TEMPERATURE,
+            operator=AlertRuleOperator.ABOVE, threshold=30.0, severity=AlertSeverity.HIGH
+        ),
+        Device(
+            container_id="container-123", name="Sensor", model="S1", serial_number="S-1",
+            status=DeviceStatus.RUNNING
+        ),
+        Container(
+            id="container-456", name="Copy", type=ContainerType.PHYSICAL, tenant_id="tenant-123",
+            purpose=ContainerPurpose.DEVELOPMENT, status=ContainerStatus.ACTIVE,
+            copied_environment_from="container-123"
+        ),
+    ])
+    db.commit()
+    db.add_all([
+        Tray(id="tray-456", container_id="container-456", rfid_tag="RFID-TRAY-456"),
+        MetricSnapshot(container_id="container-456", timestamp=NOW, air_temperature=21.0),
+    ])
+    db.commit()
+
+    with engine.begin() as connection:
+        for archived in archive.ARCHIVED_TABLES:
+            archive.archive_rows(connection, archived._replace(retention_days=30), now=NOW)
+        compact_metric_snapshots(connection, now=NOW)
+        sync_metric_segments(connection)
+
+
+def container_rows(db: Session, container_id: str):
+    """Rows referencing a container, per table."""
+    counts = {}
+    for table in Base.metadata.sorted_tables:
+        if "container_id" in table.c:
+            counts[table.name] = db.execute(
+                select(func.count()).select_from(table).where(table.c.container_id == container_id)
+            ).scalar()
+    return counts
+
+
+@pytest.mark.parametrize("background, status_code", [(False, 204), (True, 202)])
+def test_delete_container_removes_everything(
+    client: TestClient, db_session: Session, data_dir, background: bool, status_code: int
+):
+    """Test that deleting a container clears derived tables, archives and segments, but not other containers."""
+    add_history(db_session)
+    before = container_rows(db_session, "container-123")
+    assert all(before[name] for name in [
+        "alerts", "alert_rules", "devices", "trays", "panels", "activity_logs", "metric_snapshots",
+        "container_summary", "container_latest_metrics", "metric_rollups", "metric_chunks", "container_seed_types"
+    ])
+    assert db_session.query(ArchivePartition).count() == 2
+    assert len(list(data_dir.rglob("*.gz"))) == 2
+    assert len(list(data_dir.rglob("*.seg"))) == 1
+    other_before = container_rows(db_session, "container-456")
+
+    response = client.delete("/api/v1/containers/container-123", params={"background": background})
+    assert response.status_code == status_code
+
+    db_session.expire_all()
+    assert set(container_rows(db_session, "container-123").values()) == {0}
+    assert container_rows(db_session, "container-456") == other_before
+    assert db_session.get(Container, "container-123") is None
+    assert db_session.get(Container, "container-456").copied_environment_from is None
+    assert db_session.query(Crop).count() == 0
+    assert db_session.query(CropHistoryEntry).count() == 0
+    assert db_session.query(ArchivePartition).count() == 0
+    assert [path for path in data_dir.rglob("*") if path.is_file()] == []
+    assert client.get("/api/v1/containers/container-123").status_code == 404
+
+
+def test_delete_container_in_batches(db_session: Session, data_dir):
+    """Test that the batched deletion drains history one short transaction per batch."""
+    add_history(db_session)
+    db_session.add_all([
+        MetricSnapshot(container_id="container-123", timestamp=NOW - timedelta(minutes=i), co2=800.0)
+        for i in range(1, 8)
+    ])
+    db_session.commit()
+    snapshots = db_session.query(MetricSnapshot).filter(MetricSnapshot.container_id == "container-123").count()
+    commits = []
+
+    def count_commit(connection):
+        commits.append(connection)
+
+    event.listen(engine, "commit", count_commit)
+    try:
+        drained = delete_container_in_batches(engine, "container-123", batch_size=3)
+    finally:
+        event.remove(engine, "commit", count_commit)
+
+    assert drained >= snapshots
+    # At least three batches of snapshots, then the remaining rows and the container at once
+    assert len(commits) >= 4
+    db_session.expire_all()
+    assert set(container_rows(db_session, "container-123").values()) == {0}
+    assert db_session.get(Container, "container-123") is None
+
+
+def test_delete_container_not_found(client: TestClient):
+    """Test that deleting an unknown container returns 404."""
+    response = client.delete("/api/v1/containers/container-999", params={"background": True})
+    assert response.status_code == 404
+
+
+def test_delete_crop_removes_history_and_updates_summary(client: TestClient, db_session: Session, data_dir):
+    """Test that deleting a crop removes its history and archived history and updates its container's summary."""
+    add_history(db_session)
+    summary = db_session.get(ContainerSummary, "container-123")
+    assert summary.crops_seeded == 1
+
+    response = client.delete("/api/v1/crops/crop-1")
+    assert response.status_code == 204
+
+    db_session.expire_all()
+    assert db_session.get(Crop, "crop-1") is None
+    assert db_session.query(CropHistoryEntry).count() == 0
+    assert db_session.query(ArchivePartition).filter(ArchivePartition.table_name == "crop_history_entries").count() == 0
+    assert list((data_dir / "archive").rglob("crop_history_entries/*/*.gz")) == []
+    assert db_session.get(ContainerSummary, "container-123").crops_seeded == 0
+    assert db_session.get(Crop, "crop-2") is not None
+
+
+def test_delete_seed_type_in_use_by_crop(client: TestClient, db_session: Session):
+    """Test that a seed type still referenced by a crop can't be deleted, even without containers."""
+    db_session.execute(container_seed_types.delete())
+    db_session.commit()
+
+    response = client.delete("/api/v1/seed-types/seed-type-1")
+    assert response.status_code == 409
+    assert db_session.get(SeedType, "seed-type-1") is not None
+
+    client.delete("/api/v1/crops/crop-1")
+    assert client.delete("/api/v1/seed-types/seed-type-1").status_code == 204
@@ -0,0 +1,118 @@
+import ast
+import csv
+import io
+import json
+import math
+import zipfile
+from array import array
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints import exports
+from app.models.models import ActivityLog, CropHistoryEntry, MetricSnapshot
+
+
+def test_export_metric_snapshots(client: TestClient, db_session: Session, monkeypatch):
+    """Test that snapshots are streamed in batches as NDJSON and CSV."""
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 10)
+    start = datetime(2024, 1, 1)
+    db_session.add_all([
+        MetricSnapshot(container_id="container-123", timestamp=start + timedelta(minutes=i), co2=800.0 + i)
+        for i in range(25)
+    ])
+    db_session.commit()
+
+    with client.stream("GET", "/api/v1/exports/containers/container-123/snapshots") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="container-123-snapshots.ndjson"' in response.headers["content-disposition"]
+        chunks = list(response.iter_text())
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert len(rows) == 26
+    assert rows[0]["timestamp"] == "2024-01-01T00:00:00"
+    assert rows[0]["co2"] == 800.0
+    assert rows[-1]["id"] == "metric-123"
+
+    response = client.get(
+        "/api/v1/exports/containers/container-123/snapshots?format=csv&end_date=2024-01-01T00:04:00"
+    )
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["co2"] for row in rows] == ["800.0", "801.0", "802.0", "803.0", "804.0"]
+
+    # Empty exports still have a CSV header
+    response = client.get(
+        "/api/v1/exports/containers/container-123/activity?format=csv&start_date=2030-01-01T00:00:00"
+    )
+    assert response.text.splitlines()[0].startswith("id,container_id,timestamp")
+    assert len(response.text.splitlines()) == 1
+
+    response = client.get("/api/v1/exports/containers/unknown/snapshots")
+    assert response.status_code == 404
+
+
+def test_export_crops_and_history(client: TestClient, db_session: Session):
+    """Test that crops are exported through the container's trays and panels."""
+    db_session.add(CropHistoryEntry(crop_id="crop-2", event="Transplanted", performed_by="Operator"))
+    db_session.commit()
+
+    rows = [json.loads(line) for line in client.get("/api/v1/exports/containers/container-123/crops").text.splitlines()]
+    assert sorted(row["id"] for row in rows) == ["crop-1", "crop-2"]
+    assert {row["lifecycle_status"] for row in rows} == {"Seeded", "Transplanted"}
+
+    response = client.get("/api/v1/exports/containers/container-123/crop-history")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["crop_id"], row["event"]) for row in rows] == [("crop-2", "Transplanted")]
+
+    response = client.get("/api/v1/exports/containers/container-123/activity")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == db_session.query(ActivityLog).filter(ActivityLog.container_id == "container-123").count()
+    assert rows[0]["actor_type"] in {"User", "System"}
+
+
+def load_npz(content: bytes):
+    """Read the 1-D arrays of an .npz archive without NumPy."""
+    arrays = {}
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        for name in archive.namelist():
+            data = archive.read(name)
+            assert data[:8] == b"\x93NUMPY\x01\x00"
+            header_length = int.from_bytes(data[8:10], "little")
+            assert (10 + header_length) % 64 == 0
+            header = ast.literal_eval(data[10:10 + header_length].decode("latin1"))
+            values = array({"<i8": "q", "<f8": "d"}[header["descr"]])
+            values.frombytes(data[10 + header_length:])
+            assert header["shape"] == (len(values),)
+            arrays[name[:-len(".npy")]] = values
+    return arrays
+
+
+def test_export_metric_snapshot_columns(client: TestClient, db_session: Session):
+    """Test the columnar .npz export of snapshots."""
+    db_session.add_all([
+        MetricSnapshot(container_id="container-123", timestamp=datetime(2024, 1, 1, 12, 0, 0, 250), co2=800.0),
+        MetricSnapshot(container_id="container-123", timestamp=datetime(2024, 1, 1, 12, 15), humidity=60.5),
+    ])
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/exports/containers/container-123/snapshots.npz?end_date=2024-01-02T00:00:00"
+        "&metrics=co2&metrics=humidity"
+    )
+    assert response.status_code == 200
+    arrays = load_npz(response.content)
+    assert list(arrays) == ["timestamp", "co2", "humidity"]
+    epoch = datetime(1970, 1, 1)
+    assert list(arrays["timestamp"]) == [
+        (datetime(2024, 1, 1, 12, 0, 0, 250) - epoch) // timedelta(microseconds=1),
+        (datetime(2024, 1, 1, 12, 15) - epoch) // timedelta(microseconds=1),
+    ]
+    assert arrays["co2"][0] == 800.0 and math.isnan(arrays["co2"][1])
+    assert math.isnan(arrays["humidity"][0]) and arrays["humidity"][1] == 60.5
+
+    response = client.get("/api/v1/exports/containers/container-123/snapshots.npz?compress=true")
+    arrays = load_npz(response.content)
+    assert len(arrays) == 8
+    assert len(arrays["air_temperature"]) == 3
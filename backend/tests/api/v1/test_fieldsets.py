@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.models import Alert
+
+
+def test_list_containers_fields(client: TestClient, db_session: Session):
+    """Test that fields= only selects and returns the requested fields."""
+    db_session.add(Alert(container_id="container-123", description="CO2 high", severity="HIGH", active=True))
+    db_session.commit()
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/api/v1/containers/?fields=id,name,status,has_alerts,id")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] >= 1
+    container = next(result for result in body["results"] if result["id"] == "container-123")
+    assert container == {"id": "container-123", "name": "Test Container", "status": "Active", "has_alerts": True}
+    page = statements[-1]
+    assert "location_city" not in page and "containers.created_at" not in page
+
+    response = client.get("/api/v1/containers/?fields=id,tenant_name&tenant_id=tenant-123")
+    assert response.json()["results"] == [{"id": "container-123", "tenant_name": "Test Tenant"}]
+
+    response = client.get("/api/v1/containers/?fields=id,secret")
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+
+
+def test_inventory_and_alert_fields(client: TestClient, db_session: Session):
+    """Test sparse fieldsets on tray, panel, crop, device and alert listings."""
+    db_session.add(Alert(container_id="container-123", description="Pump offline", severity="LOW", active=False))
+    db_session.commit()
+
+    response = client.get("/api/v1/inventory/trays?container_id=container-123&fields=rfid_tag,utilization_percentage")
+    assert response.json() == {"total": 1, "results": [{"rfid_tag": "RFID-TRAY-123", "utilization_percentage": 75.0}]}
+
+    response = client.get("/api/v1/inventory/panels?container_id=container-123&fields=id")
+    assert response.json()["results"] == [{"id": "panel-123"}]
+
+    response = client.get("/api/v1/crops/?fields=id,lifecycle_status")
+    assert {crop["lifecycle_status"] for crop in response.json()["results"]} == {"Seeded", "Transplanted"}
+    assert client.get("/api/v1/crops/?fields=history").status_code == 400
+
+    response = client.get("/api/v1/devices/?fields=id,status")
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/alerts/?container_id=container-123&fields=severity,active")
+    assert response.json()["results"][0] == {"severity": "Low", "active": False}
+
+    assert client.get("/api/v1/alerts/?fields=").status_code == 400
@@ -0,0 +1,135 @@
+import json
+import math
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.metric_chunks import cold_snapshots, compact_metric_snapshots, count_cold_snapshots
+from app.models.enums import SnapshotMetric
+from app.models.models import MetricChunk, MetricSnapshot
+from app.utils.gorilla import decode_block, encode_block
+from tests.api.v1.test_exports import load_npz
+from tests.conftest import engine
+
+START = datetime(2024, 3, 4)
+NOW = datetime(2024, 3, 20, 12, 0)
+
+
+def add_snapshots(db_session: Session):
+    """Every 10 minutes for two days, plus one recent snapshot, instead of the test data's."""
+    db_session.query(MetricSnapshot).delete()
+    db_session.add_all([
+        MetricSnapshot(
+            container_id="container-123",
+            timestamp=START + timedelta(minutes=10 * i),
+            air_temperature=20 + i / 10,
+            co2=800.0 if i % 2 else None
+        )
+        for i in range(288)
+    ])
+    db_session.add(MetricSnapshot(container_id="container-123", timestamp=NOW, air_temperature=25.0))
+    db_session.commit()
+
+
+def compact() -> int:
+    with engine.begin() as connection:
+        return compact_metric_snapshots(connection, now=NOW)
+
+
+def test_gorilla_round_trip():
+    """Test that blocks decode to the encoded values, NaN where missing."""
+    timestamps = [1_700_000_000_000_000 + i * 300_000_000 + (i % 3) * 17 for i in range(100)] + [-5, 10 ** 15]
+    columns = [
+        [21.5 + i / 7 for i in range(102)],
+        [None if i % 4 else 60.25 for i in range(102)],
+        [800.0] * 102,
+        [math.inf, -0.0, 1e300, 5e-324] + [2.0] * 98,
+    ]
+    data = encode_block(timestamps, columns)
+
+    decoded_timestamps, decoded = decode_block(data)
+    assert list(decoded_timestamps) == timestamps
+    for column, values in zip(columns, decoded):
+        assert [None if math.isnan(value) else value for value in values] == column
+
+    decoded_timestamps, decoded = decode_block(data, [2])
+    assert decoded[:2] == [None, None] and list(decoded[2]) == columns[2]
+    assert decode_block(encode_block([], [[]])) == (decoded_timestamps[:0], [decoded[2][:0]])
+
+
+def test_compaction_moves_cold_days_into_chunks(db_session: Session):
+    """Test that days older than a week become one chunk each, and late snapshots are merged."""
+    add_snapshots(db_session)
+
+    assert compact() == 288
+    assert db_session.query(MetricSnapshot).count() == 1
+    chunks = db_session.query(MetricChunk).order_by(MetricChunk.day).all()
+    assert [(chunk.day.isoformat(), chunk.row_count) for chunk in chunks] == [("2024-03-04", 144), ("2024-03-05", 144)]
+    # About 150 bytes per row in metric_snapshots
+    assert sum(len(chunk.data) for chunk in chunks) < 288 * 15
+
+    db_session.add(MetricSnapshot(container_id="container-123", timestamp=START + timedelta(minutes=5), co2=1.0))
+    db_session.commit()
+    assert compact() == 1
+    connection = db_session.connection()
+    snapshots = list(cold_snapshots(connection, ["container-123"], START, START + timedelta(minutes=11)))
+    assert [(snapshot.timestamp.minute, snapshot.co2) for snapshot in snapshots] == [(0, None), (5, 1.0), (10, 800.0)]
+    assert snapshots[0].air_temperature == 20.0
+    end = START + timedelta(minutes=11)
+    assert count_cold_snapshots(connection, ["container-123"], START, end, SnapshotMetric.CO2) == 2
+
+
+def test_metric_reads_include_chunks(client: TestClient, db_session: Session):
+    """Test that snapshot listings, raw queries and exports read hot rows and chunks alike."""
+    add_snapshots(db_session)
+    params = {
+        "metrics": "air_temperature", "container_ids": "container-123", "bucket": "hour",
+        "start": "2024-03-04T06:05:00", "end": "2024-03-21T00:00:00", "aggregations": ["avg", "count", "p50"]
+    }
+    before = client.get("/api/v1/metrics/query", params=params).json()
+    compact()
+    after = client.get("/api/v1/metrics/query", params=params).json()
+    assert after == before
+    assert after["source"] == "raw"
+
+    snapshots = client.get("/api/v1/metrics/snapshots/container-123", params={"limit": 3}).json()
+    assert [snapshot["timestamp"] for snapshot in snapshots] == [
+        "2024-03-20T12:00:00", "2024-03-05T23:50:00", "2024-03-05T23:40:00"
+    ]
+    downsampled = client.get("/api/v1/metrics/snapshots/container-123", params={"points": 10}).json()
+    assert len(downsampled) == 10
+    assert downsampled[0]["timestamp"] == "2024-03-20T12:00:00"
+
+    lines = client.get("/api/v1/exports/containers/container-123/snapshots").text.splitlines()
+    assert len(lines) == 289
+    assert json.loads(lines[0])["timestamp"] == "2024-03-04T00:00:00"
+
+    arrays = load_npz(client.get(
+        "/api/v1/exports/containers/container-123/snapshots.npz", params={"metrics": SnapshotMetric.CO2.value}
+    ).content)
+    assert len(arrays["timestamp"]) == 289
+    assert list(arrays["timestamp"]) == sorted(arrays["timestamp"])
+    assert math.isnan(arrays["co2"][0]) and arrays["co2"][1] == 800.0
+
+
+def test_chunk_reads_accept_timezone_aware_ranges(client: TestClient, db_session: Session):
+    """Test that ranges with a UTC offset read chunks like the same naive UTC range."""
+    add_snapshots(db_session)
+    compact()
+    params = {
+        "metrics": "air_temperature", "container_ids": "container-123", "bucket": "hour",
+        "start": "2024-03-04T06:05:00", "end": "2024-03-21T00:00:00", "aggregations": ["avg", "count"]
+    }
+    aware = {**params, "start": "2024-03-04T08:05:00+02:00", "end": "2024-03-21T00:00:00Z"}
+    assert client.get("/api/v1/metrics/query", params=aware).json()["series"] == client.get(
+        "/api/v1/metrics/query", params=params
+    ).json()["series"]
+
+    dates = {"start_date": "2024-03-05T00:00:00Z", "end_date": "2024-03-21T00:00:00Z"}
+    snapshots = client.get("/api/v1/metrics/snapshots/container-123", params={**dates, "limit": 200}).json()
+    assert len(snapshots) == 145
+    downsampled = client.get("/api/v1/metrics/snapshots/container-123", params={**dates, "points": 10}).json()
+    assert len(downsampled) == 10
+    arrays = load_npz(client.get("/api/v1/exports/containers/container-123/snapshots.npz", params=dates).content)
+    assert len(arrays["timestamp"]) == 145
@@ -0,0 +1,173 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database.metric_rollups import rebuild_metric_rollups, seal_metric_sketches
+from app.models.enums import ContainerPurpose, ContainerStatus, ContainerType
+from app.models.models import Container, MetricRollup, MetricSnapshot
+
+
+def add_snapshots(db_session: Session):
+    """Every 10 minutes for two days, temperature rising by 0.1 per snapshot."""
+    start = datetime(2024, 3, 4)
+    db_session.add_all([
+        MetricSnapshot(
+            container_id="container-123",
+            timestamp=start + timedelta(minutes=10 * i),
+            air_temperature=20 + i / 10,
+            co2=800.0 if i % 2 else None
+        )
+        for i in range(288)
+    ])
+    db_session.commit()
+
+
+def query(client: TestClient, **params):
+    params = {"metrics": "air_temperature", "container_ids": "container-123", **params}
+    response = client.get("/api/v1/metrics/query", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_metric_query_uses_rollups(client: TestClient, db_session: Session):
+    """Test that aligned queries are answered from rollups with the same results as raw snapshots."""
+    add_snapshots(db_session)
+    params = {
+        "start": "2024-03-04T00:00:00", "end": "2024-03-06T00:00:00", "bucket": "day",
+        "aggregations": ["avg", "min", "max", "count"]
+    }
+
+    data = query(client, **params)
+    assert data["source"] == "day"
+    points = data["series"][0]["points"]
+    assert points == [
+        {"timestamp": "2024-03-04T00:00:00", "avg": 27.15, "min": 20.0, "max": 34.3, "count": 144},
+        {"timestamp": "2024-03-05T00:00:00", "avg": 41.55, "min": 34.4, "max": 48.7, "count": 144},
+    ]
+
+    # Unaligned start: same buckets from the hourly rollups, then raw snapshots
+    data = query(client, **{**params, "start": "2024-03-04T06:00:00"})
+    assert data["source"] == "hour"
+    assert data["series"][0]["points"][0]["count"] == 108
+    raw = query(client, **{**params, "start": "2024-03-04T06:05:00"})
+    assert raw["source"] == "raw"
+    assert raw["series"][0]["points"][1] == points[1]
+
+    # Rebuilding the rollups gives what was maintained on ingest
+    incremental = db_session.query(MetricRollup).count()
+    assert rebuild_metric_rollups(db_session.connection()) == incremental
+    db_session.commit()
+    assert query(client, **params)["series"][0]["points"] == points
+
+
+def test_metric_query_series(client: TestClient, db_session: Session):
+    """Test bucket sizes, percentiles, multiple metrics and container filters."""
+    add_snapshots(db_session)
+
+    data = query(
+        client, metrics=["co2", "air_temperature"], bucket="hour", aggregations=["p95", "count"],
+        start="2024-03-04T00:00:00", end="2024-03-04T02:00:00"
+    )
+    assert data["source"] == "hour"
+    assert [series["metric"] for series in data["series"]] == ["co2", "air_temperature"]
+    assert data["series"][0]["points"][0] == {"timestamp": "2024-03-04T00:00:00", "p95": 800.0, "count": 3}
+    assert data["series"][1]["points"][1]["p95"] == pytest.approx(21.075)
+
+    data = query(client, bucket="week", start="2024-02-26T00:00:00", end="2024-03-11T00:00:00")
+    assert [point["timestamp"] for point in data["series"][0]["points"]] == ["2024-03-04T00:00:00"]
+
+    params = {"metrics": "air_temperature", "start": "2024-03-04T00:00:00", "end": "2024-03-05T00:00:00"}
+    response = client.get("/api/v1/metrics/query", params={**params, "tenant_id": "tenant-123", "bucket": "day"})
+    assert [series["container_id"] for series in response.json()["series"]] == ["container-123"]
+    response = client.get("/api/v1/metrics/query", params={**params, "type": "Virtual", "bucket": "day"})
+    assert response.json()["series"] == []
+
+    response = client.get("/api/v1/metrics/query", params={**params, "bucket": "minute", "end": "2024-06-01T00:00:00"})
+    assert response.status_code == 400
+    response = client.get("/api/v1/metrics/query", params={**params, "end": "2024-03-03T00:00:00"})
+    assert response.status_code == 400
+
+
+def test_compare_containers(client: TestClient, db_session: Session):
+    """Test that compared containers share one timestamp array."""
+    add_snapshots(db_session)
+    db_session.add(Container(
+        id="container-456", name="Second Container", type=ContainerType.VIRTUAL, tenant_id="tenant-123",
+        purpose=ContainerPurpose.RESEARCH, status=ContainerStatus.ACTIVE
+    ))
+    db_session.add(MetricSnapshot(
+        container_id="container-456", timestamp=datetime(2024, 3, 3, 12), air_temperature=18.0
+    ))
+    db_session.commit()
+
+    response = client.get("/api/v1/metrics/compare", params={
+        "container_ids": ["container-456", "container-123"], "metric": "air_temperature",
+        "start": "2024-03-03T00:00:00", "end": "2024-03-06T00:00:00", "aggregation": "max"
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] == "day"
+    assert [container["type"] for container in data["containers"]] == ["Virtual", "Physical"]
+    assert data["timestamps"] == ["2024-03-03T00:00:00", "2024-03-04T00:00:00", "2024-03-05T00:00:00"]
+    assert data["values"] == {"container-456": [18.0, None, None], "container-123": [None, 34.3, 48.7]}
+
+    response = client.get("/api/v1/metrics/compare", params={
+        "container_ids": ["container-123", "unknown"], "metric": "co2",
+        "start": "2024-03-03T00:00:00", "end": "2024-03-06T00:00:00"
+    })
+    assert response.status_code == 404
+
+
+def test_container_metrics_keep_global_random_state(client: TestClient):
+    """Test that generated container metrics don't reseed the global random module."""
+    random.seed(7)
+    expected = random.random()
+    random.seed(7)
+    client.get("/api/v1/metrics/container/container-123?time_range=MONTH")
+    client.get("/api/v1/containers/container-123/metrics")
+    assert random.random() == expected
+
+
+def test_metric_percentiles_from_sketches(client: TestClient, db_session: Session):
+    """Test that percentiles merge sealed sketches and fall back to snapshots for unsealed buckets."""
+    add_snapshots(db_session)
+    params = {
+        "start": "2024-03-04T00:00:00", "end": "2024-03-06T00:00:00", "bucket": "day",
+        "aggregations": ["p5", "p95", "count"]
+    }
+    unsealed = query(client, **params)
+    assert unsealed["source"] == "day"
+
+    assert seal_metric_sketches(db_session.connection(), limit=None) == 2 * 48 + 2 * 2
+    db_session.commit()
+    # Only the buckets still in progress (the conftest snapshot is from today) stay unsealed
+    unsealed_rows = db_session.query(MetricRollup).filter(MetricRollup.sketch.is_(None)).all()
+    assert {row.bucket_start.date() for row in unsealed_rows} == {datetime.utcnow().date()}
+    sealed = query(client, **params)
+    assert sealed == unsealed
+    assert sealed["series"][0]["points"][0]["p95"] == pytest.approx(33.585)
+
+    # A late snapshot unseals its buckets, which are then read from the snapshots
+    client.post("/api/v1/metrics/snapshots", json={
+        "container_id": "container-123", "air_temperature": 100.0, "timestamp": "2024-03-04T10:05:00"
+    })
+    late = query(client, **params)["series"][0]["points"][0]
+    assert late["count"] == 145
+    assert late["p95"] > sealed["series"][0]["points"][0]["p95"]
+
+    # Arbitrary range: partial hours from snapshots, whole hours and days from rollups
+    response = client.get("/api/v1/metrics/percentiles", params={
+        "metrics": ["air_temperature", "co2"], "container_ids": "container-123",
+        "start": "2024-03-03T22:30:00", "end": "2024-03-05T01:20:00", "percentiles": [0, 50, 99.5]
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(result["metric"], result["count"]) for result in results] == [("air_temperature", 153), ("co2", 76)]
+    assert results[0]["min"] == 20.0
+    assert results[0]["max"] == 100.0
+    assert results[0]["percentiles"]["0"] == 20.0
+    assert results[0]["percentiles"]["50"] == pytest.approx(27.6, abs=0.2)
+    assert results[1]["percentiles"]["99.5"] == 800.0
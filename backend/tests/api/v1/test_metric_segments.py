@@ -0,0 +1,141 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.database import metric_segments
+from app.database.metric_chunks import cold_columns, compact_metric_snapshots
+from app.database.metric_segments import historical_columns, open_segment, sync_metric_segments
+from app.models.enums import SnapshotMetric
+from app.models.models import MetricChunk, MetricSnapshot
+from tests.conftest import engine
+
+START = datetime(2024, 3, 4)
+NOW = datetime(2024, 3, 20, 12, 0)
+
+
+@pytest.fixture
+def segment_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metric_segments, "METRIC_SEGMENT_DIR", str(tmp_path))
+    # Several index entries per day of test data
+    monkeypatch.setattr(metric_segments, "SEGMENT_INDEX_INTERVAL", 16)
+    return tmp_path
+
+
+def add_snapshots(db_session: Session, days: int = 3):
+    """Every 10 minutes for a few days, instead of the test data's snapshots."""
+    db_session.query(MetricSnapshot).delete()
+    db_session.add_all([
+        MetricSnapshot(
+            container_id="container-123",
+            timestamp=START + timedelta(minutes=10 * i),
+            air_temperature=20 + i / 10,
+            co2=800.0 if i % 2 else None
+        )
+        for i in range(144 * days)
+    ])
+    db_session.commit()
+
+
+def maintain() -> int:
+    with engine.begin() as connection:
+        compact_metric_snapshots(connection, now=NOW)
+        return sync_metric_segments(connection)
+
+
+def assert_columns_match(db_session: Session, start=None, end=None):
+    connection = db_session.connection()
+    metrics = [SnapshotMetric.AIR_TEMPERATURE, SnapshotMetric.CO2]
+    timestamps, values = historical_columns(connection, "container-123", start, end, metrics)
+    expected_timestamps, expected_values = cold_columns(connection, "container-123", start, end, metrics)
+    assert timestamps == expected_timestamps
+    # NaN != NaN: compare the bytes
+    assert {metric: column.tobytes() for metric, column in values.items()} == {
+        metric: column.tobytes() for metric, column in expected_values.items()
+    }
+    return timestamps
+
+
+def test_segment_sync_and_reads(db_session: Session, segment_dir):
+    """Test that synced chunks are sliced from the segment and unsynced days come from chunks."""
+    add_snapshots(db_session, days=2)
+    assert maintain() == 288
+    assert sorted(os.listdir(segment_dir)) == ["container-123.idx", "container-123.seg"]
+    assert os.path.getsize(segment_dir / "container-123.seg") == 288 * metric_segments.RECORD_SIZE
+    assert db_session.query(MetricChunk).filter(MetricChunk.segment_synced.is_(False)).count() == 0
+
+    segment = open_segment("container-123")
+    assert segment.count == 288
+    for minutes in (0, 5, 10, 155, 160, 2870, 2880):
+        expected = min(-(-minutes // 10), 288)
+        assert segment.find(metric_segments.epoch_microseconds(START + timedelta(minutes=minutes))) == expected
+    assert segment.bounds(START + timedelta(hours=1), START + timedelta(hours=2)) == (6, 12)
+    assert len(assert_columns_match(db_session)) == 288
+    assert len(assert_columns_match(db_session, START + timedelta(minutes=95), START + timedelta(hours=30))) == 170
+
+    # A new day is appended; a late snapshot for a synced day leaves it to the chunks until resynced
+    db_session.add_all([
+        MetricSnapshot(container_id="container-123", timestamp=START + timedelta(days=2), co2=1.0),
+        MetricSnapshot(container_id="container-123", timestamp=START + timedelta(minutes=5), co2=2.0),
+    ])
+    db_session.commit()
+    with engine.begin() as connection:
+        compact_metric_snapshots(connection, now=NOW)
+    assert db_session.query(MetricChunk).filter(MetricChunk.segment_synced.is_(False)).count() == 2
+    assert len(assert_columns_match(db_session)) == 290
+
+    inode = os.stat(segment_dir / "container-123.seg").st_ino
+    assert maintain() == 290
+    # Rewritten from the first day on, into a new file
+    assert os.stat(segment_dir / "container-123.seg").st_ino != inode
+    assert open_segment("container-123").count == 290
+    timestamps = assert_columns_match(db_session, START, START + timedelta(minutes=11))
+    assert len(timestamps) == 3
+
+    db_session.add(MetricSnapshot(container_id="container-123", timestamp=START + timedelta(days=3), co2=3.0))
+    db_session.commit()
+    inode = os.stat(segment_dir / "container-123.seg").st_ino
+    assert maintain() == 1
+    assert os.stat(segment_dir / "container-123.seg").st_ino == inode
+    assert len(assert_columns_match(db_session)) == 291
+
+
+def test_segment_append_after_failed_sync(db_session: Session, segment_dir, monkeypatch):
+    """Test that records appended by a sync that failed before writing its index are overwritten."""
+    add_snapshots(db_session, days=1)
+    maintain()
+    db_session.add(MetricSnapshot(container_id="container-123", timestamp=START + timedelta(days=1), co2=1.0))
+    db_session.commit()
+
+    def fail(*args):
+        raise OSError("No space left on device")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(metric_segments, "_write_index", fail)
+        with pytest.raises(OSError):
+            maintain()
+    assert open_segment("container-123").count == 144
+    assert os.path.getsize(segment_dir / "container-123.seg") == 145 * metric_segments.RECORD_SIZE
+
+    db_session.add(MetricSnapshot(container_id="container-123", timestamp=START + timedelta(days=2), co2=2.0))
+    db_session.commit()
+    assert maintain() == 2
+    assert os.path.getsize(segment_dir / "container-123.seg") == 146 * metric_segments.RECORD_SIZE
+    assert len(assert_columns_match(db_session)) == 146
+
+
+def test_metric_query_reads_segments(client: TestClient, db_session: Session, segment_dir):
+    """Test that raw metric queries over compacted ranges give the same results from segments."""
+    add_snapshots(db_session)
+    params = {
+        "metrics": ["air_temperature", "co2"], "container_ids": "container-123", "bucket": "hour",
+        "start": "2024-03-04T06:05:00", "end": "2024-03-21T00:00:00", "aggregations": ["avg", "count", "p95"]
+    }
+    before = client.get("/api/v1/metrics/query", params=params).json()
+    maintain()
+    assert open_segment("container-123").count == 432
+    assert client.get("/api/v1/metrics/query", params=params).json() == before
+    week = client.get("/api/v1/metrics/query", params={**params, "bucket": "week"}).json()
+    assert sum(point["count"] for point in week["series"][0]["points"]) == 432 - 37
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.enums import CropLifecycleStatus
+from app.models.models import Crop, MetricSnapshot
+
+
+def test_container_metrics_crop_counts(client: TestClient, db_session: Session):
+    """Test that crop counts reflect the container's crops for every time range."""
+    for time_range in ("WEEK", "MONTH", "QUARTER", "YEAR"):
+        response = client.get(f"/api/v1/metrics/container/container-123?time_range={time_range}")
+        assert response.status_code == 200
+        assert response.json()["crop_counts"] == {"seeded": 1, "transplanted": 1, "harvested": 0}
+
+    crop = db_session.get(Crop, "crop-2")
+    crop.lifecycle_status = CropLifecycleStatus.HARVESTED
+    db_session.commit()
+    response = client.get("/api/v1/metrics/container/container-123")
+    assert response.json()["crop_counts"] == {"seeded": 1, "transplanted": 0, "harvested": 1}
+
+    response = client.get("/api/v1/metrics/container/unknown-container")
+    assert response.json()["crop_counts"] == {"seeded": 0, "transplanted": 0, "harvested": 0}
+
+
+def test_latest_metrics(client: TestClient):
+    """Test that current readings follow the newest snapshot per metric."""
+    response = client.get("/api/v1/metrics/latest")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["results"][0]["snapshot_id"] == "metric-123"
+    assert data["results"][0]["air_temperature"] == 20.5
+
+    # A partial snapshot only replaces the metrics it reports
+    response = client.post("/api/v1/metrics/snapshots", json={
+        "container_id": "container-123", "air_temperature": 23.1
+    })
+    snapshot_id = response.json()["id"]
+    # Late arrivals don't overwrite newer readings
+    client.post("/api/v1/metrics/snapshots", json={
+        "container_id": "container-123", "air_temperature": 10.0, "timestamp": "2020-01-01T00:00:00"
+    })
+
+    latest = client.get("/api/v1/metrics/latest?container_ids=container-123").json()["results"][0]
+    assert latest["snapshot_id"] == snapshot_id
+    assert latest["air_temperature"] == 23.1
+    assert latest["humidity"] == 65.2
+
+    response = client.get("/api/v1/metrics/container/container-123")
+    assert response.json()["current_temperature"] == 23.1
+    assert response.json()["current_humidity"] == 65.2
+
+    response = client.get("/api/v1/metrics/latest?tenant_id=unknown-tenant")
+    assert response.json()["total"] == 0
+
+
+def test_metric_snapshots_downsampling(client: TestClient, db_session: Session):
+    """Test that points= downsamples the snapshots and keeps the extremes."""
+    start = datetime(2024, 1, 1)
+    db_session.add_all([
+        MetricSnapshot(
+            container_id="container-123",
+            timestamp=start + timedelta(minutes=i),
+            air_temperature=30.0 if i == 500 else 20.0 + (i % 10) / 10
+        )
+        for i in range(1000)
+    ])
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/metrics/snapshots/container-123?points=50&start_date=2024-01-01T00:00:00"
+        "&end_date=2024-01-02T00:00:00"
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 50
+    timestamps = [snapshot["timestamp"] for snapshot in data]
+    assert timestamps == sorted(timestamps, reverse=True)
+    assert data[0]["timestamp"] == "2024-01-01T16:39:00"
+    assert data[-1]["timestamp"] == "2024-01-01T00:00:00"
+    assert max(snapshot["air_temperature"] for snapshot in data) == 30.0
+
+    # Series that already fit are returned as is
+    response = client.get("/api/v1/metrics/snapshots/container-123?points=5000&end_date=2024-01-02T00:00:00")
+    assert len(response.json()) == 1000
+
+    # Snapshots without the metric are skipped
+    response = client.get("/api/v1/metrics/snapshots/container-123?points=50&metric=co2")
+    assert [snapshot["id"] for snapshot in response.json()] == ["metric-123"]
@@ -0,0 +1,132 @@
+import inspect
+import math
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+from fastapi.testclient import TestClient
+
+from app.models import enums
+from app.models.enums import ContainerStatus, ContainerType
+from app.utils.msgpack import enum_codes, packb, unpackb
+from app.utils.serialization import accepts_msgpack
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+# Codes clients may have stored; extend when adding members, never edit
+PUBLISHED_CODES = {
+    "ContainerType": ["PHYSICAL", "VIRTUAL"],
+    "ContainerPurpose": ["DEVELOPMENT", "RESEARCH", "PRODUCTION"],
+    "ContainerStatus": ["CREATED", "ACTIVE", "MAINTENANCE", "INACTIVE"],
+    "AlertSeverity": ["LOW", "MEDIUM", "HIGH", "CRITICAL"],
+    "DeviceStatus": ["RUNNING", "IDLE", "ISSUE", "OFFLINE"],
+    "ShelfPosition": ["UPPER", "LOWER"],
+    "WallPosition": ["WALL_1", "WALL_2", "WALL_3", "WALL_4"],
+    "CropLifecycleStatus": ["SEEDED", "TRANSPLANTED", "HARVESTED", "DISPOSED"],
+    "CropHealthCheck": ["HEALTHY", "TREATMENT_REQUIRED", "TO_BE_DISPOSED"],
+    "LocationType": ["TRAY", "PANEL"],
+    "AlertRelatedObjectType": ["DEVICE", "CROP", "TRAY", "PANEL", "CONTAINER", "ENVIRONMENT"],
+    "InventoryStatus": ["AVAILABLE", "IN_USE", "MAINTENANCE", "DISPOSED"],
+    "FAEnvironment": ["ALPHA", "PROD"],
+    "PYAEnvironment": ["DEV", "TEST", "STAGE"],
+    "AWSEnvironment": ["DEV", "PROD"],
+    "MBAIEnvironment": ["PROD"],
+    "FHEnvironment": ["PROD"],
+    "CropLocationType": ["TRAY_LOCATION", "PANEL_LOCATION"],
+    "ActorType": ["USER", "SYSTEM"],
+    "MetricTimeRange": ["WEEK", "MONTH", "QUARTER", "YEAR"],
+    "SnapshotMetric": [
+        "AIR_TEMPERATURE", "HUMIDITY", "CO2", "YIELD_KG", "SPACE_UTILIZATION", "NURSERY_UTILIZATION",
+        "CULTIVATION_UTILIZATION",
+    ],
+    "MetricBucket": ["MINUTE", "HOUR", "DAY", "WEEK", "MONTH"],
+    "MetricAggregation": ["AVG", "MIN", "MAX", "SUM", "COUNT", "P5", "P50", "P95"],
+    "MetricRollupResolution": ["HOUR", "DAY"],
+    "ExportFormat": ["NDJSON", "CSV"],
+    "SearchResultType": ["CONTAINER", "SEED_TYPE", "TENANT", "CROP"],
+    "StreamOverflowPolicy": ["COALESCE", "DROP_OLDEST"],
+    "AlertRuleMetric": [
+        "AIR_TEMPERATURE", "HUMIDITY", "CO2", "YIELD_KG", "SPACE_UTILIZATION", "NURSERY_UTILIZATION",
+        "CULTIVATION_UTILIZATION",
+    ],
+    "AlertRuleOperator": ["ABOVE", "BELOW"],
+    "ActivityType": ["CREATED", "SEEDED", "SYNCED", "ENVIRONMENT_CHANGED", "MAINTENANCE"],
+}
+
+
+def test_msgpack_codec():
+    """Test that values round trip and datetimes and enums become integers."""
+    values = [
+        None, True, False, 0, 127, 128, -1, -32, -33, 255, 65536, 2 ** 40, -2 ** 40,
+        1.5, "", "x" * 40, "é" * 300, b"\x00\x01", list(range(20)), {str(i): i for i in range(20)},
+    ]
+    assert unpackb(packb(values)) == values
+    assert math.isnan(unpackb(packb(float("nan"))))
+
+    moment = datetime(2024, 1, 1, 12, 0, 0, 250)
+    expected = (moment - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+    assert unpackb(packb(moment)) == expected
+    assert unpackb(packb(moment.replace(tzinfo=timezone.utc))) == expected
+    assert unpackb(packb([ContainerType.VIRTUAL, ContainerStatus.CREATED])) == [1, 0]
+    assert unpackb(packb({"pair": (1, "a"), "day": moment.date()})) == {
+        "pair": [1, "a"], "day": expected - expected % (86_400 * 10 ** 6)
+    }
+
+
+def test_enum_codes_are_stable():
+    """Test that every API enum member has a code and published codes keep their meaning."""
+    # By the names they are exported under; aliases share their enum's codes
+    api_enums = {
+        enum_name: enum_type for enum_name, enum_type in inspect.getmembers(enums, inspect.isclass)
+        if issubclass(enum_type, Enum) and enum_type.__module__ == enums.__name__
+    }
+    assert set(api_enums) >= set(PUBLISHED_CODES)
+    for enum_name, enum_type in api_enums.items():
+        codes = enum_codes(enum_type)
+        assert len(set(codes.values())) == len(codes), enum_name
+        for code, name in enumerate(PUBLISHED_CODES.get(enum_name, [])):
+            member = enum_type.__members__.get(name)
+            if member is not None:
+                assert codes[member] == code, f"{enum_name}.{name}"
+            else:
+                # Codes of removed members are never reused
+                assert code not in codes.values(), f"{enum_name}.{name}"
+
+
+def test_accepts_msgpack():
+    """Test Accept header negotiation; JSON stays the default."""
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/x-msgpack, application/json")
+    assert accepts_msgpack("application/json;q=0.5, application/msgpack")
+    assert not accepts_msgpack("")
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack("application/msgpack;q=0.5, application/json")
+    assert not accepts_msgpack("application/msgpack;q=0")
+
+
+def test_msgpack_responses(client: TestClient):
+    """Test that response models and fast list responses are negotiated."""
+    response = client.get("/api/v1/crops/", headers=MSGPACK)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    crops = {crop["id"]: crop for crop in unpackb(response.content)["results"]}
+    assert crops["crop-1"]["seed_date"] == (datetime(2023, 1, 30, 9, 30) - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+    codes = client.get("/api/v1/enums/").json()
+    assert crops["crop-1"]["lifecycle_status"] == codes["CropLifecycleStatus"].index("Seeded")
+
+    response = client.get("/api/v1/tenants/tenant-123", headers=MSGPACK)
+    assert response.headers["content-type"] == "application/msgpack"
+    assert unpackb(response.content)["name"] == "Test Tenant"
+
+    response = client.get("/api/v1/containers/?fields=id,type", headers=MSGPACK)
+    result = unpackb(response.content)["results"][0]
+    assert result == {"id": "container-123", "type": codes["ContainerType"].index("Physical")}
+
+    # JSON by default, and for errors
+    response = client.get("/api/v1/crops/")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["results"][0]["seed_date"].startswith("2023-01-30")
+    response = client.get("/api/v1/tenants/unknown", headers=MSGPACK)
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Tenant not found"}
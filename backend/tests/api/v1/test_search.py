@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.models import Container, CropHistoryEntry
+from app.models.enums import ContainerType, ContainerPurpose, ContainerStatus
+
+
+def test_search(client: TestClient, db_session: Session):
+    """Test unified full-text search with prefix matching and facets."""
+    response = client.get("/api/v1/search/?q=salan")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["facets"]["seed_type"] == 1
+    assert data["results"][0]["type"] == "seed_type"
+    assert data["results"][0]["id"] == "seed-type-1"
+
+    # Every word has to match
+    response = client.get("/api/v1/search/?q=test cont")
+    data = response.json()
+    assert data["facets"]["container"] == 1
+    assert [hit["id"] for hit in data["results"] if hit["type"] == "container"] == ["container-123"]
+
+    # Restrict to types
+    response = client.get("/api/v1/search/?q=test&types=tenant")
+    data = response.json()
+    assert list(data["facets"]) == ["tenant"]
+    assert data["results"][0]["id"] == "tenant-123"
+
+    # Crops are found through notes in their history
+    db_session.add(CropHistoryEntry(
+        crop_id="crop-1", event="Treated", performed_by="user-1", notes="Aphids on lower leaves"
+    ))
+    db_session.commit()
+    response = client.get("/api/v1/search/?q=aphid")
+    data = response.json()
+    assert data["facets"]["crop"] == 1
+    assert data["results"][0]["id"] == "crop-1"
+
+    # Input without searchable words
+    response = client.get("/api/v1/search/?q=--")
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+
+
+def test_search_index_follows_updates(client: TestClient, db_session: Session):
+    """Test that the index is kept in sync and used by the list filters."""
+    container = db_session.query(Container).filter(Container.id == "container-123").first()
+    container.location_city = "Rotterdam"
+    db_session.commit()
+
+    response = client.get("/api/v1/containers/?location=rotter")
+    assert response.json()["total"] == 1
+    response = client.get("/api/v1/containers/?location=test city")
+    assert response.json()["total"] == 0
+
+    second = Container(
+        id="container-456",
+        name="Second Container",
+        type=ContainerType.VIRTUAL,
+        tenant_id="tenant-123",
+        purpose=ContainerPurpose.RESEARCH,
+        status=ContainerStatus.ACTIVE
+    )
+    db_session.add(second)
+    db_session.commit()
+    response = client.get("/api/v1/containers/?name=second")
+    assert [c["id"] for c in response.json()["results"]] == ["container-456"]
+
+    db_session.delete(second)
+    db_session.commit()
+    response = client.get("/api/v1/search/?q=second")
+    assert response.json()["total"] == 0
+
+    response = client.get("/api/v1/seed-types/?name=kiri")
+    assert [s["id"] for s in response.json()] == ["seed-type-2"]
@@ -0,0 +1,42 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.models import Crop, CropHistoryEntry, Tray
+from app.schemas.crop import CropList
+from app.schemas.inventory import TrayList
+from app.utils.serialization import model_response, type_adapter
+
+
+def test_list_responses_match_response_models(client: TestClient, db_session: Session):
+    """Test that the orjson list responses encode like the response models."""
+    db_session.add(CropHistoryEntry(crop_id="crop-1", event="Seeded", performed_by="Operator"))
+    db_session.commit()
+
+    response = client.get("/api/v1/crops/")
+    assert response.status_code == 200
+    crops = db_session.query(Crop).order_by(Crop.id).all()
+    expected = CropList(total=len(crops), results=crops)
+    assert response.json() == json.loads(expected.model_dump_json())
+    assert [len(crop["history"]) for crop in response.json()["results"]] == [1, 0]
+
+    response = client.get("/api/v1/inventory/trays?container_id=container-123")
+    trays = db_session.query(Tray).filter(Tray.container_id == "container-123").all()
+    assert response.json() == json.loads(TrayList(total=len(trays), results=trays).model_dump_json())
+
+    response = client.get("/api/v1/containers/?limit=1")
+    body = response.json()
+    assert body["total"] >= 1
+    assert body["results"][0]["id"] == "container-123"
+    assert body["results"][0]["type"] == "Physical"
+    assert body["results"][0]["has_alerts"] is False
+
+
+def test_model_response_caches_adapters():
+    """Test that adapters are built once per schema and trusted content skips validation."""
+    assert type_adapter(TrayList) is type_adapter(TrayList)
+    content = TrayList.model_construct(total=0, results=[])
+    response = model_response(TrayList, content, validate=False, status_code=202)
+    assert response.status_code == 202
+    assert json.loads(response.body) == {"total": 0, "results": []}
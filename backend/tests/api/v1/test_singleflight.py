@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import performance
+from app.main import app
+from app.utils.singleflight import SingleFlight
+
+
+def test_single_flight_shares_results():
+    """Test that concurrent calls share one computation, up to max_waiters."""
+    calls = []
+
+    async def run():
+        flights = SingleFlight(max_waiters=2)
+        release = asyncio.Event()
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return len(calls)
+
+        tasks = [asyncio.create_task(flights.do("key", compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        errors = await asyncio.gather(*(flights.do("other", fail) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    # One computation with two waiters, two more computing on their own
+    assert len(calls) == 3
+    assert [shared for _, shared in results] == [False, True, True, False, False]
+    assert results[1][0] == results[0][0]
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_coalesced_endpoint(client: TestClient, monkeypatch):
+    """Test that identical concurrent requests to an opted-in route run the endpoint once."""
+    calls = []
+
+    def slow_weekly_data():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"calls": len(calls)}
+
+    monkeypatch.setattr(performance, "generate_weekly_data", slow_weekly_data)
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+            return await asyncio.gather(
+                *(async_client.get("/api/v1/performance/", params={"time_range": "WEEK"}) for _ in range(4)),
+                async_client.get("/api/v1/performance/", params={"time_range": "WEEK"},
+                                 headers={"Accept": "application/msgpack"}),
+            )
+
+    responses = asyncio.run(run())
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.content for response in responses[:4]}) == 1
+    assert responses[4].headers["content-type"] == "application/msgpack"
+    # One computation per response format
+    assert len(calls) == 2
+
+    # Nothing is cached once the request completed
+    client.get("/api/v1/performance/?time_range=WEEK")
+    assert len(calls) == 3
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints.stream import event_stream
+from app.models.enums import StreamOverflowPolicy
+from app.utils.broker import Broker
+
+
+def test_stream_events(client: TestClient, db_session: Session):
+    """Test that write endpoints publish to stream subscribers."""
+    async def consume():
+        frames = event_stream(["container-123"], 10, StreamOverflowPolicy.COALESCE)
+        assert (await frames.__anext__()).startswith("retry:")
+
+        client.post("/api/v1/metrics/snapshots", json={
+            "container_id": "container-123",
+            "air_temperature": 21.5
+        })
+        alert = client.post("/api/v1/alerts/", json={
+            "container_id": "container-123",
+            "description": "Humidity too high",
+            "severity": "High"
+        }).json()
+        client.post(f"/api/v1/alerts/{alert['id']}/resolve")
+
+        received = [await frames.__anext__() for _ in range(3)]
+        await frames.aclose()
+        return received
+
+    frames = asyncio.run(consume())
+    events = [frame.split("\n")[1] for frame in frames]
+    assert events == ["event: metric_snapshot", "event: alert_created", "event: alert_resolved"]
+    snapshot = json.loads(frames[0].split("\n")[2][len("data: "):])
+    assert snapshot["air_temperature"] == 21.5
+
+    # Unknown containers are rejected before streaming starts
+    response = client.get("/api/v1/stream/?container_ids=missing")
+    assert response.status_code == 404
+
+
+def test_broker_overflow_policies():
+    """Test coalescing and dropping of events for slow subscribers."""
+    async def run():
+        broker = Broker()
+        coalescing = broker.subscribe(["c1"], max_queue=2)
+        dropping = broker.subscribe(["c1"], max_queue=2, policy=StreamOverflowPolicy.DROP_OLDEST)
+        everything = broker.subscribe()
+
+        for value in range(3):
+            broker.publish("c1", "metric_snapshot", {"value": value}, coalesce_key="metric:c1")
+        broker.publish("c2", "alert_created", {"id": "a1"})
+
+        coalesced = [await coalescing.get(0), await coalescing.get(0)]
+        dropped = [await dropping.get(0), await dropping.get(0), await dropping.get(0)]
+        assert [json.loads(m.data) for m in coalesced if m] == [{"value": 2}]
+        assert coalescing.take_dropped() == 0
+        assert [json.loads(m.data) for m in dropped if m] == [{"value": 1}, {"value": 2}]
+        assert dropping.take_dropped() == 1
+
+        assert (await everything.get(0)).event == "metric_snapshot"
+        broker.unsubscribe(everything)
+        assert not broker.has_subscribers("c2")
+        assert broker.publish("c2", "alert_created", {"id": "a2"}) == 0
+
+    asyncio.run(run())
@@ -5,16 +5,21 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 
 from app.database.database import Base, get_db
 from app.models.models import Container, Tenant, MetricSnapshot, ActivityLog, SeedType, Crop, Tray, Panel
 from app.models.enums import ContainerType, ContainerStatus, ContainerPurpose, ActorType
 from app.api.api_v1 import api_router
 from app.main import app
+from app.utils.alert_rules import alert_rule_engine
 
 # Setup in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# StaticPool keeps a single connection so every session sees the same in-memory database
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -41,6 +46,7 @@ def db_session(db: Session) -> Generator:
     for table in reversed(Base.metadata.sorted_tables):
         db.execute(table.delete())
     db.commit()
+    alert_rule_engine.invalidate()
 
     # Setup test data
     create_test_data(db)